@@ -0,0 +1,95 @@
+"""Talk to a running `azkv agent`, see `AgentClient`.
+
+Only the standard library is imported here, so that commands answered by
+the agent do not load the Azure SDK.
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any, Optional
+
+# errors of single secrets, see AgentClient.get_secrets
+NOT_FOUND = "not_found"
+REQUEST_FAILED = "request_failed"
+NOT_INITIALIZED = "not_initialized"
+UNKNOWN_VAULT = "unknown_vault"
+
+
+def socket_path() -> Path:
+    return Path(os.environ.get("AZKV_AGENT_SOCK", Path.home() / ".azkv" / "agent.sock"))
+
+
+class AgentError(Exception):
+    pass
+
+
+class AgentClient:
+    """A connection to the agent.
+
+    Requests and responses are JSON objects, one per line. Every response has
+    `ok`, failed requests an `error` message instead of their result.
+    """
+
+    def __init__(self, path: Path, timeout: Optional[float] = None):
+        self._path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(str(path))
+        self._file = self._socket.makefile("rwb")
+
+    @property
+    def path(self):
+        return self._path
+
+    def request(self, op: str, **params: Any) -> dict:
+        self._file.write(json.dumps({"op": op, **params}).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise AgentError("The agent closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise AgentError(response.get("error", "Unknown error"))
+        return response
+
+    def get_secrets(
+        self, names: list[str], vault: Optional[str] = None
+    ) -> tuple[dict[str, dict], dict[str, dict]]:
+        """Secrets by name as `{name, expires_on, value, ...}`, errors as `{kind, message}`."""
+        response = self.request("get", names=names, vault=vault)
+        return response["secrets"], response["errors"]
+
+    def check(
+        self,
+        all_vaults: bool = False,
+        within: Optional[float] = None,
+        refresh=False,
+        where: Optional[dict] = None,
+    ):
+        """Findings and vault errors of a check, `within` is in seconds.
+
+        `where` is a `SecretFilter` as a dict, see `SecretFilter.to_dict`.
+        """
+        return self.request(
+            "check", all_vaults=all_vaults, within=within, refresh=refresh, where=where
+        )
+
+    def stop(self):
+        self.request("stop")
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+def connect(path: Optional[Path] = None, timeout: float = 60.0) -> Optional[AgentClient]:
+    """A client of the agent listening at `path`, None if no agent is running."""
+    path = path or socket_path()
+    if not path.exists():
+        return None
+    try:
+        return AgentClient(path, timeout)
+    except OSError:
+        return None
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+from dataclasses import asdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from cli.client.agent_client import NOT_FOUND, NOT_INITIALIZED, REQUEST_FAILED, UNKNOWN_VAULT
+from cli.client.keyvault_client import (
+    ClientNotInitializedError,
+    SecretNotFoundError,
+    SecretRequestError,
+)
+from cli.client.keyvault_clients import CustomJSONEncoder, KeyVaultClients
+from cli.client.secret_filter import SecretFilter
+
+
+class AgentServer:
+    """Serve the vaults of `kvs` to `AgentClient`s on a Unix socket.
+
+    The socket is only accessible by the user. All requests share the logins,
+    the caches and one session with its connections. `check` is the function
+    scanning the vaults, see `cli.commands.check.scan`.
+    """
+
+    def __init__(self, kvs: KeyVaultClients, path: Path, check: Callable):
+        self._kvs = kvs
+        self._path = path
+        self._check = check
+        self._stopped: Optional[asyncio.Event] = None
+        self._scanning: Optional[asyncio.Lock] = None
+
+    async def serve(self, started: Optional[Callable[[], None]] = None):
+        self._stopped = asyncio.Event()
+        self._scanning = asyncio.Lock()
+        if self._path.exists():
+            self._path.unlink()
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle, str(self._path))
+        finally:
+            os.umask(umask)
+        os.chmod(self._path, 0o600)
+        try:
+            async with self._kvs.pinned_session(), server:
+                if started:
+                    started()
+                await self._stopped.wait()
+        finally:
+            if self._path.exists():
+                self._path.unlink()
+
+    def stop(self):
+        if self._stopped:
+            self._stopped.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    response = {"ok": True, **await self._dispatch(request)}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e) or type(e).__name__}
+                writer.write(json.dumps(response, cls=CustomJSONEncoder).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: dict) -> dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {}
+        if op == "get":
+            return await self._get(request["names"], request.get("vault"))
+        if op == "check":
+            return await self._scan(request)
+        if op == "invalidate":
+            self._kvs.cache.invalidate()
+            self._kvs.values.invalidate()
+            return {}
+        if op == "reload":
+            self._kvs.reload()
+            return {}
+        if op == "stop":
+            self.stop()
+            return {}
+        raise ValueError(f"Unknown request: {op}")
+
+    async def _get(self, names: list[str], vault: Optional[str]) -> dict[str, Any]:
+        errors: dict[str, dict] = {}
+        try:
+            vault_urls = [self._kvs.find_client(vault).vault_url] if vault else None
+        except KeyError as e:
+            errors = {name: _error(UNKNOWN_VAULT, e.args[0]) for name in names}
+            return {"secrets": {}, "errors": errors}
+        found, failed = await self._kvs.find_secrets_async(names, vault_urls)
+        for name, e in failed.items():
+            if isinstance(e, SecretNotFoundError):
+                errors[name] = _error(NOT_FOUND, str(e))
+            elif isinstance(e, ClientNotInitializedError):
+                errors[name] = _error(NOT_INITIALIZED, str(e))
+            else:
+                errors[name] = _error(REQUEST_FAILED, str(e))
+        return {"secrets": {name: asdict(s) for name, s in found.items()}, "errors": errors}
+
+    async def _scan(self, request: dict) -> dict[str, Any]:
+        if request.get("refresh"):
+            self._kvs.invalidate_listings(self._kvs.clients if request.get("all_vaults") else None)
+        within = timedelta(seconds=request["within"]) if request.get("within") else None
+        where = SecretFilter.from_dict(request["where"]) if request.get("where") else None
+        loop = asyncio.get_running_loop()
+        try:
+            # listing runs on its own event loop, see KeyVaultClients.get_secrets
+            async with self._scanning:  # type: ignore
+                findings, errors, now = await loop.run_in_executor(
+                    None,
+                    self._check,
+                    self._kvs,
+                    request.get("all_vaults", False),
+                    within,
+                    where,
+                )
+        except (SecretRequestError, ClientNotInitializedError) as e:
+            raise SecretRequestError(f"Error listing the secrets: {e}")
+        return {
+            "findings": [asdict(f) for f in findings],
+            "errors": {vault_url: str(e) for vault_url, e in errors.items()},
+            "now": now,
+        }
+
+
+def _error(kind: str, message: str) -> dict:
+    return {"kind": kind, "message": message}
@@ -0,0 +1,39 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import Optional
+
+from cli.client.keyvault_secret import Secret
+
+
+class ExpiryIndex:
+    """Secrets of many vaults sorted by their expiry, for range queries.
+
+    Secrets without an expiry date are not part of the index.
+    """
+
+    def __init__(self, listings: dict[str, list[Secret]]):
+        entries = sorted(
+            (
+                (s.expires_on, vault_url, s)
+                for vault_url, secrets in listings.items()
+                for s in secrets
+                if s.expires_on
+            ),
+            key=lambda e: e[0],  # type: ignore
+        )
+        self._keys: list[datetime] = [e[0] for e in entries]  # type: ignore
+        self._entries: list[tuple[str, Secret]] = [(e[1], e[2]) for e in entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def between(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> list[tuple[str, Secret]]:
+        """`(vault_url, secret)` expiring in `[start, end)`, the earliest first."""
+        lo = bisect_left(self._keys, start) if start else 0
+        hi = bisect_left(self._keys, end) if end else len(self._keys)
+        return self._entries[lo:hi]
+
+    def expired(self, now: datetime) -> list[tuple[str, Secret]]:
+        return self.between(end=now)
@@ -0,0 +1,223 @@
+import asyncio
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Optional
+
+import aiohttp
+from azure.core.credentials import AccessToken, TokenCredential
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.keyvault.secrets.aio import SecretClient
+
+from cli.client.keyvault_client import (
+    ClientNotInitializedError,
+    KeyVaultClient,
+    SecretNotFoundError,
+    request_error,
+)
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_filter import SecretFilter
+from cli.client.throttling import Throttle
+from cli.tracing import traced, tracer
+
+
+class AsyncCredential:
+    """Async adapter for a sync credential.
+
+    azure-identity has no async interactive browser credential, so the async
+    clients borrow the sync one together with its token cache.
+    """
+
+    def __init__(self, credential: TokenCredential):
+        self._credential = credential
+
+    @traced("credential.get_token")
+    async def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(self._credential.get_token, *scopes, **kwargs)
+        )
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class AsyncKeyVaultClient:
+    def __init__(self, vault_url: str):
+        self.vault_url = vault_url
+        self._client: Optional[SecretClient] = None
+
+    def login(self, credential: AsyncCredential, transport: AioHttpTransport, **kwargs: Any):
+        self._client = SecretClient(
+            vault_url=self.vault_url, credential=credential, transport=transport, **kwargs
+        )
+
+    @traced("AsyncKeyVaultClient.get_secret")
+    async def get_secret(self, name: str) -> Secret:
+        if not self._client:
+            raise ClientNotInitializedError("Client not initialized")
+        try:
+            s = await self._client.get_secret(name)
+        except ResourceNotFoundError as e:
+            raise SecretNotFoundError(e)
+        except HttpResponseError as e:
+            raise request_error(e)
+        return Secret(s.properties.name, s.properties.expires_on, s.value)
+
+    async def get_secrets(self, where: Optional[SecretFilter] = None) -> list[Secret]:
+        return [s async for page in self.get_secrets_by_page(where) for s in page]
+
+    async def get_secrets_by_page(
+        self, where: Optional[SecretFilter] = None
+    ) -> AsyncIterator[list[Secret]]:
+        """Yield the secrets page by page, only those matching `where` if given."""
+        if not self._client:
+            raise ClientNotInitializedError("Client not initialized")
+        try:
+            start_ns = time.perf_counter_ns()
+            async for page in self._client.list_properties_of_secrets().by_page():
+                secrets = [
+                    Secret(
+                        s.name,
+                        s.expires_on,
+                        updated_on=s.updated_on,
+                        enabled=s.enabled,
+                        tags=s.tags,
+                        content_type=s.content_type,
+                    )
+                    async for s in page
+                    if not where or where.matches(s)
+                ]
+                tracer.record("AsyncKeyVaultClient.list_page", start_ns, vault_url=self.vault_url)
+                yield secrets
+                start_ns = time.perf_counter_ns()
+        except HttpResponseError as e:
+            raise request_error(e)
+
+    async def set_secret(self, secret: Secret) -> Secret:
+        """Write a new version with the value, content type and tags of `secret`."""
+        if not self._client:
+            raise ClientNotInitializedError("Client not initialized")
+        if not secret.name:
+            raise ValueError("Secret name cannot be empty")
+        if not secret.value:
+            raise ValueError("Secret value cannot be empty")
+        try:
+            s = await self._client.set_secret(
+                secret.name, secret.value, content_type=secret.content_type, tags=secret.tags
+            )
+        except HttpResponseError as e:
+            raise request_error(e)
+        return _written(s.properties)
+
+    async def update_properties(self, secret: Secret) -> Secret:
+        """Set the content type and tags of the current version of `secret`."""
+        if not self._client:
+            raise ClientNotInitializedError("Client not initialized")
+        try:
+            properties = await self._client.update_secret_properties(
+                secret.name, content_type=secret.content_type, tags=secret.tags
+            )
+        except ResourceNotFoundError as e:
+            raise SecretNotFoundError(e)
+        except HttpResponseError as e:
+            raise request_error(e)
+        return _written(properties)
+
+    async def close(self):
+        if self._client:
+            await self._client.close()
+
+
+class AsyncKeyVaultSession:
+    """Async vault clients sharing one HTTP session.
+
+    Vaults logged in with the same credential also share one async credential,
+    so tokens are acquired once per login instead of once per vault.
+    `client_options` are passed on to every `SecretClient`, except for
+    `connection_verify` which configures the shared transport. With a
+    `throttle` the requests of every vault are rate limited and retried by
+    it instead of the SDK.
+    """
+
+    def __init__(self, throttle: Optional[Throttle] = None, **client_options: Any):
+        self._connection_verify = client_options.pop("connection_verify", True)
+        self._throttle = throttle
+        self._client_options = client_options
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._transport: Optional[AioHttpTransport] = None
+        self._credentials: dict[int, AsyncCredential] = {}
+        self._clients: dict[str, AsyncKeyVaultClient] = {}
+        # sessions may be entered again while open, they close with the last exit
+        self._users = 0
+
+    def client(self, kv: KeyVaultClient) -> AsyncKeyVaultClient:
+        if not self._transport:
+            raise ClientNotInitializedError("Session not opened")
+        if kv.vault_url not in self._clients:
+            credential = kv.credential
+            if id(credential) not in self._credentials:
+                self._credentials[id(credential)] = AsyncCredential(credential)
+            options = self._client_options
+            if self._throttle:
+                options = {
+                    "retry_status": 0,
+                    **options,
+                    "per_call_policies": [self._throttle.policy(kv.vault_url)],  # type: ignore
+                }
+            client = AsyncKeyVaultClient(kv.vault_url)  # type: ignore
+            client.login(self._credentials[id(credential)], self._transport, **options)
+            self._clients[kv.vault_url] = client  # type: ignore
+        return self._clients[kv.vault_url]  # type: ignore
+
+    async def open_client(self, kv: KeyVaultClient) -> AsyncKeyVaultClient:
+        """`client`, with the login of a vault that has not logged in yet run off the loop.
+
+        A lazy login may wait for the browser, on the event loop it would hold
+        up the requests of every other vault.
+        """
+        if kv.vault_url not in self._clients:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, lambda: kv.credential)
+        return self.client(kv)
+
+    async def __aenter__(self):
+        self._users += 1
+        if self._users == 1:
+            self._session = aiohttp.ClientSession()
+            self._transport = AioHttpTransport(
+                session=self._session,
+                session_owner=False,
+                connection_verify=self._connection_verify,
+            )
+        return self
+
+    async def __aexit__(self, *args):
+        self._users -= 1
+        if self._users:
+            return
+        await asyncio.gather(*(c.close() for c in self._clients.values()))
+        self._clients = {}
+        self._credentials = {}
+        self._transport = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+def _written(properties: Any) -> Secret:
+    return Secret(
+        properties.name,
+        properties.expires_on,
+        updated_on=properties.updated_on,
+        enabled=properties.enabled,
+        tags=properties.tags,
+        version=properties.version,
+        content_type=properties.content_type,
+    )
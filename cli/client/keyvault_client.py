@@ -1,6 +1,7 @@
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Iterator, Optional
 
 from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 from azure.identity import (
@@ -12,6 +13,8 @@ from azure.keyvault.secrets import SecretClient
 from pydantic import validate_arguments
 
 from cli.client.keyvault_secret import Secret
+from cli.client.value_cache import ValueCache
+from cli.tracing import traced
 
 
 class ClientNotInitializedError(Exception):
@@ -26,6 +29,62 @@ class SecretNotFoundError(Exception):
     pass
 
 
+class SecretThrottledError(SecretRequestError):
+    """The vault kept throttling after the retries, see `cli.client.throttling`."""
+
+    def __init__(self, error: HttpResponseError, retry_after: Optional[float] = None):
+        super().__init__(error)
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        # shown by every command printing request errors, so it carries the hint
+        when = f"in {self.retry_after:g} seconds" if self.retry_after else "in a moment"
+        return f"The vault is throttling requests, try again {when}.\n{super().__str__()}"
+
+
+def request_error(error: HttpResponseError) -> SecretRequestError:
+    if error.status_code == 429:
+        retry_after = error.response.headers.get("Retry-After") if error.response else None
+        try:
+            return SecretThrottledError(error, float(retry_after) if retry_after else None)
+        except ValueError:
+            return SecretThrottledError(error)
+    return SecretRequestError(error)
+
+
+# credentials and fresh logins are shared by all vaults of an account and tenant
+_credentials: dict[tuple, InteractiveBrowserCredential] = {}
+_logins: dict[tuple, tuple[AuthenticationRecord, datetime]] = {}
+_login_lock = threading.RLock()
+
+
+def _tenant_key(record: AuthenticationRecord) -> tuple:
+    return (record.authority, record.tenant_id, record.home_account_id)
+
+
+@traced("KeyVaultClient.authenticate")
+def authenticate(tenant_id: Optional[str] = None) -> AuthenticationRecord:
+    """Log in with the browser, to `tenant_id` or the home tenant of the account.
+
+    The login is kept for this run, so every vault of the tenant reuses it.
+    """
+    options = {"tenant_id": tenant_id} if tenant_id else {}
+    credential = InteractiveBrowserCredential(
+        cache_persistence_options=TokenCachePersistenceOptions(allow_unencrypted_storage=True),
+        **options,
+    )
+    record = credential.authenticate()
+    with _login_lock:
+        _logins[_tenant_key(record)] = (record, datetime.now(timezone.utc))
+    return record
+
+
+def last_login() -> Optional[datetime]:
+    """Time of the last browser login of this run, if there was one."""
+    with _login_lock:
+        return max((t for _, t in _logins.values()), default=None)
+
+
 @validate_arguments
 @dataclass
 class KeyVaultClient:
@@ -33,19 +92,61 @@ class KeyVaultClient:
     auth_record: Optional[str] = None
     last_login_time: Optional[datetime] = None
     is_active: bool = True
+    cache_ttl_seconds: int = 300
+    expiry_days: int = 15
+    # values are only cached when a vault opts in, see ValueCache
+    value_cache_seconds: int = 0
 
     def __post_init__(self):
         self._client: Optional[SecretClient] = None
+        self._credential: Optional[InteractiveBrowserCredential] = None
         self._valid_login_hours = 6
+        self._lazy_login = False
+        self._force_reauth = False
+        self._values: Optional[ValueCache] = None
+
+    @property
+    def credential(self) -> InteractiveBrowserCredential:
+        self._ensure_login()
+        if not self._credential:
+            raise ClientNotInitializedError("Client not initialized")
+        return self._credential
+
+    def login_lazily(self, force_reauth: bool = False):
+        """Log in when the vault is first used instead of right away."""
+        self._lazy_login = True
+        self._force_reauth = force_reauth
+
+    def use_value_cache(self, values: ValueCache):
+        self._values = values
+
+    def cached_secret(self, name: str) -> Optional[Secret]:
+        if self._values is None or not self.value_cache_seconds:
+            return None
+        return self._values.get(self.vault_url, name, self.value_cache_seconds)  # type: ignore
+
+    def cache_secret(self, secret: Secret):
+        if self._values is not None and self.value_cache_seconds:
+            self._values.put(self.vault_url, secret)  # type: ignore
+
+    def _ensure_login(self):
+        with _login_lock:
+            if self._lazy_login and not self._client:
+                self.login(force_reauth=self._force_reauth)
 
     def _set_client(self, record: AuthenticationRecord):
         if not self.vault_url:
             raise ClientNotInitializedError("Vault URL not set")
-        credential = InteractiveBrowserCredential(
-            cache_persistence_options=TokenCachePersistenceOptions(allow_unencrypted_storage=True),
-            authentication_record=record,
-        )
-        self._client = SecretClient(vault_url=self.vault_url, credential=credential)
+        key = _tenant_key(record)
+        if key not in _credentials:
+            _credentials[key] = InteractiveBrowserCredential(
+                cache_persistence_options=TokenCachePersistenceOptions(
+                    allow_unencrypted_storage=True
+                ),
+                authentication_record=record,
+            )
+        self._credential = _credentials[key]
+        self._client = SecretClient(vault_url=self.vault_url, credential=self._credential)
 
     def _should_reauth(self) -> bool:
         if not self.auth_record or not self.last_login_time:
@@ -57,13 +158,20 @@ class KeyVaultClient:
         return False
 
     def _auth(self) -> AuthenticationRecord:
-        init_credential = InteractiveBrowserCredential(
-            cache_persistence_options=TokenCachePersistenceOptions(allow_unencrypted_storage=True)
-        )
-        record = init_credential.authenticate()
-        record_json = record.serialize()
-        self.auth_record = record_json
-        self.last_login_time = datetime.now(timezone.utc)
+        record = authenticate()
+        self.auth_record = record.serialize()
+        self.last_login_time = _logins[_tenant_key(record)][1]
+        return record
+
+    def _reuse_login(self) -> Optional[AuthenticationRecord]:
+        # another vault of the same tenant has logged in during this run
+        if not self.auth_record:
+            return None
+        fresh = _logins.get(_tenant_key(AuthenticationRecord.deserialize(self.auth_record)))
+        if not fresh:
+            return None
+        record, self.last_login_time = fresh
+        self.auth_record = record.serialize()
         return record
 
     def _reuse_auth(self) -> AuthenticationRecord:
@@ -73,41 +181,105 @@ class KeyVaultClient:
         return record
 
     def login(self, force_reauth: bool = False):
-        if force_reauth or self._should_reauth():
-            record = self._auth()
-        else:
-            record = self._reuse_auth()
-        self._set_client(record)
+        with _login_lock:
+            if force_reauth or self._should_reauth():
+                record = self._reuse_login() or self._auth()
+            else:
+                record = self._reuse_auth()
+            self._set_client(record)
+
+    def use_login(self, record: AuthenticationRecord, logged_in_at: datetime):
+        """Log in with the login of another vault of the same tenant, without the browser."""
+        with _login_lock:
+            self.auth_record = record.serialize()
+            self.last_login_time = logged_in_at
+            self._set_client(record)
 
-    def get_secret(self, name: str) -> Secret:
+    def fresh_login(self) -> Optional[tuple[AuthenticationRecord, datetime]]:
+        """The login of this vault and its time, if it does not have to log in again yet."""
+        if self._should_reauth():
+            return None
+        return self._reuse_auth(), self.last_login_time  # type: ignore
+
+    @traced("KeyVaultClient.get_secret")
+    def get_secret(self, name: str, version: Optional[str] = None, fresh: bool = False) -> Secret:
+        """The current value of `name`, or the value of one of its versions.
+
+        Only current values are cached, `fresh` asks the vault even if cached.
+        """
+        cached = None if version or fresh else self.cached_secret(name)
+        if cached:
+            return cached
+        self._ensure_login()
         if not self._client:
             raise ClientNotInitializedError("Client not initialized")
         try:
-            s = self._client.get_secret(name)
+            s = self._client.get_secret(name, version)
         except ResourceNotFoundError as e:
             raise SecretNotFoundError(e)
         except HttpResponseError as e:
-            raise SecretRequestError(e)
-        return Secret(s.properties.name, s.properties.expires_on, s.value)
+            raise request_error(e)
+        secret = Secret(s.properties.name, s.properties.expires_on, s.value)
+        if not version:
+            self.cache_secret(secret)
+        return secret
 
+    @traced("KeyVaultClient.get_secrets")
     def get_secrets(self) -> list[Secret]:
+        self._ensure_login()
         if not self._client:
             raise ClientNotInitializedError("Client not initialized")
         try:
-            secrets = self._client.list_properties_of_secrets()
+            return [
+                Secret(
+                    s.name,
+                    s.expires_on,
+                    updated_on=s.updated_on,
+                    enabled=s.enabled,
+                    tags=s.tags,
+                    content_type=s.content_type,
+                )
+                for s in self._client.list_properties_of_secrets()
+            ]
         except HttpResponseError as e:
-            raise SecretRequestError(e)
+            raise request_error(e)
 
-        return [Secret(s.name, s.expires_on) for s in secrets]
+    def get_versions(self, name: str) -> Iterator[list[Secret]]:
+        """The versions of `name` without their values, a page per request to the vault."""
+        self._ensure_login()
+        if not self._client:
+            raise ClientNotInitializedError("Client not initialized")
+        try:
+            for page in self._client.list_properties_of_secret_versions(name).by_page():
+                yield [
+                    Secret(
+                        s.name,
+                        s.expires_on,
+                        updated_on=s.updated_on,
+                        enabled=s.enabled,
+                        tags=s.tags,
+                        version=s.version,
+                        created_on=s.created_on,
+                        content_type=s.content_type,
+                    )
+                    for s in page
+                ]
+        except ResourceNotFoundError as e:
+            raise SecretNotFoundError(e)
+        except HttpResponseError as e:
+            raise request_error(e)
 
     def set_secret(self, secret: Secret):
+        self._ensure_login()
         if not self._client:
             raise ClientNotInitializedError("Client not initialized")
         if not secret.name:
             raise ValueError("Secret name cannot be empty")
         if not secret.value:
             raise ValueError("Secret value cannot be empty")
+        if self._values is not None:
+            self._values.invalidate(self.vault_url, secret.name)
         try:
             self._client.set_secret(secret.name, secret.value)
         except HttpResponseError as e:
-            raise SecretRequestError(e)
+            raise request_error(e)
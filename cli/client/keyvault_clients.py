@@ -1,10 +1,36 @@
+import asyncio
 import dataclasses
 import json
-from datetime import datetime, timedelta
+import queue
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional, TypeVar
 
-from cli.client.keyvault_client import KeyVaultClient
+from azure.identity import AuthenticationRecord
+
+from cli.client.keyvault_async_client import AsyncKeyVaultClient, AsyncKeyVaultSession
+from cli.client.keyvault_client import (
+    KeyVaultClient,
+    SecretNotFoundError,
+    authenticate,
+    last_login,
+)
+from cli.client.keyvault_secret import Secret
+from cli.client.onboarding import Probe, probe_vaults
+from cli.client.operations import Executor, Operation, Outcome, get_secret, list_secrets
+from cli.client.search_index import vault_label
+from cli.client.secret_cache import SecretCache
+from cli.client.secret_filter import SecretFilter
+from cli.client.settings_store import SettingsStore
+from cli.client.sync import CREATE, PROPERTIES, UPDATE, Change, SyncPlan, SyncState
+from cli.client.throttling import Throttle
+from cli.client.value_cache import ValueCache, value_cache_from_env
+from cli.decorators import run_async
+from cli.tracing import traced
+
+T = TypeVar("T")
 
 
 class CustomJSONEncoder(json.JSONEncoder):
@@ -17,78 +43,689 @@ class CustomJSONEncoder(json.JSONEncoder):
 
 
 class KeyVaultClients:
-    def __init__(self):
+    def __init__(self, client_options: Optional[dict[str, Any]] = None):
         self.clients: dict[str, KeyVaultClient] = {}
+        # passed on to every async SecretClient, see AsyncKeyVaultSession
+        self._client_options = client_options or {}
         self._location = Path.home() / ".azkv" / "settings.json"
         self._location.parent.mkdir(parents=True, exist_ok=True)
-        self._location.touch(exist_ok=True)
+        self._settings = SettingsStore(self._location)
         self._valid_settings_hours = 24
+        self._max_workers = 8
+        self._max_bulk_workers = 32
+        self._timeout_seconds = 30.0
+        self._throttle = Throttle()
+        self._errors: dict[str, Exception] = {}
+        self._cache = SecretCache(self._location.parent / "cache.json")
+        self._values = value_cache_from_env(self._location.parent / "values.bin")
+        self._sync_state = SyncState(self._location.parent / "sync.json")
+        self._revalidation: Optional[threading.Thread] = None
+        self._pinned: Optional[tuple[asyncio.AbstractEventLoop, AsyncKeyVaultSession]] = None
 
     @property
     def location(self):
         return self._location
 
+    @property
+    def cache(self) -> SecretCache:
+        return self._cache
+
+    @property
+    def sync_state(self) -> SyncState:
+        """Hashes of values seen by 'azkv sync', loaded by the command only."""
+        return self._sync_state
+
+    @property
+    def values(self) -> ValueCache:
+        return self._values
+
+    @property
+    def throttle(self) -> Throttle:
+        """Rate limits and retries shared by all async requests, see `Throttle`."""
+        return self._throttle
+
+    @property
+    def errors(self) -> dict[str, Exception]:
+        """Errors of the vaults that failed during the last command or listing."""
+        return self._errors
+
+    def _session(self, **client_options: Any) -> AsyncKeyVaultSession:
+        if self._pinned and not client_options and self._pinned[0] is asyncio.get_running_loop():
+            return self._pinned[1]
+        return AsyncKeyVaultSession(
+            throttle=self._throttle, **{**self._client_options, **client_options}
+        )
+
+    @asynccontextmanager
+    async def pinned_session(self) -> AsyncIterator[AsyncKeyVaultSession]:
+        """Share one session, and its connections, between everything run on this event loop."""
+        async with self._session() as session:
+            self._pinned = (asyncio.get_running_loop(), session)
+            try:
+                yield session
+            finally:
+                self._pinned = None
+
     def add_client(self, client: KeyVaultClient):
         if client.vault_url in self.clients:
             raise ValueError("Client already exists")
+        client.use_value_cache(self._values)
         self.clients[client.vault_url] = client  # type: ignore
         self.save()
 
+    def add_clients(self, clients: Iterable[KeyVaultClient]):
+        """Add many vaults and write the settings once, see `add_client`."""
+        clients = list(clients)
+        for client in clients:
+            if client.vault_url in self.clients:
+                raise ValueError(f"Vault {client.vault_url} already exists")
+        for client in clients:
+            client.use_value_cache(self._values)
+            self.clients[client.vault_url] = client  # type: ignore
+        self.save()
+
+    def login_for_tenant(self, tenant_id: str) -> tuple[AuthenticationRecord, datetime]:
+        """A login to `tenant_id` and its time, for new vaults of the tenant.
+
+        The login of a vault of the tenant is reused while it is valid,
+        otherwise the browser is opened once.
+        """
+        for client in self.clients.values():
+            login = client.fresh_login()
+            if login and login[0].tenant_id == tenant_id:
+                return login
+        return authenticate(tenant_id), datetime.now(timezone.utc)
+
+    @run_async
+    async def probe_vaults(
+        self, vault_urls: Iterable[str], max_workers: Optional[int] = None
+    ) -> dict[str, Probe]:
+        """Reachability and tenant of each of `vault_urls`, concurrently and without a login."""
+        return await probe_vaults(
+            vault_urls,
+            max_workers or self._max_bulk_workers,
+            self._timeout_seconds,
+            self._client_options.get("connection_verify", True),
+        )
+
     def remove_client(self, client: KeyVaultClient):
         try:
             del self.clients[client.vault_url]  # type: ignore
         except KeyError:
             pass
+        self._cache.invalidate(client.vault_url)
+        self._cache.save()
+        self._values.invalidate(client.vault_url)
         self.save()
 
+    def find_client(self, vault: str) -> KeyVaultClient:
+        """Find a vault by its URL or by its name, e.g. `my-vault`."""
+        if vault in self.clients:
+            return self.clients[vault]
+        for vault_url, client in self.clients.items():
+            if vault_label(vault_url) == vault:
+                return client
+        raise KeyError(f"Vault {vault} not found")
+
+    @traced("KeyVaultClients.login")
     def login(self):
+        """Prepare all vaults to log in once a command uses them.
+
+        All vaults are logged in again, if the last such login is older
+        than `_valid_settings_hours`.
+        """
+        force_reauth = not self._settings.is_logged_in(self._valid_settings_hours)
         for client in self.clients.values():
-            if not self._is_valid():
-                client.login(force_reauth=True)
-            else:
-                client.login()
-        self.save()
+            client.login_lazily(force_reauth)
 
+    @traced("KeyVaultClients.save")
     def save(self):
-        with open(self._location, "w") as f:
-            f.write(json.dumps(self.clients, cls=CustomJSONEncoder))
+        """Write the vaults that changed since they were loaded or saved.
+
+        The time of a browser login of this run is kept as the last login,
+        commands that did not log in leave it alone.
+        """
+        logged_in_at = last_login()
+        if logged_in_at and (
+            not self._settings.logged_in_at or logged_in_at > self._settings.logged_in_at
+        ):
+            self._settings.logged_in_at = logged_in_at
+        self._settings.save(self._serialize())
+        self._values.save()
 
+    @traced("KeyVaultClients.load")
     def load(self):
-        if self._location.stat().st_size == 0:
-            return
-        with open(self._location, "r") as f:
-            settings = json.load(f)
-        if not settings:
-            return
+        settings = self._settings.load()
         try:
             for key, setting in settings.items():
                 self.clients[key] = KeyVaultClient(**setting)
+                self.clients[key].use_value_cache(self._values)
         except TypeError:
             self.reset()
             raise ValueError("Settings file is not valid")
+        self._cache.load()
+        self._values.load()
+
+    @traced("KeyVaultClients.reload")
+    def reload(self):
+        """Pick up the vaults added, removed or changed by other commands, see `load`.
+
+        Vaults whose settings did not change keep their login and connections.
+        """
+        settings = self._settings.load()
+        current = self._serialize()
+        clients = {}
+        try:
+            for key, setting in settings.items():
+                if current.get(key) == setting:
+                    clients[key] = self.clients[key]
+                    continue
+                clients[key] = KeyVaultClient(**setting)
+                clients[key].use_value_cache(self._values)
+        except TypeError:
+            raise ValueError("Settings file is not valid")
+        self.clients = clients
+        self.login()
 
     def reset(self):
         self.clients = {}
-        self.save()
+        self._settings.save({}, replace=True)
+        self._cache.invalidate()
+        self._cache.save()
+        self._values.invalidate()
+        self._values.save()
+
+    def _serialize(self) -> dict[str, dict]:
+        return json.loads(json.dumps(self.clients, cls=CustomJSONEncoder))
+
+    def get_secrets(
+        self,
+        vault_urls: Optional[Iterable[str]] = None,
+        refresh_stale: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> dict[str, list[Secret]]:
+        """List the secrets of all active vaults, or of `vault_urls`, using the metadata cache.
+
+        Vaults without a cache entry are listed right away. Stale entries are
+        returned as they are and revalidated in the background, so the next
+        listing sees fresh data. With `refresh_stale` they are listed right
+        away as well, and only returned as they are if that fails.
+        """
+        if vault_urls is None:
+            vault_urls = [k for k, kv in self.clients.items() if kv.is_active]
+        vault_urls = list(vault_urls)
+        cached: dict[str, list[Secret]] = {}
+        stale = []
+        for vault_url in vault_urls:
+            entry = self._cache.get(vault_url)
+            if entry is None:
+                continue
+            cached[vault_url] = entry.secrets
+            if entry.is_stale(self.clients[vault_url].cache_ttl_seconds):
+                stale.append(vault_url)
+
+        missing = [k for k in vault_urls if k not in cached or (refresh_stale and k in stale)]
+        outcome = self._gather(list_secrets(), missing, max_workers)
+        fetched, self._errors = outcome.results, outcome.errors
+        if fetched:
+            for vault_url, secrets in fetched.items():
+                self._cache.put(vault_url, secrets)
+            self._cache.save()
+        if missing and not fetched and not cached:
+            raise next(iter(self._errors.values()))
+        if stale and not refresh_stale:
+            self._revalidate(stale)
+        secrets = {**cached, **fetched}
+        return {k: secrets[k] for k in vault_urls if k in secrets}
+
+    def stream_secrets(
+        self, stop: Optional[threading.Event] = None, where: Optional[SecretFilter] = None
+    ) -> Iterator[tuple[str, list[Secret], bool]]:
+        """Yield the secrets of all active vaults as they arrive.
+
+        Items are `(vault_url, secrets, replace)`. With `replace` the secrets
+        are the complete listing of the vault, otherwise they are the next page
+        of it. Cached vaults are yielded first, vaults without a cache entry
+        page by page, and stale vaults once more when they have been
+        revalidated. Setting `stop`, or closing the iterator, ends the stream
+        early.
+
+        With `where` only the matching secrets are yielded, each page is
+        filtered as it arrives. The cache still gets the complete listings.
+        """
+        stop = stop or threading.Event()
+        where = where or SecretFilter()
+        self._errors = {}
+        active = [k for k, kv in self.clients.items() if kv.is_active]
+        to_list: dict[str, bool] = {}
+        for vault_url in active:
+            entry = self._cache.get(vault_url)
+            if entry is None:
+                to_list[vault_url] = False
+                continue
+            yield vault_url, where.apply(entry.secrets), True
+            if entry.is_stale(self.clients[vault_url].cache_ttl_seconds):
+                to_list[vault_url] = True
+        if not to_list:
+            return
 
-    def _is_valid(self) -> bool:
-        return self._exists() and self._mtime() > (
-            datetime.now() - timedelta(hours=self._valid_settings_hours)
+        updates: queue.Queue = queue.Queue()
+        lister = threading.Thread(
+            target=self._list_pages,
+            args=(to_list, updates, stop, where),
+            name="azkv-stream",
+            daemon=True,
         )
+        lister.start()
+        try:
+            while not stop.is_set():
+                try:
+                    update = updates.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if update is None:
+                    return
+                yield update
+        finally:
+            stop.set()
+
+    @run_async
+    async def _list_pages(
+        self,
+        to_list: dict[str, bool],
+        updates: queue.Queue,
+        stop: threading.Event,
+        where: SecretFilter,
+    ):
+        async def list_vault(client: AsyncKeyVaultClient, vault_url: str, revalidate: bool):
+            listed: list[Secret] = []
+            async for page in client.get_secrets_by_page():
+                if stop.is_set():
+                    return
+                listed.extend(page)
+                if not revalidate:
+                    updates.put((vault_url, where.apply(page), False))
+            self._cache.put(vault_url, listed)
+            if revalidate:
+                updates.put((vault_url, where.apply(listed), True))
+
+        # the vault URL is passed along to tell the pages of the vaults apart
+        operation = Operation(
+            "list pages", list_vault, vault_args={k: (k, r) for k, r in to_list.items()}
+        )
+        try:
+            async with self._session() as session:
+                executor = self.executor(session)
+                async for vault_url, outcome in executor.stream(operation, to_list, stop):
+                    if isinstance(outcome, Exception):
+                        self._errors[vault_url] = outcome
+        finally:
+            self._cache.save()
+            updates.put(None)
+
+    def watch_secrets(
+        self,
+        vault_urls: Iterable[str],
+        interval_seconds: float,
+        stop: Optional[threading.Event] = None,
+    ) -> Iterator[tuple[dict[str, list[Secret]], dict[str, Exception]]]:
+        """List `vault_urls` every `interval_seconds` until `stop` is set.
+
+        Yields the listings and errors of each cycle. All cycles share one
+        session, so credentials and connections stay warm between them.
+        """
+        stop = stop or threading.Event()
+        updates: queue.Queue = queue.Queue()
+        watcher = threading.Thread(
+            target=self._watch,
+            args=(list(vault_urls), interval_seconds, updates, stop),
+            name="azkv-watch",
+            daemon=True,
+        )
+        watcher.start()
+        try:
+            while not stop.is_set():
+                try:
+                    update = updates.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if update is None:
+                    return
+                yield update
+        finally:
+            stop.set()
+
+    @run_async
+    async def _watch(
+        self,
+        vault_urls: list[str],
+        interval_seconds: float,
+        updates: queue.Queue,
+        stop: threading.Event,
+    ):
+        try:
+            async with self._session() as session:
+                # every vault at once, so a cycle takes as long as the slowest vault
+                executor = self.executor(session, len(vault_urls) or 1)
+                while not stop.is_set():
+                    outcome = await executor.gather(list_secrets(), vault_urls)
+                    for vault_url, secrets in outcome.results.items():
+                        self._cache.put(vault_url, secrets)
+                    self._cache.save()
+                    updates.put((outcome.results, outcome.errors))
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, stop.wait, interval_seconds)
+        finally:
+            updates.put(None)
+
+    def invalidate_listings(self, vault_urls: Optional[Iterable[str]] = None):
+        """Drop the cached listings of all active vaults, or of `vault_urls`, see `--refresh`."""
+        if vault_urls is None:
+            vault_urls = [k for k, kv in self.clients.items() if kv.is_active]
+        for vault_url in vault_urls:
+            self._cache.invalidate(vault_url)
+
+    def wait_for_revalidation(self, timeout: Optional[float] = None):
+        if self._revalidation is not None:
+            self._revalidation.join(timeout)
+
+    def _revalidate(self, vault_urls: list[str]):
+        if self._revalidation is not None and self._revalidation.is_alive():
+            return
+
+        def revalidate():
+            fetched = self._gather(list_secrets(), vault_urls).results
+            for vault_url, secrets in fetched.items():
+                self._cache.put(vault_url, secrets)
+            if fetched:
+                self._cache.save()
+
+        self._revalidation = threading.Thread(
+            target=revalidate, name="azkv-revalidate", daemon=True
+        )
+        self._revalidation.start()
+
+    def executor(self, session: AsyncKeyVaultSession, max_workers: Optional[int] = None):
+        """An `Executor` for the vaults, running at most `max_workers` of them at a time."""
+        return Executor(
+            self.clients, session, max_workers or self._max_workers, self._timeout_seconds
+        )
+
+    @run_async
+    async def _gather(
+        self,
+        operation: Operation[T],
+        vault_urls: Iterable[str],
+        max_workers: Optional[int] = None,
+    ) -> Outcome[T]:
+        return await self.gather_async(operation, vault_urls, max_workers)
+
+    async def gather_async(
+        self,
+        operation: Operation[T],
+        vault_urls: Iterable[str],
+        max_workers: Optional[int] = None,
+    ) -> Outcome[T]:
+        """Results and errors of `operation` on `vault_urls`, on the running event loop."""
+        vault_urls = list(vault_urls)
+        if not vault_urls:
+            return Outcome()
+        async with self._session() as session:
+            return await self.executor(session, max_workers).gather(operation, vault_urls)
+
+    def locate_secret(self, name: str, vault_urls: Optional[Iterable[str]] = None) -> str:
+        """URL of the first vault listing a secret `name`, without fetching any value.
+
+        Cached listings are looked at first. If none of them has the secret,
+        the vaults are listed again, as it may have been created since.
+        Raises `SecretNotFoundError` if no vault lists it, or the first error
+        if every vault failed.
+        """
+        if vault_urls is None:
+            vault_urls = [k for k, kv in self.clients.items() if kv.is_active]
+        vault_urls = list(vault_urls)
+        for vault_url in vault_urls:
+            entry = self._cache.get(vault_url)
+            if entry and any(s.name == name for s in entry.secrets):
+                return vault_url
+        outcome = self._gather(list_secrets(), vault_urls)
+        self._errors = outcome.errors
+        for vault_url, secrets in outcome.results.items():
+            self._cache.put(vault_url, secrets)
+        if outcome.results:
+            self._cache.save()
+        for vault_url in vault_urls:
+            if any(s.name == name for s in outcome.results.get(vault_url, [])):
+                return vault_url
+        if outcome.errors and not outcome.results:
+            raise next(iter(outcome.errors.values()))
+        raise SecretNotFoundError(f"Secret {name} not found")
+
+    @run_async
+    async def find_secret(
+        self, name: str, vault_urls: Optional[Iterable[str]] = None
+    ) -> tuple[str, Secret]:
+        """Get `name` from the first vault that has it, without listing.
+
+        All vaults, the active ones by default, are asked concurrently. The
+        secret of the first vault in their order that has it is returned, as
+        soon as the vaults before it have answered, see `Executor.first`.
+        Raises `SecretNotFoundError` if no vault has the secret, or the first
+        error if every vault failed.
+        """
+        if vault_urls is None:
+            vault_urls = [k for k, kv in self.clients.items() if kv.is_active]
+        self._errors = {}
+        async with self._session() as session:
+            return await self._first_hit(
+                self.executor(session), name, list(vault_urls), self._errors
+            )
+
+    @run_async
+    async def find_secrets(
+        self, names: Iterable[str], vault_urls: Optional[Iterable[str]] = None
+    ) -> tuple[dict[str, Secret], dict[str, Exception]]:
+        """Get many secrets in one session, see `find_secret`.
+
+        Returns the secrets found and the errors, both keyed by secret name.
+        """
+        return await self.find_secrets_async(names, vault_urls)
+
+    async def find_secrets_async(
+        self, names: Iterable[str], vault_urls: Optional[Iterable[str]] = None
+    ) -> tuple[dict[str, Secret], dict[str, Exception]]:
+        """`find_secrets` on the running event loop, as the agent does."""
+        if vault_urls is None:
+            vault_urls = [k for k, kv in self.clients.items() if kv.is_active]
+        vault_urls = list(vault_urls)
+        names = list(dict.fromkeys(names))
+        found: dict[str, Secret] = {}
+        errors: dict[str, Exception] = {}
+        async with self._session() as session:
+            executor = self.executor(session, self._max_bulk_workers)
+
+            async def find(name: str):
+                try:
+                    _, found[name] = await self._first_hit(executor, name, vault_urls, {})
+                except Exception as e:
+                    errors[name] = e
+
+            await asyncio.gather(*(find(name) for name in names))
+        ordered_errors = {k: errors[k] for k in names if k in errors}
+        return {k: found[k] for k in names if k in found}, ordered_errors
+
+    async def _first_hit(
+        self,
+        executor: Executor,
+        name: str,
+        vault_urls: list[str],
+        errors: dict[str, Exception],
+    ) -> tuple[str, Secret]:
+        # a value cached for a vault spares asking it and the vaults after it
+        asked = []
+        cached: Optional[tuple[str, Secret]] = None
+        for vault_url in vault_urls:
+            secret = self.clients[vault_url].cached_secret(name)
+            if secret:
+                cached = vault_url, secret
+                break
+            asked.append(vault_url)
+        # in the order of the vaults, so a name in several vaults always
+        # comes from the same one, however fast they answer
+        outcome = await executor.first(get_secret(name), asked, SecretNotFoundError)
+        errors.update(outcome.errors)
+        for vault_url, secret in outcome.results.items():
+            self.clients[vault_url].cache_secret(secret)
+            return vault_url, secret
+        if cached:
+            return cached
+        if errors and len(errors) == len(vault_urls):
+            raise next(iter(errors.values()))
+        raise SecretNotFoundError(f"Secret {name} not found")
+
+    @run_async
+    async def export_secrets(
+        self, vault_url: str, where: Optional[SecretFilter] = None
+    ) -> tuple[list[Secret], dict[str, Exception]]:
+        """Fetch all enabled secrets of a vault, or those matching `where`, with their values.
+
+        Secrets are filtered while the listing pages arrive, so only the values
+        of the matching ones are fetched. Values are fetched concurrently, as
+        fast as the vault allows, see `Throttle`.
+        """
+        async with self._session() as session:
+            executor = self.executor(session, self._max_bulk_workers)
+            client = await session.open_client(self.clients[vault_url])
+            listed = await client.get_secrets(where)
+            names = [s.name for s in listed if s.name and s.enabled is not False]
+            outcome = await executor.map(client.get_secret, names)
+        return list(outcome.results.values()), outcome.errors
+
+    @run_async
+    async def import_secrets(self, vault_url: str, secrets: list[Secret]) -> dict[str, Exception]:
+        """Write `secrets` to a vault concurrently, see `export_secrets`."""
+        by_name = {s.name: s for s in secrets}
+        async with self._session() as session:
+            executor = self.executor(session, self._max_bulk_workers)
+            client = await session.open_client(self.clients[vault_url])
+            outcome = await executor.map(lambda name: client.set_secret(by_name[name]), by_name)
+        self._values.invalidate(vault_url)
+        self._cache.invalidate(vault_url)
+        self._cache.save()
+        return outcome.errors  # type: ignore
+
+    @run_async
+    async def plan_sync(
+        self, src_url: str, dst_url: str, state: SyncState, max_workers: Optional[int] = None
+    ) -> SyncPlan:
+        """Changes that make the enabled secrets of `dst_url` equal to those of `src_url`.
+
+        Both vaults are listed concurrently. Values are only fetched for
+        secrets whose hash is not known from `state`, and for the source
+        secrets that have to be written. Secrets only in `dst_url` are left
+        alone.
+        """
+        plan = SyncPlan(src_url, dst_url)
+        async with self._session() as session:
+            executor = self.executor(session, max_workers or self._max_bulk_workers)
+            listings = await executor.gather(list_secrets(), [src_url, dst_url])
+            if listings.errors:
+                raise next(iter(listings.errors.values()))
+            src_listed, dst_listed = listings.results[src_url], listings.results[dst_url]
+            clients = {
+                src_url: await session.open_client(self.clients[src_url]),
+                dst_url: await session.open_client(self.clients[dst_url]),
+            }
+            src_secrets = {s.name: s for s in src_listed if s.name}
+            dst_secrets = {s.name: s for s in dst_listed if s.name}
+            listed = {src_url: src_secrets, dst_url: dst_secrets}
+            plan.only_in_dst = sorted(n for n in dst_secrets if n not in src_secrets)
+            values: dict[tuple[str, str], str] = {}
+
+            async def fetch(keys: list[tuple[str, str]]):
+                outcome = await executor.map(lambda k: clients[k[0]].get_secret(k[1]), keys)
+                for (_, name), e in outcome.errors.items():  # type: ignore
+                    plan.errors[name] = e
+                for (vault_url, name), fetched in outcome.results.items():  # type: ignore
+                    plan.fetched += 1
+                    values[(vault_url, name)] = fetched.value or ""
+                    state.record(
+                        vault_url,
+                        name,
+                        listed[vault_url][name].updated_on,
+                        state.digest(fetched.value or ""),
+                    )
+
+            def digest(vault_url: str, secret: Secret) -> Optional[str]:
+                if (vault_url, secret.name) in values:
+                    return state.digest(values[(vault_url, secret.name)])
+                return state.known(vault_url, secret)
+
+            # first the hashes that are not known, then the source values to write
+            compared = []
+            for name, secret in sorted(src_secrets.items()):
+                other = dst_secrets.get(name)
+                if secret.enabled is False or (other and other.enabled is False):
+                    plan.skipped.append(name)
+                else:
+                    compared.append((secret, other))
+            await fetch(
+                [(src_url, s.name) for s, _ in compared if not state.known(src_url, s)]
+                + [(dst_url, o.name) for _, o in compared if o and not state.known(dst_url, o)]
+            )
+            compared = [(s, o) for s, o in compared if s.name not in plan.errors]
+            to_write = [
+                s
+                for s, o in compared
+                if (not o or digest(src_url, s) != digest(dst_url, o))
+                and (src_url, s.name) not in values
+            ]
+            await fetch([(src_url, s.name) for s in to_write])
+
+        for secret, other in compared:
+            if secret.name in plan.errors:
+                continue
+            source = dataclasses.replace(secret, value=values.get((src_url, secret.name)))
+            if not other:
+                plan.changes.append(Change(secret.name, CREATE, [], source))  # type: ignore
+                continue
+            reasons = []
+            if digest(src_url, secret) != digest(dst_url, other):
+                reasons.append("value")
+            if secret.content_type != other.content_type:
+                reasons.append("content type")
+            if (secret.tags or {}) != (other.tags or {}):
+                reasons.append("tags")
+            if not reasons:
+                plan.unchanged += 1
+            else:
+                action = UPDATE if "value" in reasons else PROPERTIES
+                plan.changes.append(Change(secret.name, action, reasons, source))  # type: ignore
+        return plan
+
+    @run_async
+    async def apply_sync(
+        self, plan: SyncPlan, state: SyncState, max_workers: Optional[int] = None
+    ) -> dict[str, Exception]:
+        """Write the changes of `plan` to its destination, at most `max_workers` at a time."""
+        changes = {c.name: c for c in plan.changes}
+        async with self._session() as session:
+            executor = self.executor(session, max_workers or self._max_bulk_workers)
+            client = await session.open_client(self.clients[plan.dst_url])
+
+            async def apply(name: str) -> tuple[Secret, Optional[str]]:
+                change = changes[name]
+                if change.action == PROPERTIES:
+                    written = await client.update_properties(change.secret)
+                    return written, state.known(plan.src_url, change.secret)
+                written = await client.set_secret(change.secret)
+                return written, state.digest(change.secret.value)  # type: ignore
 
-    def _mtime(self) -> datetime:
-        return datetime.fromtimestamp(self._location.stat().st_mtime)
-
-    def _exists(self) -> bool:
-        return self._location.exists()
-
-    def run_command(self, command: str, args: list[Any] = None) -> dict[str, Any]:
-        if command not in dir(KeyVaultClient):
-            raise ValueError(f"Command {command} does not exist")
-        if not args:
-            args = []
-        result = {}
-        for k, kv in self.clients.items():
-            if kv.is_active:
-                result[k] = eval(f"kv.{command}(*args)")
-        return result
+            outcome = await executor.map(apply, changes)
+        for name, (written, digest) in outcome.results.items():
+            if digest:
+                state.record(plan.dst_url, name, written.updated_on, digest)
+        self._values.invalidate(plan.dst_url)
+        self._cache.invalidate(plan.dst_url)
+        self._cache.save()
+        return outcome.errors
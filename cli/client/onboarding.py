@@ -0,0 +1,84 @@
+"""Checks of many new vaults for 'azkv vaults add --from-file', before any login."""
+
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+# Key Vault answers requests without a token with a challenge naming its tenant
+_CHALLENGE_TENANT = re.compile(r'authorization(?:_uri)?="https://[^/"]+/([^/"]+)/?"', re.I)
+
+
+@dataclass
+class Probe:
+    vault_url: str
+    tenant_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+def parse_vault_urls(text: str) -> tuple[list[str], list[tuple[int, str]]]:
+    """Vault URLs of `text`, one per line, and the invalid lines with their numbers.
+
+    Blank lines and lines starting with '#' are skipped, quotes and trailing
+    slashes are removed and repeated URLs are only returned once.
+    """
+    urls: dict[str, None] = {}
+    invalid = []
+    for number, line in enumerate(text.splitlines(), 1):
+        url = line.strip().strip('"').strip("'").strip().rstrip("/")
+        if not url or url.startswith("#"):
+            continue
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc or parsed.path:
+            invalid.append((number, line.strip()))
+            continue
+        urls[url] = None
+    return list(urls), invalid
+
+
+def tenant_from_challenge(header: str) -> Optional[str]:
+    match = _CHALLENGE_TENANT.search(header)
+    return match.group(1) if match else None
+
+
+async def probe_vaults(
+    vault_urls: Iterable[str],
+    max_workers: int = 16,
+    timeout_seconds: float = 10.0,
+    verify: bool = True,
+) -> dict[str, Probe]:
+    """Ask every vault for its tenant without a token, at most `max_workers` at a time.
+
+    Vaults that cannot be reached, or do not answer like a Key Vault, get
+    an error instead of a tenant.
+    """
+    vault_urls = list(vault_urls)
+    semaphore = asyncio.Semaphore(max_workers)
+    timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+
+        async def probe(vault_url: str) -> Probe:
+            async with semaphore:
+                try:
+                    async with session.get(
+                        f"{vault_url}/secrets",
+                        params={"api-version": "7.4", "maxresults": "1"},
+                        ssl=None if verify else False,
+                    ) as response:
+                        header = response.headers.get("WWW-Authenticate", "")
+                        status = response.status
+                except asyncio.TimeoutError:
+                    return Probe(vault_url, error="Request timed out")
+                except aiohttp.ClientError as e:
+                    return Probe(vault_url, error=str(e) or type(e).__name__)
+            tenant_id = tenant_from_challenge(header) if status == 401 else None
+            if not tenant_id:
+                return Probe(vault_url, error=f"Not a Key Vault, answered with {status}")
+            return Probe(vault_url, tenant_id)
+
+        probes = await asyncio.gather(*(probe(vault_url) for vault_url in vault_urls))
+    return {p.vault_url: p for p in probes}
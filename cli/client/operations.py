@@ -0,0 +1,205 @@
+"""Typed calls on many vaults at once, see `Operation` and `Executor`."""
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from cli.client.keyvault_async_client import AsyncKeyVaultClient, AsyncKeyVaultSession
+from cli.client.keyvault_client import KeyVaultClient, SecretRequestError
+from cli.client.keyvault_secret import Secret
+
+T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+
+
+@dataclass(frozen=True)
+class Operation(Generic[T]):
+    """A call of `call(client, *args)` on every vault it runs on.
+
+    `args` are passed to every vault, unless `vault_args` has arguments for
+    it, e.g. a different secret name per vault.
+    """
+
+    name: str
+    call: Callable[..., Awaitable[T]]
+    args: tuple = ()
+    vault_args: Mapping[str, tuple] = field(default_factory=dict)
+
+    def args_for(self, vault_url: str) -> tuple:
+        return self.vault_args.get(vault_url, self.args)
+
+    def run(self, client: AsyncKeyVaultClient, vault_url: str) -> Awaitable[T]:
+        return self.call(client, *self.args_for(vault_url))
+
+
+@dataclass
+class Outcome(Generic[T]):
+    """Results and errors of an operation, both keyed and ordered by vault URL.
+
+    Outcomes of `Executor.map` are keyed and ordered by its keys instead.
+    """
+
+    results: dict[str, T] = field(default_factory=dict)
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+    def unwrap(self) -> dict[str, T]:
+        """The results, or the first error if every vault failed."""
+        if self.errors and not self.results:
+            raise next(iter(self.errors.values()))
+        return self.results
+
+
+def list_secrets() -> Operation[list[Secret]]:
+    return Operation("list secrets", lambda client: client.get_secrets())
+
+
+def get_secret(name: str, vault_names: Optional[Mapping[str, str]] = None) -> Operation[Secret]:
+    """Get `name`, or the name given for the vault in `vault_names`."""
+    return Operation(
+        "get secret",
+        lambda client, name: client.get_secret(name),
+        (name,),
+        {vault_url: (n,) for vault_url, n in (vault_names or {}).items()},
+    )
+
+
+class Executor:
+    """Run operations on many vaults in one session, at most `max_workers` at a time.
+
+    A vault that fails or takes longer than `timeout_seconds` does not stop
+    the others, its error is kept by vault URL. Calls of `map`, e.g. one per
+    secret of a vault, share the limit and the timeout.
+    """
+
+    def __init__(
+        self,
+        clients: Mapping[str, KeyVaultClient],
+        session: AsyncKeyVaultSession,
+        max_workers: int,
+        timeout_seconds: float,
+    ):
+        self._clients = clients
+        self._session = session
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._timeout_seconds = timeout_seconds
+
+    async def stream(
+        self,
+        operation: Operation[T],
+        vault_urls: Iterable[str],
+        stop: Optional[threading.Event] = None,
+    ) -> AsyncIterator[tuple[str, Union[T, Exception]]]:
+        """Yield `(vault_url, result or error)` as the vaults finish.
+
+        Setting `stop`, or closing the iterator, cancels the vaults that have
+        not finished yet.
+        """
+        tasks = [asyncio.create_task(self._call(operation, k)) for k in vault_urls]
+        pending = set(tasks)
+        try:
+            while pending and not (stop and stop.is_set()):
+                # `stop` is set from another thread, so it is looked at every 0.1 seconds
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=0.1 if stop else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def gather(self, operation: Operation[T], vault_urls: Iterable[str]) -> Outcome[T]:
+        vault_urls = list(vault_urls)
+        finished: dict[str, Any] = {}
+        async for vault_url, outcome in self.stream(operation, vault_urls):
+            finished[vault_url] = outcome
+        ordered = Outcome[T]()
+        for vault_url in vault_urls:
+            if isinstance(finished[vault_url], Exception):
+                ordered.errors[vault_url] = finished[vault_url]
+            else:
+                ordered.results[vault_url] = finished[vault_url]
+        return ordered
+
+    async def first(
+        self,
+        operation: Operation[T],
+        vault_urls: Iterable[str],
+        missing: type[Exception],
+    ) -> Outcome[T]:
+        """The result of the first of `vault_urls`, in their order, that has one.
+
+        All vaults are called concurrently. A result is taken as soon as the
+        vaults before it have answered, and the remaining calls are
+        cancelled. Vaults raising `missing` do not have one, the errors of the
+        others are kept.
+        """
+        tasks = [asyncio.create_task(self._call(operation, k)) for k in vault_urls]
+        outcome = Outcome[T]()
+        try:
+            for task in tasks:
+                vault_url, result = await task
+                if not isinstance(result, Exception):
+                    outcome.results[vault_url] = result
+                    break
+                if not isinstance(result, missing):
+                    outcome.errors[vault_url] = result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return outcome
+
+    async def map(self, call: Callable[[K], Awaitable[T]], keys: Iterable[K]) -> Outcome[T]:
+        """Results and errors of `call(key)` for every one of `keys`."""
+
+        async def run(key: K) -> Union[T, Exception]:
+            async with self._semaphore:
+                try:
+                    return await self._timed(call(key), f"Request for {key} timed out")
+                except Exception as e:
+                    return e
+
+        keys = list(keys)
+        outcome = Outcome[T]()
+        for key, result in zip(keys, await asyncio.gather(*(run(k) for k in keys))):
+            if isinstance(result, Exception):
+                outcome.errors[key] = result  # type: ignore
+            else:
+                outcome.results[key] = result  # type: ignore
+        return outcome
+
+    async def _call(
+        self, operation: Operation[T], vault_url: str
+    ) -> tuple[str, Union[T, Exception]]:
+        async with self._semaphore:
+            try:
+                client = await self._session.open_client(self._clients[vault_url])
+                result = await self._timed(
+                    operation.run(client, vault_url), f"Request to {vault_url} timed out"
+                )
+            except Exception as e:
+                return vault_url, e
+        return vault_url, result
+
+    async def _timed(self, call: Awaitable[T], message: str) -> T:
+        try:
+            return await asyncio.wait_for(call, self._timeout_seconds)
+        except asyncio.TimeoutError:
+            raise SecretRequestError(message)
@@ -0,0 +1,130 @@
+import base64
+import re
+from array import array
+from typing import Iterable
+from urllib.parse import urlparse
+
+from cli.client.keyvault_secret import Secret
+
+# words of names and tags, split at '-', '_', '.', '=' and the like
+_WORD = re.compile(r"[^\W_]+")
+
+
+def vault_label(vault_url: str) -> str:
+    """Short name of a vault, 'kv' for https://kv.vault.azure.net."""
+    return urlparse(vault_url).hostname.split(".", 1)[0]  # type: ignore
+
+
+class SearchIndex:
+    """Secret names and tags of one vault, indexed for the secrets picker.
+
+    Every trigram of a name or `key=value` tag points to the entries
+    containing it, and so do the first one and two characters of every word
+    in them and every character of a name. Entries are numbered in the order
+    the secrets were added.
+    """
+
+    def __init__(self, vault_url: str, secrets: Iterable[Secret] = ()):
+        self.vault_url = vault_url
+        self.label = vault_label(vault_url)
+        self._texts: list[tuple[str, ...]] = []
+        self._grams: dict[str, array] = {}
+        self._prefixes: dict[str, array] = {}
+        self._chars: dict[str, array] = {}
+        self.add(secrets)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, secrets: Iterable[Secret]):
+        for secret in secrets:
+            entry = len(self._texts)
+            texts = _texts(secret)
+            self._texts.append(texts)
+            grams = set()
+            prefixes = set()
+            for text in texts:
+                grams.update(text[i : i + 3] for i in range(len(text) - 2))
+                for word in _WORD.findall(text):
+                    prefixes.update((word[:1], word[:2]))
+            for gram in grams:
+                self._grams.setdefault(gram, array("I")).append(entry)
+            for prefix in prefixes:
+                self._prefixes.setdefault(prefix, array("I")).append(entry)
+            for char in set(texts[0]):
+                self._chars.setdefault(char, array("I")).append(entry)
+
+    def search(self, query: str) -> list[int]:
+        """Entries with `query` in their name or tags, ignoring case, in order.
+
+        Queries shorter than three characters only match the start of words.
+        """
+        query = query.lower()
+        if len(query) < 3:
+            return list(self._prefixes.get(query, ()))
+        postings = []
+        for gram in {query[i : i + 3] for i in range(len(query) - 2)}:
+            if gram not in self._grams:
+                return []
+            postings.append(self._grams[gram])
+        postings.sort(key=len)
+        entries = set(postings[0])
+        for posting in postings[1:]:
+            entries.intersection_update(posting)
+        return sorted(e for e in entries if any(query in text for text in self._texts[e]))
+
+    def candidates(self, query: str, shown: str = "") -> list[int]:
+        """Entries whose name may fuzzy match `query`, ignoring case, in order.
+
+        A name only matches if it contains every character of `query` not in
+        `shown`, the text shown along with it, so these are a superset of the
+        fuzzy matches.
+        """
+        chars = set(query.lower()) - set(shown.lower())
+        if not chars:
+            return list(range(len(self)))
+        postings = []
+        for char in chars:
+            if char not in self._chars:
+                return []
+            postings.append(self._chars[char])
+        postings.sort(key=len)
+        entries = set(postings[0])
+        for posting in postings[1:]:
+            entries.intersection_update(posting)
+        return sorted(entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "size": len(self._texts),
+            "grams": {k: _encode(v) for k, v in self._grams.items()},
+            "prefixes": {k: _encode(v) for k, v in self._prefixes.items()},
+            "chars": {k: _encode(v) for k, v in self._chars.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, vault_url: str, secrets: list[Secret], data: dict) -> "SearchIndex":
+        """The index `to_dict` returned for `secrets`."""
+        if data["size"] != len(secrets):
+            raise ValueError("Index does not match the secrets")
+        index = cls(vault_url)
+        index._texts = [_texts(s) for s in secrets]
+        index._grams = {k: _decode(v) for k, v in data["grams"].items()}
+        index._prefixes = {k: _decode(v) for k, v in data["prefixes"].items()}
+        index._chars = {k: _decode(v) for k, v in data["chars"].items()}
+        return index
+
+
+def _texts(secret: Secret) -> tuple[str, ...]:
+    tags = secret.tags or {}
+    return (str(secret.name).lower(), *(f"{k}={v}".lower() for k, v in tags.items()))
+
+
+def _encode(entries: array) -> str:
+    return base64.b64encode(entries.tobytes()).decode()
+
+
+def _decode(data: str) -> array:
+    entries = array("I")
+    entries.frombytes(base64.b64decode(data))
+    return entries
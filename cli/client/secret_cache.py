@@ -0,0 +1,191 @@
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from cli.client.expiry_index import ExpiryIndex
+from cli.client.keyvault_secret import Secret
+from cli.client.search_index import SearchIndex
+from cli.client.settings_store import write_atomic
+
+
+@dataclass
+class CacheEntry:
+    fetched_at: datetime
+    secrets: list[Secret]
+
+    def is_stale(self, ttl_seconds: int) -> bool:
+        return self.fetched_at < datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+
+
+class SecretCache:
+    """Secret metadata of the vaults, persisted next to the settings file.
+
+    Only listing metadata is stored, never secret values. The search indexes
+    of the listings go to a file of their own, which is only read by the
+    secrets picker.
+    """
+
+    def __init__(self, location: Path):
+        self._location = location
+        self._entries: dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._index: Optional[tuple[tuple[str, ...], ExpiryIndex]] = None
+        self._search_location = location.with_name("search.json")
+        # search indexes by vault, with the fetched_at of the listing they index
+        self._search: dict[str, tuple[str, SearchIndex]] = {}
+        self._search_data: Optional[dict[str, dict]] = None
+        self._search_dirty = False
+
+    @property
+    def location(self):
+        return self._location
+
+    def get(self, vault_url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._entries.get(vault_url)
+
+    def put(self, vault_url: str, secrets: list[Secret]):
+        with self._lock:
+            self._entries[vault_url] = CacheEntry(datetime.now(timezone.utc), secrets)
+            self._index = None
+
+    def expiry_index(self, vault_urls: list[str]) -> ExpiryIndex:
+        """Index of the cached secrets of `vault_urls` by expiry, kept until the cache changes."""
+        key = tuple(vault_urls)
+        with self._lock:
+            if self._index is None or self._index[0] != key:
+                listings = {k: self._entries[k].secrets for k in key if k in self._entries}
+                self._index = (key, ExpiryIndex(listings))
+            return self._index[1]
+
+    def search_index(self, vault_url: str, secrets: list[Secret]) -> SearchIndex:
+        """Search index of `secrets` listed from `vault_url`.
+
+        The index of a cached listing is built once, and persisted by `save`
+        until the listing changes.
+        """
+        with self._lock:
+            entry = self._entries.get(vault_url)
+            if entry is None or entry.secrets is not secrets:
+                stamp = None
+            else:
+                stamp = entry.fetched_at.isoformat()
+                if vault_url in self._search and self._search[vault_url][0] == stamp:
+                    return self._search[vault_url][1]
+                if self._search_data is None:
+                    self._search_data = self._load_search()
+                data = self._search_data.get(vault_url)
+        if stamp is None:
+            return SearchIndex(vault_url, secrets)
+        index = None
+        if data and data["fetched_at"] == stamp:
+            try:
+                index = SearchIndex.from_dict(vault_url, secrets, data)
+            except (ValueError, KeyError, TypeError):
+                pass
+        with self._lock:
+            if index is None:
+                index = SearchIndex(vault_url, secrets)
+                self._search_data.pop(vault_url, None)  # type: ignore
+                self._search_dirty = True
+            self._search[vault_url] = (stamp, index)
+        return index
+
+    def invalidate(self, vault_url: Optional[str] = None):
+        with self._lock:
+            self._index = None
+            if vault_url is None:
+                self._entries = {}
+                self._search = {}
+                self._search_data = {}
+                self._search_dirty = True
+            else:
+                self._entries.pop(vault_url, None)
+                self._search.pop(vault_url, None)
+
+    def load(self):
+        if not self._location.exists():
+            return
+        try:
+            with open(self._location, "r") as f:
+                data = json.load(f)
+            entries = {
+                vault_url: CacheEntry(
+                    datetime.fromisoformat(entry["fetched_at"]),
+                    [_secret_from_dict(s) for s in entry["secrets"]],
+                )
+                for vault_url, entry in data.items()
+            }
+        except (ValueError, KeyError, TypeError):
+            # a broken cache is simply rebuilt from the vaults
+            entries = {}
+        with self._lock:
+            self._entries = entries
+            self._index = None
+
+    def save(self):
+        with self._lock:
+            data = {
+                vault_url: {
+                    "fetched_at": entry.fetched_at.isoformat(),
+                    "secrets": [_secret_to_dict(s) for s in entry.secrets],
+                }
+                for vault_url, entry in self._entries.items()
+            }
+            write_atomic(self._location, json.dumps(data))
+        self.save_search()
+
+    def save_search(self):
+        """Persist the search indexes built since they were loaded."""
+        with self._lock:
+            if not self._search_dirty:
+                return
+            data = self._search_data if self._search_data is not None else self._load_search()
+            for k, (stamp, index) in self._search.items():
+                if data.get(k, {}).get("fetched_at") != stamp:
+                    data[k] = {"fetched_at": stamp, **index.to_dict()}
+            # indexes of listings that changed since are of no use anymore
+            data = {
+                k: v
+                for k, v in data.items()
+                if k in self._entries
+                and v["fetched_at"] == self._entries[k].fetched_at.isoformat()
+            }
+            write_atomic(self._search_location, json.dumps(data))
+            self._search_data = data
+            self._search_dirty = False
+
+    def _load_search(self) -> dict[str, dict]:
+        if not self._search_location.exists():
+            return {}
+        try:
+            with open(self._search_location, "r") as f:
+                data = json.load(f)
+            return {k: v for k, v in data.items() if isinstance(v, dict) and "fetched_at" in v}
+        except (ValueError, AttributeError):
+            return {}
+
+
+def _secret_to_dict(secret: Secret) -> dict:
+    return {
+        "name": secret.name,
+        "expires_on": secret.expires_on.isoformat() if secret.expires_on else None,
+        "updated_on": secret.updated_on.isoformat() if secret.updated_on else None,
+        "enabled": secret.enabled,
+        "tags": secret.tags,
+        "content_type": secret.content_type,
+    }
+
+
+def _secret_from_dict(data: dict) -> Secret:
+    return Secret(
+        data["name"],
+        datetime.fromisoformat(data["expires_on"]) if data["expires_on"] else None,
+        updated_on=datetime.fromisoformat(data["updated_on"]) if data["updated_on"] else None,
+        enabled=data["enabled"],
+        tags=data["tags"],
+        content_type=data.get("content_type"),
+    )
@@ -0,0 +1,83 @@
+"""Filters of secret listings for '--tag', '--content-type', '--enabled-only' and '--prefix'."""
+
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SecretFilter:
+    """Which secrets of a listing to keep, every condition has to hold.
+
+    `matches` only looks at `name`, `tags`, `content_type` and `enabled`, so
+    it takes a `Secret` as well as the `SecretProperties` of a page that no
+    `Secret` has been built for yet. Content types starting with '!' are
+    left out, e.g. '!application/x-pkcs12' for the secrets backing
+    certificates.
+    """
+
+    tags: tuple[tuple[str, str], ...] = ()
+    content_types: tuple[str, ...] = ()
+    enabled_only: bool = False
+    prefix: Optional[str] = None
+    _included: frozenset = field(init=False, repr=False, compare=False)
+    _excluded: frozenset = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        types = [t.lower() for t in self.content_types]
+        object.__setattr__(self, "_included", frozenset(t for t in types if t[:1] != "!"))
+        object.__setattr__(self, "_excluded", frozenset(t[1:] for t in types if t[:1] == "!"))
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.content_types or self.enabled_only or self.prefix)
+
+    def matches(self, secret: Any) -> bool:
+        if self.prefix and not (secret.name or "").startswith(self.prefix):
+            return False
+        if self.enabled_only and secret.enabled is False:
+            return False
+        if self._included or self._excluded:
+            content_type = (secret.content_type or "").lower()
+            if self._included and content_type not in self._included:
+                return False
+            if content_type in self._excluded:
+                return False
+        if self.tags:
+            tags = secret.tags or {}
+            return all(tags.get(key) == value for key, value in self.tags)
+        return True
+
+    def apply(self, secrets: list[T]) -> list[T]:
+        """The secrets that match, `secrets` itself without any condition."""
+        if not self:
+            return secrets
+        return [s for s in secrets if self.matches(s)]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "tags": [list(t) for t in self.tags],
+            "content_types": list(self.content_types),
+            "enabled_only": self.enabled_only,
+            "prefix": self.prefix,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "SecretFilter":
+        return cls(
+            tuple((k, v) for k, v in data.get("tags", ())),
+            tuple(data.get("content_types", ())),
+            data.get("enabled_only", False),
+            data.get("prefix"),
+        )
+
+
+def parse_tags(values: Iterable[str]) -> tuple[tuple[str, str], ...]:
+    """Parse 'key=value' pairs, the value may be empty and contain '='."""
+    tags = []
+    for value in values:
+        key, sep, tag_value = value.partition("=")
+        if not sep or not key:
+            raise ValueError(f"{value} is not a tag like key=value")
+        tags.append((key, tag_value))
+    return tuple(tags)
@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+@contextmanager
+def file_lock(location: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `<location>.lock` across processes."""
+    lock_location = location.with_name(location.name + ".lock")
+    with open(lock_location, "a+") as f:
+        if sys.platform == "win32":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_atomic(location: Path, text: str):
+    """Write to a temporary file and rename it, so readers never see a torn file."""
+    fd, temp = tempfile.mkstemp(dir=location.parent, prefix=f".{location.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, location)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+class SettingsStore:
+    """The vault settings file.
+
+    Saves only write the vaults that changed since they were loaded, merged
+    into the current file under a lock, so concurrent processes do not lose
+    each other's changes. `logged_in_at` is the time of the last browser
+    login, after which all vaults log in again, independent of the file's
+    mtime.
+    """
+
+    def __init__(self, location: Path):
+        self._location = location
+        self._vaults: dict[str, dict] = {}
+        self.logged_in_at: Optional[datetime] = None
+        self._saved_logged_in_at: Optional[datetime] = None
+
+    @property
+    def location(self):
+        return self._location
+
+    def load(self) -> dict[str, dict]:
+        """Read the settings of all vaults. Raises `ValueError` for a broken file."""
+        vaults, self.logged_in_at = self._read()
+        self._vaults = vaults
+        self._saved_logged_in_at = self.logged_in_at
+        return dict(vaults)
+
+    def save(self, vaults: dict[str, dict], replace: bool = False) -> bool:
+        """Write the changes in `vaults`, or all of them with `replace`.
+
+        Returns whether the file was written.
+        """
+        changed = {k: v for k, v in vaults.items() if self._vaults.get(k) != v}
+        removed = [k for k in self._vaults if k not in vaults]
+        if not (replace or changed or removed or self.logged_in_at != self._saved_logged_in_at):
+            return False
+        with file_lock(self._location):
+            if replace:
+                current = dict(vaults)
+            else:
+                try:
+                    current, logged_in_at = self._read()
+                except ValueError:
+                    current, logged_in_at = {}, None
+                current.update(changed)
+                for vault_url in removed:
+                    current.pop(vault_url, None)
+                if logged_in_at and (not self.logged_in_at or logged_in_at > self.logged_in_at):
+                    self.logged_in_at = logged_in_at
+            data: dict[str, Any] = {
+                "logged_in_at": self.logged_in_at.isoformat() if self.logged_in_at else None,
+                "vaults": current,
+            }
+            write_atomic(self._location, json.dumps(data))
+        self._vaults = dict(vaults)
+        self._saved_logged_in_at = self.logged_in_at
+        return True
+
+    def is_logged_in(self, valid_hours: int) -> bool:
+        if not self.logged_in_at:
+            return False
+        age = datetime.now(timezone.utc) - self.logged_in_at
+        return age.total_seconds() < valid_hours * 3600
+
+    def _read(self) -> tuple[dict[str, dict], Optional[datetime]]:
+        if not self._location.exists() or self._location.stat().st_size == 0:
+            return {}, None
+        with open(self._location, "r") as f:
+            data = json.load(f)
+        if not data:
+            return {}, None
+        if not isinstance(data, dict):
+            raise ValueError("Settings file is not valid")
+        if "vaults" not in data:
+            # settings of older versions only contain the vaults
+            return data, None
+        logged_in_at = data.get("logged_in_at")
+        return data["vaults"] or {}, datetime.fromisoformat(logged_in_at) if logged_in_at else None
@@ -0,0 +1,112 @@
+"""Delta of two vaults for 'azkv sync', see `KeyVaultClients.plan_sync`."""
+
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from cli.client.keyvault_secret import Secret
+from cli.client.settings_store import write_atomic
+
+CREATE = "create"
+UPDATE = "update"
+# content type or tags differ, the value does not
+PROPERTIES = "properties"
+
+
+@dataclass
+class Change:
+    name: str
+    action: str
+    reasons: list[str]
+    # the source secret, with its value for CREATE and UPDATE
+    secret: Secret
+
+
+@dataclass
+class SyncPlan:
+    src_url: str
+    dst_url: str
+    changes: list[Change] = field(default_factory=list)
+    unchanged: int = 0
+    only_in_dst: list[str] = field(default_factory=list)
+    # disabled secrets, their values cannot be read
+    skipped: list[str] = field(default_factory=list)
+    # values fetched to compute the plan
+    fetched: int = 0
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+
+class SyncState:
+    """Keyed hashes of the secret values seen by earlier syncs.
+
+    A hash is valid as long as the secret's `updated_on` is the one it was
+    recorded for, so unchanged secrets are compared without fetching their
+    values. The hashes are HMACs with a random key kept in the file, which
+    only its owner can read, so they do not help guessing short values.
+    """
+
+    def __init__(self, location: Path):
+        self._location = location
+        self._key = b""
+        self._hashes: dict[str, dict[str, tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def location(self):
+        return self._location
+
+    def digest(self, value: str) -> str:
+        if not self._key:
+            self._key = secrets.token_bytes(32)
+        return hmac.new(self._key, value.encode(), hashlib.sha256).hexdigest()
+
+    def known(self, vault_url: str, secret: Secret) -> Optional[str]:
+        """Hash of the value of `secret`, if it has not been updated since it was recorded."""
+        with self._lock:
+            recorded = self._hashes.get(vault_url, {}).get(secret.name)  # type: ignore
+        if recorded and recorded[0] == _stamp(secret.updated_on):
+            return recorded[1]
+        return None
+
+    def record(self, vault_url: str, name: str, updated_on: Optional[datetime], digest: str):
+        with self._lock:
+            self._hashes.setdefault(vault_url, {})[name] = (_stamp(updated_on), digest)
+
+    def load(self):
+        if not self._location.exists():
+            return
+        try:
+            with open(self._location, "r") as f:
+                data = json.load(f)
+            key = bytes.fromhex(data["key"])
+            hashes = {
+                vault_url: {name: (e[0], e[1]) for name, e in entries.items()}
+                for vault_url, entries in data["hashes"].items()
+            }
+        except (ValueError, KeyError, TypeError, IndexError):
+            # without the hashes the next sync compares the values once more
+            return
+        with self._lock:
+            self._key = key
+            self._hashes = hashes
+
+    def save(self):
+        with self._lock:
+            data = {
+                "key": self._key.hex(),
+                "hashes": {
+                    vault_url: {name: list(e) for name, e in entries.items()}
+                    for vault_url, entries in self._hashes.items()
+                },
+            }
+            write_atomic(self._location, json.dumps(data))
+
+
+def _stamp(updated_on: Optional[datetime]) -> str:
+    return updated_on.isoformat() if updated_on else ""
@@ -0,0 +1,188 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import AsyncHTTPPolicy
+
+THROTTLED_STATUS = 429
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """Client-side request rate of one vault.
+
+    Requests take a token, tokens refill at `rate` per second up to `burst`.
+    The rate adapts to the vault: it is halved whenever a request is
+    throttled and recovers gradually with every successful request. Until
+    the Retry-After of the last throttled response has passed no token is
+    handed out.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: float = 1.0):
+        self.rate = rate
+        self._max_rate = rate
+        self._min_rate = min_rate
+        self._burst = burst or rate
+        self._tokens = self._burst
+        self._refilled_at = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, the seconds to wait before the request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._resume_at - now)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after: Optional[float]):
+        with self._lock:
+            self.rate = max(self._min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate < self._max_rate:
+                self.rate = min(self._max_rate, self.rate + self._min_rate / self.rate)
+
+
+class RetryBudget:
+    """Retries may add at most `ratio` of the requests sent, plus `min_retries`.
+
+    This keeps retries from piling onto a vault that throttles every request.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self._ratio = ratio
+        self._min_retries = min_retries
+        self._requests = 0
+        self._retries = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._requests += 1
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._retries >= self._min_retries + self._ratio * self._requests:
+                return False
+            self._retries += 1
+            return True
+
+
+@dataclass
+class ThrottleStats:
+    requests: int = 0
+    throttled: int = 0
+    retried: int = 0
+    exhausted: int = 0
+
+
+class Throttle:
+    """Rate limits and retries of the requests to all vaults.
+
+    Every vault gets its own `TokenBucket` starting at `rate` requests per
+    second, Key Vault allows 4000 secret requests per 10 seconds and vault.
+    Throttled and failed requests are retried up to `attempts` times within
+    one `RetryBudget`. `stats` counts what happened.
+    """
+
+    def __init__(
+        self,
+        rate: float = 400.0,
+        attempts: int = 5,
+        backoff: float = 0.5,
+        max_delay: float = 60.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.stats = ThrottleStats()
+        self.budget = budget or RetryBudget()
+        self._rate = rate
+        self._attempts = attempts
+        self._backoff = backoff
+        self._max_delay = max_delay
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, vault_url: str) -> TokenBucket:
+        with self._lock:
+            if vault_url not in self._buckets:
+                self._buckets[vault_url] = TokenBucket(self._rate)
+            return self._buckets[vault_url]
+
+    def policy(self, vault_url: str) -> "ThrottlingPolicy":
+        return ThrottlingPolicy(self, vault_url)
+
+    def delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Seconds to wait before retry `attempt`, never earlier than Retry-After.
+
+        Without Retry-After the delay backs off exponentially with full jitter,
+        with it up to a tenth is added so that waiting requests spread out.
+        """
+        if retry_after is not None:
+            return min(self._max_delay, retry_after * (1 + random.uniform(0, 0.1)))
+        return random.uniform(0, min(self._max_delay, self._backoff * 2 ** (attempt - 1)))
+
+    def retry(self, attempt: int) -> bool:
+        if attempt >= self._attempts or not self.budget.withdraw():
+            self.stats.exhausted += 1
+            return False
+        self.stats.retried += 1
+        return True
+
+
+class ThrottlingPolicy(AsyncHTTPPolicy):
+    """Pipeline policy sending the requests of one vault through a `Throttle`.
+
+    It replaces the status retries of the SDK, so clients using it are
+    created with `retry_status=0`.
+    """
+
+    def __init__(self, throttle: Throttle, vault_url: str):
+        super().__init__()
+        self._throttle = throttle
+        self._bucket = throttle.bucket(vault_url)
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        stats = self._throttle.stats
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._bucket.acquire()
+            stats.requests += 1
+            self._throttle.budget.deposit()
+            response = await self.next.send(request)
+            status = response.http_response.status_code
+            if status not in RETRY_STATUS:
+                self._bucket.succeeded()
+                return response
+            retry_after = _retry_after(response)
+            if status == THROTTLED_STATUS:
+                stats.throttled += 1
+                self._bucket.throttled(retry_after)
+            if not self._throttle.retry(attempt):
+                return response
+            await asyncio.sleep(self._throttle.delay(attempt, retry_after))
+
+
+def _retry_after(response: PipelineResponse) -> Optional[float]:
+    value = response.http_response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,183 @@
+import base64
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from cli.client.keyvault_secret import Secret
+from cli.client.settings_store import write_atomic
+
+KEYRING_SERVICE = "azure-keyvault-cli"
+KEYRING_USERNAME = "value-cache"
+_SALT_SIZE = 16
+_KDF_ITERATIONS = 480_000
+
+
+class EncryptedFileBackend:
+    """Cache entries encrypted with Fernet in a file only the user can read.
+
+    The key is kept in the OS keyring, or derived from `passphrase` when one
+    is given. A file that cannot be decrypted reads as empty.
+    """
+
+    def __init__(self, location: Path, passphrase: Optional[str] = None):
+        # fail early when the optional dependencies are missing
+        from cryptography.fernet import Fernet  # noqa: F401
+
+        if passphrase is None:
+            import keyring  # noqa: F401
+        self._location = location
+        self._passphrase = passphrase
+
+    @property
+    def location(self):
+        return self._location
+
+    def read(self) -> list[dict]:
+        from cryptography.fernet import Fernet, InvalidToken
+
+        if not self._location.exists():
+            return []
+        try:
+            salt, token = self._location.read_text().split("\n", 1)
+            return json.loads(Fernet(self._key(base64.b64decode(salt))).decrypt(token))
+        except (InvalidToken, ValueError):
+            return []
+
+    def write(self, entries: list[dict]):
+        from cryptography.fernet import Fernet
+
+        salt = os.urandom(_SALT_SIZE)
+        token = Fernet(self._key(salt)).encrypt(json.dumps(entries).encode())
+        # the temporary file behind write_atomic is only readable by the user
+        write_atomic(self._location, f"{base64.b64encode(salt).decode()}\n{token.decode()}")
+
+    def _key(self, salt: bytes) -> bytes:
+        if self._passphrase is not None:
+            from cryptography.hazmat.primitives import hashes
+            from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+            kdf = PBKDF2HMAC(hashes.SHA256(), 32, salt, _KDF_ITERATIONS)
+            return base64.urlsafe_b64encode(kdf.derive(self._passphrase.encode()))
+        import keyring
+        from cryptography.fernet import Fernet
+        from keyring.errors import KeyringError
+
+        try:
+            key = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+            if not key:
+                key = Fernet.generate_key().decode()
+                keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, key)
+        except KeyringError as e:
+            raise ValueError(f"No key in the OS keyring: {e}")
+        return key.encode()
+
+
+class ValueCache:
+    """Recently read secret values, least recently used evicted first.
+
+    Entries are kept for the `ttl_seconds` the reading vault asks for and in
+    memory only, unless a `backend` persists them across runs. Vaults opt in
+    with `KeyVaultClient.value_cache_seconds`.
+    """
+
+    def __init__(self, max_entries: int = 256, backend: Optional[EncryptedFileBackend] = None):
+        self._max_entries = max_entries
+        self._backend = backend
+        self._entries: OrderedDict[tuple[str, str], tuple[datetime, Secret]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, vault_url: str, name: str, ttl_seconds: int) -> Optional[Secret]:
+        key = (vault_url, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            stored_at, secret = entry
+            if stored_at < datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds):
+                del self._entries[key]
+                self._changed = True
+                return None
+            self._entries.move_to_end(key)
+            return secret
+
+    def put(self, vault_url: str, secret: Secret):
+        key = (vault_url, secret.name)
+        with self._lock:
+            self._entries[key] = (datetime.now(timezone.utc), secret)  # type: ignore
+            self._entries.move_to_end(key)  # type: ignore
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            self._changed = True
+
+    def invalidate(self, vault_url: Optional[str] = None, name: Optional[str] = None):
+        with self._lock:
+            for key in list(self._entries):
+                if vault_url in (None, key[0]) and name in (None, key[1]):
+                    del self._entries[key]
+                    self._changed = True
+
+    def load(self):
+        if not self._backend:
+            return
+        entries: OrderedDict[tuple[str, str], tuple[datetime, Secret]] = OrderedDict()
+        try:
+            for e in self._backend.read():
+                expires_on = datetime.fromisoformat(e["expires_on"]) if e["expires_on"] else None
+                entries[(e["vault_url"], e["name"])] = (
+                    datetime.fromisoformat(e["stored_at"]),
+                    Secret(e["name"], expires_on, e["value"]),
+                )
+        except (KeyError, TypeError, ValueError):
+            # a broken cache is simply refilled from the vaults
+            entries = OrderedDict()
+        with self._lock:
+            self._entries = entries
+            self._changed = False
+
+    def save(self):
+        if not self._backend or not self._changed:
+            return
+        with self._lock:
+            entries = [
+                {
+                    "vault_url": vault_url,
+                    "name": name,
+                    "stored_at": stored_at.isoformat(),
+                    "expires_on": secret.expires_on.isoformat() if secret.expires_on else None,
+                    "value": secret.value,
+                }
+                for (vault_url, name), (stored_at, secret) in self._entries.items()
+            ]
+            self._changed = False
+        try:
+            self._backend.write(entries)
+        except ValueError as e:
+            sys.stderr.write(f"Could not save the value cache: {e}\n")
+
+
+def value_cache_from_env(location: Path) -> ValueCache:
+    """Memory only, or encrypted at `location` with AZKV_VALUE_CACHE=encrypted.
+
+    AZKV_VALUE_CACHE_PASSPHRASE derives the key from a passphrase instead of
+    keeping it in the OS keyring.
+    """
+    if os.environ.get("AZKV_VALUE_CACHE", "memory").lower() != "encrypted":
+        return ValueCache()
+    try:
+        backend = EncryptedFileBackend(location, os.environ.get("AZKV_VALUE_CACHE_PASSPHRASE"))
+    except ImportError:
+        sys.stderr.write(
+            "AZKV_VALUE_CACHE=encrypted needs cryptography and keyring, "
+            "install azure-keyvault-cli[encrypted-cache]. Caching in memory only.\n"
+        )
+        return ValueCache()
+    return ValueCache(backend=backend)
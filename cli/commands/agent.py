@@ -0,0 +1,168 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from cli.client.agent_client import (
+    NOT_FOUND,
+    NOT_INITIALIZED,
+    UNKNOWN_VAULT,
+    AgentClient,
+    AgentError,
+    connect,
+)
+from cli.client.secret_filter import SecretFilter
+from cli.commands.formats import dump_secrets
+
+# The commands answered by the agent import only what they need, so that a
+# 'get' does not load the Azure SDK.
+
+
+def run_agent(kvs, path: Path):
+    """Serve the vaults of `kvs` until Ctrl+C or 'azkv agent --stop'."""
+    import asyncio
+
+    from cli.client.agent_server import AgentServer
+    from cli.commands.check import scan
+
+    agent = connect(path)
+    if agent:
+        agent.close()
+        click.secho(f"An agent is already listening on {path}.", fg="bright_red", err=True)
+        sys.exit(1)
+    # log in up front, the agent has no terminal to ask from later
+    for kv in kvs.clients.values():
+        if kv.is_active:
+            kv.credential
+    kvs.save()
+    server = AgentServer(kvs, path, scan)
+
+    def started():
+        click.secho(f"Agent listening on {path}, press Ctrl+C to stop.", err=True)
+
+    try:
+        asyncio.run(server.serve(started))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        kvs.save()
+
+
+def stop_agent(path: Path):
+    agent = connect(path)
+    if not agent:
+        click.secho("No agent is running.", fg="bright_yellow", err=True)
+        return
+    try:
+        agent.stop()
+    finally:
+        agent.close()
+    click.secho("Agent stopped.", err=True)
+
+
+def invalidate(path: Optional[Path] = None):
+    """Tell a running agent that secrets were written behind its back."""
+    _notify("invalidate", path)
+
+
+def reload(path: Optional[Path] = None):
+    """Tell a running agent that the vaults were added, removed or changed."""
+    _notify("reload", path)
+
+
+def _notify(op: str, path: Optional[Path]):
+    agent = connect(path, timeout=1.0)
+    if not agent:
+        return
+    try:
+        agent.request(op)
+    except (AgentError, OSError):
+        pass
+    finally:
+        agent.close()
+
+
+def get_secret(agent: AgentClient, name: str, vault: Optional[str] = None, raw: bool = False):
+    secrets, errors = _request(agent.get_secrets, [name], vault)
+    if name in errors:
+        _exit_with(errors[name], "Error getting the secret!")
+    click.echo(secrets[name]["value"], nl=not raw)
+
+
+def get_secrets(agent: AgentClient, names: list[str], vault: Optional[str], fmt: str):
+    secrets, errors = _request(agent.get_secrets, names, vault)
+    unknown_vault = [e for e in errors.values() if e["kind"] == UNKNOWN_VAULT]
+    if unknown_vault:
+        _exit_with(unknown_vault[0], "")
+    values = {n: secrets[n]["value"] for n in names if n in secrets}
+    click.echo(dump_secrets(values, fmt), nl=False)
+    if errors:
+        from cli.commands.transfer import report_errors
+
+        report_errors({name: Exception(e["message"]) for name, e in errors.items()})
+
+
+def check(
+    agent: AgentClient,
+    fmt: str = "text",
+    output: Optional[Path] = None,
+    all_vaults: bool = False,
+    fail_on: Optional[str] = None,
+    within: Optional[timedelta] = None,
+    refresh: bool = False,
+    where: Optional[SecretFilter] = None,
+):
+    from cli.client.keyvault_client import SecretRequestError
+    from cli.commands.check import EXIT_ERROR, Finding, report
+
+    try:
+        result = agent.check(
+            all_vaults,
+            within.total_seconds() if within else None,
+            refresh,
+            where.to_dict() if where else None,
+        )
+    except (AgentError, OSError) as e:
+        click.secho("Error listing the secrets!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(EXIT_ERROR)
+    findings = [
+        Finding(
+            f["vault_url"],
+            f["name"],
+            _datetime(f["expires_on"]),
+            f["status"],
+            _datetime(f["updated_on"]),
+        )
+        for f in result["findings"]
+    ]
+    errors = {k: SecretRequestError(e) for k, e in result["errors"].items()}
+    report(findings, errors, datetime.fromisoformat(result["now"]), fmt, output, fail_on)
+
+
+def _request(call, *args):
+    try:
+        return call(*args)
+    except (AgentError, OSError) as e:
+        click.secho("Error asking the agent!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+
+
+def _exit_with(error: dict, title: str):
+    if error["kind"] == NOT_FOUND:
+        click.secho("Secret does not exist!", fg="bright_red", err=True)
+    elif error["kind"] == NOT_INITIALIZED:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+    elif error["kind"] == UNKNOWN_VAULT:
+        click.secho(error["message"], fg="bright_red", err=True)
+    else:
+        click.secho(title, fg="bright_red", err=True)
+        click.secho(f"Error was:\n{error['message']}", fg="red", err=True)
+    sys.exit(1)
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
@@ -1,32 +1,294 @@
-import click
+import csv
+import io
+import json
 import sys
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+
+import click
 
+from cli.client.expiry_index import ExpiryIndex
 from cli.client.keyvault_client import (
-    KeyVaultClient,
     ClientNotInitializedError,
     SecretRequestError,
 )
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_filter import SecretFilter
+from cli.commands.transfer import report_throttling
+
+EXPIRED = "expired"
+SOON = "soon"
+OK = "ok"
 
+# exit codes with --fail-on, in order of precedence
+EXIT_ERROR = 1
+EXIT_EXPIRED = 2
+EXIT_SOON = 3
 
-def check(kv: KeyVaultClient):
+
+@dataclass
+class Finding:
+    vault_url: str
+    name: str
+    expires_on: Optional[datetime]
+    status: str
+    updated_on: Optional[datetime] = None
+
+
+def check(
+    kvs: KeyVaultClients,
+    fmt: str = "text",
+    output: Optional[Path] = None,
+    all_vaults: bool = False,
+    fail_on: Optional[str] = None,
+    within: Optional[timedelta] = None,
+    where: Optional[SecretFilter] = None,
+):
     try:
-        secrets = kv.get_secrets()
-        expired_secrets = [s for s in secrets if s.is_expired()]
-        soon_expired_secrets = [s for s in secrets if s.is_soon_expired()]
-        if len(expired_secrets) > 0:
-            click.secho("Expired secrets:", fg="bright_red")
-            for s in expired_secrets:
-                click.secho(f"  {s.name}", fg="bright_red")
-        if len(soon_expired_secrets) > 0:
-            click.secho("Soon to expire secrets:", fg="bright_yellow")
-            for s in soon_expired_secrets:
-                click.secho(f"  {s.name}", fg="bright_yellow")
-        if len(expired_secrets) == 0 and len(soon_expired_secrets) == 0:
-            click.secho("No expired secrets found!", fg="bright_green")
+        findings, errors, now = scan(kvs, all_vaults, within, where)
     except SecretRequestError as e:
         click.secho("Error listing the secrets!", fg="bright_red", err=True)
         click.secho(f"Error was:\n{e}", fg="red", err=True)
-        sys.exit(1)
+        sys.exit(EXIT_ERROR)
     except ClientNotInitializedError:
         click.secho("Client not initialized!", fg="bright_red", err=True)
-        sys.exit(1)
+        sys.exit(EXIT_ERROR)
+    report_throttling(kvs.throttle.stats)
+    report(findings, errors, now, fmt, output, fail_on)
+
+
+def scan(
+    kvs: KeyVaultClients,
+    all_vaults: bool = False,
+    within: Optional[timedelta] = None,
+    where: Optional[SecretFilter] = None,
+) -> tuple[list[Finding], dict[str, Exception], datetime]:
+    """Findings of the active, or all, vaults and the errors of the vaults that failed.
+
+    With `where` only the matching secrets are checked.
+    """
+    vault_urls = [k for k, kv in kvs.clients.items() if all_vaults or kv.is_active]
+    # every vault is listed at once, so the scan takes as long as the slowest vault
+    listings = kvs.get_secrets(vault_urls, refresh_stale=True, max_workers=64)
+    if where:
+        listings = {k: where.apply(secrets) for k, secrets in listings.items()}
+    now = datetime.now(timezone.utc)
+    windows = {
+        vault_url: within or timedelta(days=kvs.clients[vault_url].expiry_days)
+        for vault_url in listings
+    }
+    findings = classify(listings, kvs.cache.expiry_index(list(listings)), now, windows)
+    return findings, kvs.errors, now
+
+
+def report(
+    findings: list[Finding],
+    errors: dict[str, Exception],
+    now: datetime,
+    fmt: str = "text",
+    output: Optional[Path] = None,
+    fail_on: Optional[str] = None,
+):
+    for vault_url, error in errors.items():
+        click.secho(f"Could not check {vault_url}: {error}", fg="yellow", err=True)
+    if fmt == "text":
+        print_findings(findings)
+    else:
+        text = render_report(findings, errors, now, fmt, fail_on == SOON)
+        if output:
+            output.write_text(text)
+        else:
+            click.echo(text, nl=False)
+    code = exit_code(findings, errors, fail_on)
+    if code:
+        sys.exit(code)
+
+
+def classify(
+    listings: dict[str, list[Secret]],
+    index: ExpiryIndex,
+    now: datetime,
+    windows: dict[str, timedelta],
+) -> list[Finding]:
+    """Classify all secrets against `now` and the expiry window of their vault."""
+    statuses: dict[int, str] = {}
+    for _, s in index.expired(now):
+        statuses[id(s)] = EXPIRED
+    for vault_url, s in index.between(now, now + max(windows.values(), default=timedelta())):
+        if s.expires_on < now + windows[vault_url]:  # type: ignore
+            statuses[id(s)] = SOON
+    return [
+        Finding(
+            vault_url, s.name, s.expires_on, statuses.get(id(s), OK), s.updated_on  # type: ignore
+        )
+        for vault_url, secrets in listings.items()
+        for s in secrets
+    ]
+
+
+def watch(
+    kvs: KeyVaultClients,
+    interval: timedelta,
+    all_vaults: bool = False,
+    within: Optional[timedelta] = None,
+    stop: Optional[threading.Event] = None,
+    where: Optional[SecretFilter] = None,
+):
+    vault_urls = [k for k, kv in kvs.clients.items() if all_vaults or kv.is_active]
+    snapshot: dict[tuple[str, str], Finding] = {}
+    failing: dict[str, str] = {}
+    click.secho(
+        f"Checking {len(vault_urls)} vaults every {interval}, press Ctrl+C to stop.", err=True
+    )
+    try:
+        for listings, errors in kvs.watch_secrets(vault_urls, interval.total_seconds(), stop):
+            if where:
+                listings = {k: where.apply(secrets) for k, secrets in listings.items()}
+            now = datetime.now(timezone.utc)
+            windows = {
+                vault_url: within or timedelta(days=kvs.clients[vault_url].expiry_days)
+                for vault_url in listings
+            }
+            findings = classify(listings, ExpiryIndex(listings), now, windows)
+            print_changes(now, changed_findings(findings, snapshot))
+            # vaults that could not be listed keep their last snapshot
+            snapshot = {k: f for k, f in snapshot.items() if k[0] in errors} | {
+                (f.vault_url, f.name): f for f in findings
+            }
+            for vault_url, error in errors.items():
+                if failing.get(vault_url) != str(error):
+                    click.secho(f"Could not check {vault_url}: {error}", fg="yellow", err=True)
+            failing = {vault_url: str(error) for vault_url, error in errors.items()}
+    except KeyboardInterrupt:
+        pass
+
+
+def changed_findings(
+    findings: list[Finding], snapshot: dict[tuple[str, str], Finding]
+) -> list[Finding]:
+    """Expired and soon to expire secrets that are new, changed or changed their status."""
+    changed = []
+    for f in findings:
+        if f.status == OK:
+            continue
+        previous = snapshot.get((f.vault_url, f.name))
+        if previous and previous.status == f.status and previous.updated_on == f.updated_on:
+            continue
+        changed.append(f)
+    return changed
+
+
+def print_changes(now: datetime, findings: list[Finding]):
+    for status, title, color in (
+        (EXPIRED, "Newly expired secrets:", "bright_red"),
+        (SOON, "Newly soon to expire secrets:", "bright_yellow"),
+    ):
+        matching = [f for f in findings if f.status == status]
+        if matching:
+            click.secho(f"{now:%Y-%m-%d %H:%M:%S} {title}", fg=color)
+            for f in matching:
+                click.secho(f"  {f.name} ({f.vault_url})", fg=color)
+
+
+def exit_code(findings: list[Finding], errors: dict[str, Exception], fail_on: Optional[str]):
+    if not fail_on:
+        return 0
+    statuses = {f.status for f in findings}
+    if errors:
+        return EXIT_ERROR
+    if EXPIRED in statuses:
+        return EXIT_EXPIRED
+    if fail_on == SOON and SOON in statuses:
+        return EXIT_SOON
+    return 0
+
+
+def print_findings(findings: list[Finding]):
+    expired_secrets = [f for f in findings if f.status == EXPIRED]
+    soon_expired_secrets = [f for f in findings if f.status == SOON]
+    if len(expired_secrets) > 0:
+        click.secho("Expired secrets:", fg="bright_red")
+        for f in expired_secrets:
+            click.secho(f"  {f.name}", fg="bright_red")
+    if len(soon_expired_secrets) > 0:
+        click.secho("Soon to expire secrets:", fg="bright_yellow")
+        for f in soon_expired_secrets:
+            click.secho(f"  {f.name}", fg="bright_yellow")
+    if len(expired_secrets) == 0 and len(soon_expired_secrets) == 0:
+        click.secho("No expired secrets found!", fg="bright_green")
+
+
+def render_report(
+    findings: list[Finding],
+    errors: dict[str, Exception],
+    now: datetime,
+    fmt: str,
+    soon_fails: bool = False,
+) -> str:
+    """Render the expired and soon to expire secrets as json or csv, or all secrets as junit."""
+    if fmt == "json":
+        return (
+            json.dumps(
+                {
+                    "checked_at": now.isoformat(),
+                    "secrets": [_finding_to_dict(f) for f in findings if f.status != OK],
+                    "errors": {vault_url: str(e) for vault_url, e in errors.items()},
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=["vault_url", "name", "expires_on", "status"])
+        writer.writeheader()
+        writer.writerows(_finding_to_dict(f) for f in findings if f.status != OK)
+        return out.getvalue()
+    if fmt == "junit":
+        return _render_junit(findings, errors, now, soon_fails)
+    raise ValueError(f"Unknown format {fmt}")
+
+
+def _finding_to_dict(finding: Finding) -> dict:
+    return {
+        "vault_url": finding.vault_url,
+        "name": finding.name,
+        "expires_on": finding.expires_on.isoformat() if finding.expires_on else None,
+        "status": finding.status,
+    }
+
+
+def _render_junit(
+    findings: list[Finding], errors: dict[str, Exception], now: datetime, soon_fails: bool
+) -> str:
+    suites = ElementTree.Element("testsuites", name="azkv check")
+    by_vault: dict[str, list[Finding]] = {}
+    for f in findings:
+        by_vault.setdefault(f.vault_url, []).append(f)
+    for vault_url in [*by_vault, *errors]:
+        suite = ElementTree.SubElement(
+            suites, "testsuite", name=vault_url, timestamp=now.isoformat()
+        )
+        failures = 0
+        for f in by_vault.get(vault_url, []):
+            case = ElementTree.SubElement(suite, "testcase", classname=vault_url, name=f.name)
+            if f.status == EXPIRED or (f.status == SOON and soon_fails):
+                failures += 1
+                message = f"{'Expired' if f.status == EXPIRED else 'Expires'} on {f.expires_on}"
+                ElementTree.SubElement(case, "failure", type=f.status, message=message)
+            elif f.status == SOON:
+                ElementTree.SubElement(case, "system-out").text = f"Expires on {f.expires_on}"
+        if vault_url in errors:
+            case = ElementTree.SubElement(
+                suite, "testcase", classname=vault_url, name="list secrets"
+            )
+            ElementTree.SubElement(case, "error", message=str(errors[vault_url]))
+        suite.set("tests", str(len(suite)))
+        suite.set("failures", str(failures))
+        suite.set("errors", "1" if vault_url in errors else "0")
+    return ElementTree.tostring(suites, encoding="unicode", xml_declaration=True) + "\n"
@@ -1,22 +1,34 @@
-from typing import Optional, Tuple
-from urllib.parse import urlparse
+import asyncio
+import threading
+from array import array
+from typing import Any, Iterator, Optional, Tuple
 
+import click
 from halo import Halo
 from InquirerPy import inquirer
 from InquirerPy.base.control import Choice
+from InquirerPy.prompts.fuzzy import FuzzyPrompt, InquirerPyFuzzyControl
 from InquirerPy.utils import InquirerPyKeybindings
+from pfzy import fuzzy_match
 
 from cli.client.keyvault_client import KeyVaultClient
 from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.client.search_index import SearchIndex
+from cli.client.secret_filter import SecretFilter
+from cli.decorators import run_async
+from cli.tracing import span
 
 CURSOR_UP_ONE = "\x1b[1A"
 ERASE_LINE = "\x1b[2K"
 
 
-def secret_selection(kvs: KeyVaultClients, name: str = None) -> Tuple[KeyVaultClient, str]:
+def secret_selection(
+    kvs: KeyVaultClients, name: str = None, where: Optional[SecretFilter] = None
+) -> Tuple[KeyVaultClient, str]:
     choice = None
     while not choice:
-        choice = secrets_blade(kvs, name)
+        choice = secrets_blade(kvs, name, where)
         if not choice:
             print(
                 CURSOR_UP_ONE + ERASE_LINE, end=""
@@ -40,33 +52,203 @@ def secret_selection(kvs: KeyVaultClients, name: str = None) -> Tuple[KeyVaultCl
 
 
 def secrets_blade(
-    kvs: KeyVaultClients, name: str = None
+    kvs: KeyVaultClients, name: str = None, where: Optional[SecretFilter] = None
 ) -> Tuple[Optional[KeyVaultClient], Optional[str]]:
-    secret_names = []
-    with Halo(text="Loading secrets", spinner="dots"):
-        secrets = kvs.run_command("get_secrets")
-    for vault_url, secrets in secrets.items():
-        for s in secrets:
-            secret_names.append(
-                {
-                    "name": f"[{urlparse(vault_url).hostname.split('.', 1)[0]}] {s.name}",
-                    "value": (vault_url, s.name),
-                }
+    stop = threading.Event()
+    updates = kvs.stream_secrets(stop, where)
+    listing = Listing(kvs)
+    try:
+        # open the picker as soon as there is anything to pick from
+        with Halo(text="Loading secrets", spinner="dots"), span("picker.first_secrets"):
+            for update in updates:
+                listing.update(*update)
+                if any(listing.names.values()):
+                    break
+        if not any(listing.names.values()) and kvs.errors:
+            raise next(iter(kvs.errors.values()))
+        keybindings = {
+            "skip": [{"key": "right"}],
+        }
+        with span("picker.build"):
+            prompt = inquirer.fuzzy(
+                message="Select a secret to show:",
+                choices=listing.choices(),
+                default=name,
+                keybindings=keybindings,
+                mandatory=False,
+                instruction=(
+                    "(Use 'enter' to submit and 'right arrow' switch to active vaults blade)"
+                ),
             )
-    keybindings = {
-        "skip": [{"key": "right"}],
-    }
-    choice = inquirer.fuzzy(
-        message="Select a secret to show:",
-        choices=secret_names,
-        default=name,
-        keybindings=keybindings,
-        mandatory=False,
-        instruction="(Use 'enter' to submit and 'right arrow' switch to active vaults blade)",
-    ).execute()
+            _use_index(prompt, listing)
+        choice = _pick(prompt, updates, listing, stop)
+    finally:
+        stop.set()
+        kvs.cache.save_search()
+    for vault_url, error in kvs.errors.items():
+        click.secho(f"Could not load secrets from {vault_url}: {error}", fg="yellow", err=True)
     return choice
 
 
+class Listing:
+    """Secret names and search indexes of the vaults.
+
+    The picker choices are numbered in the order the secrets arrived, so a
+    page arriving later only adds choices. Only the names are kept, the
+    choices are built from them when the picker needs them, see `choices`.
+    """
+
+    def __init__(self, kvs: KeyVaultClients):
+        self._kvs = kvs
+        self.names: dict[str, list[str]] = {}
+        self.indexes: dict[str, SearchIndex] = {}
+        # vault and index entry of every choice, and the choice of every entry
+        self._vaults: list[str] = []
+        self._entries = array("I")
+        self._positions: dict[str, array] = {}
+
+    def __len__(self):
+        return len(self._vaults)
+
+    def update(self, vault_url: str, secrets: list[Secret], replace: bool) -> bool:
+        """Add a page of the secrets of `vault_url`, or replace its secrets with it.
+
+        Returns whether the choices of earlier pages were kept, so only the
+        new ones have to be added to the picker.
+        """
+        kept = True
+        if replace or vault_url not in self.indexes:
+            if self.names.get(vault_url):
+                self._remove(vault_url)
+                kept = False
+            if replace:
+                index = self._kvs.cache.search_index(vault_url, secrets)
+            else:
+                index = SearchIndex(vault_url, secrets)
+            self.indexes[vault_url] = index
+            self.names[vault_url] = []
+            self._positions[vault_url] = array("I")
+        else:
+            self.indexes[vault_url].add(secrets)
+        names = self.names[vault_url]
+        positions = self._positions[vault_url]
+        for secret in secrets:
+            positions.append(len(self._vaults))
+            self._vaults.append(vault_url)
+            self._entries.append(len(names))
+            names.append(secret.name)  # type: ignore
+        return kept
+
+    def _remove(self, vault_url: str):
+        kept = [(v, e) for v, e in zip(self._vaults, self._entries) if v != vault_url]
+        self._vaults = [v for v, _ in kept]
+        self._entries = array("I", (e for _, e in kept))
+        self._positions = {v: array("I") for v in self._positions if v != vault_url}
+        for position, v in enumerate(self._vaults):
+            self._positions[v].append(position)
+
+    def choices(self, start: int = 0) -> list[dict]:
+        """The picker choices, from the `start`th on."""
+        return [
+            {
+                "name": f"[{self.indexes[vault_url].label}] {self.names[vault_url][entry]}",
+                "value": (vault_url, self.names[vault_url][entry]),
+            }
+            for vault_url, entry in zip(self._vaults[start:], self._entries[start:])
+        ]
+
+    def search(self, query: str) -> list[int]:
+        """Positions in `choices` of the secrets found by the search indexes."""
+        found = []
+        for vault_url, index in self.indexes.items():
+            positions = self._positions[vault_url]
+            found.extend(positions[e] for e in index.search(query))
+        return sorted(found)
+
+    def candidates(self, query: str) -> list[int]:
+        """Positions in `choices` of the secrets that may fuzzy match `query`."""
+        found = []
+        for vault_url, index in self.indexes.items():
+            positions = self._positions[vault_url]
+            found.extend(positions[e] for e in index.candidates(query, f"[{index.label}] "))
+        return sorted(found)
+
+
+def _use_index(prompt: FuzzyPrompt, listing: Listing):
+    """Fuzzy score only the choices the search indexes of `listing` may match.
+
+    These contain every typed character, in their name or their vault, so
+    no match is lost and most choices are never scored. Secrets found by
+    their tags follow the matches.
+
+    InquirerPy has no public hook for this, so its private attributes are
+    used; it is pinned to the version tested with them.
+    """
+    control = prompt.content_control
+
+    async def filter_choices(wait_time: float) -> list[dict[str, Any]]:
+        query = control._current_text()
+        if not query:
+            return await InquirerPyFuzzyControl._filter_choices(control, wait_time)
+        await asyncio.sleep(wait_time)
+        # the positions are only valid until the choices change, while awaiting
+        candidates = [control.choices[p] for p in listing.candidates(query)]
+        found = [control.choices[p] for p in listing.search(query)]
+        matched = await fuzzy_match(query, candidates, key="name", scorer=control._scorer)
+        shown = {id(choice) for choice in matched}
+        # found by a tag, not by the name shown
+        tagged = [choice for choice in found if id(choice) not in shown]
+        for choice in tagged:
+            choice["indices"] = []
+        return matched + tagged
+
+    control._filter_choices = filter_choices
+
+
+@run_async
+async def _pick(
+    prompt: FuzzyPrompt,
+    updates: Iterator[tuple[str, list[Secret], bool]],
+    listing: Listing,
+    stop: threading.Event,
+):
+    async def follow():
+        loop = asyncio.get_running_loop()
+        while True:
+            update = await loop.run_in_executor(None, next, updates, None)
+            if update is None:
+                return
+            start = len(listing)
+            if listing.update(*update):
+                _add_choices(prompt, listing.choices(start))
+            else:
+                _set_choices(prompt, listing.choices())
+
+    follower = asyncio.create_task(follow())
+    try:
+        return await prompt.execute_async()
+    finally:
+        stop.set()
+        follower.cancel()
+
+
+def _set_choices(prompt: FuzzyPrompt, choices: list[dict]):
+    prompt.content_control.choices = []
+    _add_choices(prompt, choices)
+
+
+def _add_choices(prompt: FuzzyPrompt, choices: list[dict]):
+    # InquirerPy has no public API to change the choices of a running prompt
+    control = prompt.content_control
+    start = len(control.choices)
+    control.choices.extend(
+        {**choice, "enabled": False, "index": start + index, "indices": []}
+        for index, choice in enumerate(choices)
+    )
+    control._height = min(control._max_lines, len(control.choices))
+    prompt._on_text_changed(None)
+
+
 def vaults_blade(
     kvs: KeyVaultClients,
     keybindings: Optional[InquirerPyKeybindings] = None,
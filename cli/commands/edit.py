@@ -28,12 +28,16 @@ def edit_list(kvs: KeyVaultClients, name: str = None):
 
 def edit_secret(kv: KeyVaultClient, name: str):
     try:
-        secret = kv.get_secret(name)
+        secret = kv.get_secret(name, fresh=True)
         click.secho(f"Editing secret '{secret.name}':", fg="bright_blue")
         click.secho(f"Value: {secret.value}", fg="bright_blue")
         user_input = click.edit(secret.value)
         if user_input is not None:
             new_secret: Secret = Secret(secret.name, secret.expires_on, user_input.strip())
+            # writing the same value again only adds a version
+            if new_secret.value == secret.value:
+                click.secho("Value unchanged, nothing saved.", fg="bright_blue")
+                return
             click.secho("New value:", fg="bright_blue")
             click.secho(new_secret.value, fg="blue")
             kv.set_secret(new_secret)
@@ -0,0 +1,52 @@
+from typing import Optional
+
+import click
+
+from cli.client.secret_filter import SecretFilter, parse_tags
+
+
+class Tag(click.ParamType):
+    name = "key=value"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+        try:
+            return parse_tags([value])[0]
+        except ValueError as e:
+            self.fail(str(e), param, ctx)
+
+
+def filter_options(f):
+    """Add the options of `secret_filter` to a command."""
+    options = [
+        click.option(
+            "--tag",
+            "tags",
+            type=Tag(),
+            multiple=True,
+            help="Only secrets with this tag, can be repeated",
+        ),
+        click.option(
+            "--content-type",
+            "content_types",
+            multiple=True,
+            help="Only secrets of this content type, or not of it with a leading '!'",
+        ),
+        click.option(
+            "--enabled-only", is_flag=True, default=False, help="Leave out disabled secrets"
+        ),
+        click.option("--prefix", required=False, help="Only secrets whose name starts with it"),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+def secret_filter(
+    tags: tuple[tuple[str, str], ...] = (),
+    content_types: tuple[str, ...] = (),
+    enabled_only: bool = False,
+    prefix: Optional[str] = None,
+) -> SecretFilter:
+    return SecretFilter(tuple(tags), tuple(content_types), enabled_only, prefix)
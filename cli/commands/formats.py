@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+FORMATS = ("json", "env", "yaml")
+REPORT_FORMATS = ("text", "json", "csv", "junit")
+
+
+class SecretsFormatError(Exception):
+    pass
+
+
+def format_from_path(path: str) -> str:
+    suffix = Path(path).suffix.lstrip(".").lower()
+    if suffix == "yml":
+        return "yaml"
+    if suffix in FORMATS:
+        return suffix
+    if Path(path).name.startswith(".env"):
+        return "env"
+    return "json"
+
+
+def dump_secrets(values: dict[str, str], fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(values, indent=2) + "\n"
+    if fmt == "env":
+        return "".join(f"{name}={json.dumps(value)}\n" for name, value in values.items())
+    if fmt == "yaml":
+        import yaml  # type: ignore
+
+        return yaml.safe_dump(values, default_flow_style=False, allow_unicode=True)
+    raise SecretsFormatError(f"Unknown format {fmt}")
+
+
+def load_secrets(text: str, fmt: str) -> dict[str, str]:
+    if fmt == "json":
+        try:
+            values = json.loads(text)
+        except ValueError as e:
+            raise SecretsFormatError(e)
+    elif fmt == "env":
+        values = _load_env(text)
+    elif fmt == "yaml":
+        import yaml  # type: ignore
+
+        try:
+            values = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise SecretsFormatError(e)
+    else:
+        raise SecretsFormatError(f"Unknown format {fmt}")
+    if not isinstance(values, dict):
+        raise SecretsFormatError("Expected a mapping of secret names to values")
+    return {str(name): str(value) for name, value in values.items()}
+
+
+def _load_env(text: str) -> dict[str, str]:
+    values = {}
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, sep, value = line.removeprefix("export ").partition("=")
+        if not sep:
+            raise SecretsFormatError(f"Line {number} is not of the form NAME=VALUE")
+        value = value.strip()
+        if value.startswith('"') and value.endswith('"') and len(value) > 1:
+            try:
+                value = json.loads(value)
+            except ValueError as e:
+                raise SecretsFormatError(f"Line {number}: {e}")
+        elif value.startswith("'") and value.endswith("'") and len(value) > 1:
+            value = value[1:-1]
+        values[name.strip()] = value
+    return values
+
+
+def read_names(text: str) -> list[str]:
+    """Secret names, one per line. Blank lines and '#' comments are skipped."""
+    names = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            names.append(line)
+    return names
@@ -0,0 +1,47 @@
+import sys
+from typing import Optional
+
+import click
+
+from cli.client.keyvault_client import (
+    ClientNotInitializedError,
+    SecretNotFoundError,
+    SecretRequestError,
+)
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.commands.formats import dump_secrets
+from cli.commands.transfer import report_errors
+
+
+def get_secret(kvs: KeyVaultClients, name: str, vault: Optional[str] = None, raw: bool = False):
+    try:
+        vault_urls = [kvs.find_client(vault).vault_url] if vault else None
+        _, secret = kvs.find_secret(name, vault_urls)
+        click.echo(secret.value, nl=not raw)
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretNotFoundError:
+        click.secho("Secret does not exist!", fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretRequestError as e:
+        click.secho("Error getting the secret!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def get_secrets(kvs: KeyVaultClients, names: list[str], vault: Optional[str], fmt: str):
+    try:
+        vault_urls = [kvs.find_client(vault).vault_url] if vault else None
+        secrets, errors = kvs.find_secrets(names, vault_urls)
+        click.echo(dump_secrets({n: s.value for n, s in secrets.items()}, fmt), nl=False)
+        report_errors(errors)
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
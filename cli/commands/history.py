@@ -0,0 +1,178 @@
+import difflib
+import heapq
+import sys
+from typing import Callable, Optional
+
+import click
+
+from cli.client.keyvault_client import (
+    ClientNotInitializedError,
+    KeyVaultClient,
+    Secret,
+    SecretNotFoundError,
+    SecretRequestError,
+)
+from cli.client.keyvault_clients import KeyVaultClients
+
+# Key Vault version ids are 32 hex digits, shorter ones are prefixes
+VERSION_LENGTH = 32
+DEFAULT_LIMIT = 25
+
+
+def history(
+    kvs: KeyVaultClients, name: str, vault: Optional[str] = None, limit: int = DEFAULT_LIMIT
+):
+    try:
+        kv = _find_client(kvs, name, vault)
+        versions, count = newest_versions(kv, name, limit)
+        if not versions:
+            raise SecretNotFoundError(name)
+        click.secho(f"{'VERSION':32}  {'CREATED':25}  {'ENABLED':7}  EXPIRES", fg="bright_blue")
+        for index, secret in enumerate(versions):
+            created = secret.created_on.isoformat(" ", "seconds") if secret.created_on else "-"
+            expires = secret.expires_on.isoformat(" ", "seconds") if secret.expires_on else "-"
+            enabled = "yes" if secret.enabled else "no"
+            line = f"{secret.version:32}  {created:25}  {enabled:7}  {expires}"
+            if index == 0:
+                click.secho(f"{line}  (current)", fg="bright_white")
+            else:
+                click.echo(line)
+        if count > len(versions):
+            click.secho(
+                f"{count - len(versions)} older versions not shown, see --limit.",
+                fg="bright_blue",
+            )
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretNotFoundError:
+        click.secho("Secret does not exist!", fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretRequestError as e:
+        click.secho("Error listing the versions!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def diff(
+    kvs: KeyVaultClients,
+    name: str,
+    old: Optional[str] = None,
+    new: Optional[str] = None,
+    vault: Optional[str] = None,
+):
+    """Compare the values of two versions, the previous and the current one by default."""
+    try:
+        kv = _find_client(kvs, name, vault)
+        old_version, new_version = resolve_versions(kv, name, old, new)
+        old_value = kv.get_secret(name, old_version).value or ""
+        new_value = kv.get_secret(name, new_version, fresh=True).value or ""
+        if old_value == new_value:
+            click.secho("The versions have the same value.", fg="bright_blue")
+            return
+        lines = difflib.unified_diff(
+            old_value.splitlines(),
+            new_value.splitlines(),
+            f"{name}@{old_version}",
+            f"{name}@{new_version or 'current'}",
+            lineterm="",
+        )
+        for line in lines:
+            if line.startswith(("---", "+++")):
+                click.secho(line, bold=True)
+            elif line.startswith("@@"):
+                click.secho(line, fg="cyan")
+            elif line.startswith("-"):
+                click.secho(line, fg="red")
+            elif line.startswith("+"):
+                click.secho(line, fg="green")
+            else:
+                click.echo(line)
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except ValueError as e:
+        click.secho(str(e), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretNotFoundError:
+        click.secho("Secret or version does not exist!", fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretRequestError as e:
+        click.secho("Error getting the versions!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def sorted_versions(kv: KeyVaultClient, name: str) -> list[Secret]:
+    """All versions of `name`, the current one first."""
+    versions = [s for page in kv.get_versions(name) for s in page]
+    return sorted(versions, key=_created, reverse=True)
+
+
+def newest_versions(kv: KeyVaultClient, name: str, limit: int) -> tuple[list[Secret], int]:
+    """The `limit` newest versions of `name`, the current one first, and the number of versions.
+
+    Key Vault returns the versions in no particular order, so every page has
+    to be read before the newest are known. Only `limit` of them are kept
+    while paging.
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for page in kv.get_versions(name):
+            count += len(page)
+            yield from page
+
+    return heapq.nlargest(limit, counted(), key=_created), count
+
+
+def _created(secret: Secret):
+    return secret.created_on is not None, secret.created_on
+
+
+def resolve_versions(
+    kv: KeyVaultClient, name: str, old: Optional[str], new: Optional[str]
+) -> tuple[str, Optional[str]]:
+    """Full version ids of `old` and `new`, None for the current version.
+
+    The versions are only listed if `old` is missing, to compare with the
+    previous version, or if either is a prefix of a version id.
+    """
+    versions: list[Secret] = []
+
+    def listed() -> list[Secret]:
+        if not versions:
+            versions.extend(sorted_versions(kv, name))
+            if not versions:
+                raise SecretNotFoundError(name)
+        return versions
+
+    if old is None:
+        if len(listed()) < 2:
+            raise ValueError(f"Secret {name} has only one version")
+        old = listed()[1].version
+    return _resolve(listed, old), _resolve(listed, new) if new else None  # type: ignore
+
+
+def _resolve(listed: Callable[[], list[Secret]], version: str) -> str:
+    if len(version) == VERSION_LENGTH:
+        return version
+    found = [s.version for s in listed() if s.version and s.version.startswith(version)]
+    if not found:
+        raise ValueError(f"Version {version} not found")
+    if len(found) > 1:
+        raise ValueError(f"Version {version} is ambiguous")
+    return found[0]
+
+
+def _find_client(kvs: KeyVaultClients, name: str, vault: Optional[str]) -> KeyVaultClient:
+    if vault:
+        return kvs.find_client(vault)
+    return kvs.clients[kvs.locate_secret(name)]
@@ -1,4 +1,5 @@
 import sys
+from typing import Optional
 
 import click
 import pyperclip  # type: ignore
@@ -10,12 +11,14 @@ from cli.client.keyvault_client import (
     SecretRequestError,
 )
 from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_filter import SecretFilter
 from cli.commands.common import secret_selection
 
 
-def show_list(kvs: KeyVaultClients, name: str = None):
+def show_list(kvs: KeyVaultClients, name: str = None, where: Optional[SecretFilter] = None):
     try:
-        (vault_url, secret) = secret_selection(kvs, name)
+        (vault_url, secret) = secret_selection(kvs, name, where)
         show_secret(kvs.clients[vault_url], secret)
     except SecretRequestError as e:
         click.secho("Error listing the secrets!", fg="bright_red", err=True)
@@ -28,22 +31,7 @@ def show_list(kvs: KeyVaultClients, name: str = None):
 
 def show_secret(kv: KeyVaultClient, name: str):
     try:
-        secret = kv.get_secret(name)
-        if secret.expires_on:
-            expires_color = "bright_white"
-            if secret.is_expired():
-                expires_color = "red"
-            elif secret.is_soon_expired():
-                expires_color = "yellow"
-            click.secho(f"Expires: {secret.expires_on}", fg=expires_color)
-        click.echo()
-        click.secho(secret.value, fg="bright_white")
-        click.echo()
-        try:
-            pyperclip.copy(secret.value)
-            click.secho("Secret copied to clipboard!", fg=(97, 175, 239))
-        except pyperclip.PyperclipException:
-            pass
+        print_secret(kv.get_secret(name))
     except SecretNotFoundError:
         click.secho("Secret does not exist!", fg="bright_red", err=True)
         sys.exit(1)
@@ -54,3 +42,21 @@ def show_secret(kv: KeyVaultClient, name: str):
     except ClientNotInitializedError:
         click.secho("Client not initialized!", fg="bright_red", err=True)
         sys.exit(1)
+
+
+def print_secret(secret: Secret):
+    if secret.expires_on:
+        expires_color = "bright_white"
+        if secret.is_expired():
+            expires_color = "red"
+        elif secret.is_soon_expired():
+            expires_color = "yellow"
+        click.secho(f"Expires: {secret.expires_on}", fg=expires_color)
+    click.echo()
+    click.secho(secret.value, fg="bright_white")
+    click.echo()
+    try:
+        pyperclip.copy(secret.value)
+        click.secho("Secret copied to clipboard!", fg=(97, 175, 239))
+    except pyperclip.PyperclipException:
+        pass
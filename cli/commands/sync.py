@@ -0,0 +1,77 @@
+import sys
+
+import click
+
+from cli.client.keyvault_client import ClientNotInitializedError, SecretRequestError
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.sync import CREATE, SyncPlan
+from cli.commands.transfer import report_errors, report_throttling
+
+
+def sync_vaults(
+    kvs: KeyVaultClients,
+    src: str,
+    dst: str,
+    dry_run: bool = False,
+    yes: bool = False,
+    parallel: int = 8,
+):
+    state = kvs.sync_state
+    try:
+        src_url = kvs.find_client(src).vault_url
+        dst_url = kvs.find_client(dst).vault_url
+        if src_url == dst_url:
+            raise KeyError("Please choose two different vaults.")
+        state.load()
+        try:
+            plan = kvs.plan_sync(src_url, dst_url, state, parallel)
+        finally:
+            state.save()
+        print_plan(plan)
+        if plan.errors:
+            report_throttling(kvs.throttle.stats)
+            report_errors(plan.errors)
+        if not plan.changes or dry_run:
+            return
+        if not yes and not click.confirm(
+            f"Apply {len(plan.changes)} changes to {dst_url}?", err=True
+        ):
+            return
+        try:
+            errors = kvs.apply_sync(plan, state, parallel)
+        finally:
+            state.save()
+        click.secho(
+            f"Applied {len(plan.changes) - len(errors)} changes to {dst_url}",
+            fg="bright_green",
+            err=True,
+        )
+        report_throttling(kvs.throttle.stats)
+        report_errors(errors)
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretRequestError as e:
+        click.secho("Error listing the secrets!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def print_plan(plan: SyncPlan):
+    click.secho(f"Sync {plan.src_url} -> {plan.dst_url}", fg="bright_blue")
+    width = max((len(c.name) for c in plan.changes), default=0)
+    for change in plan.changes:
+        if change.action == CREATE:
+            click.secho(f"  + {change.name}", fg="green")
+        else:
+            click.secho(f"  ~ {change.name:{width}}  {', '.join(change.reasons)}", fg="yellow")
+    summary = f"{len(plan.changes)} to change, {plan.unchanged} unchanged"
+    if plan.only_in_dst:
+        summary += f", {len(plan.only_in_dst)} only in the destination"
+    if plan.skipped:
+        summary += f", {len(plan.skipped)} disabled skipped"
+    click.echo(f"{summary}.")
+    click.secho(f"Fetched {plan.fetched} values to compare.", err=True)
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from cli.client.keyvault_client import (
+    ClientNotInitializedError,
+    Secret,
+    SecretRequestError,
+)
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.secret_filter import SecretFilter
+from cli.client.throttling import ThrottleStats
+from cli.commands.formats import (
+    SecretsFormatError,
+    dump_secrets,
+    format_from_path,
+    load_secrets,
+)
+
+
+def export_secrets(
+    kvs: KeyVaultClients,
+    vault: Optional[str],
+    fmt: str,
+    output: Optional[Path] = None,
+    where: Optional[SecretFilter] = None,
+):
+    try:
+        vault_url = select_vault(kvs, vault)
+        secrets, errors = kvs.export_secrets(vault_url, where)
+        text = dump_secrets({s.name: s.value for s in secrets}, fmt)  # type: ignore
+        if output:
+            output.write_text(text)
+            click.secho(
+                f"Exported {len(secrets)} secrets to {output}", fg="bright_green", err=True
+            )
+        else:
+            click.echo(text, nl=False)
+        report_throttling(kvs.throttle.stats)
+        report_errors(errors)
+    except KeyError as e:
+        click.secho(str(e.args[0]), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretRequestError as e:
+        click.secho("Error listing the secrets!", fg="bright_red", err=True)
+        click.secho(f"Error was:\n{e}", fg="red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def import_secrets(kvs: KeyVaultClients, vault: Optional[str], fmt: Optional[str], source: str):
+    try:
+        vault_url = select_vault(kvs, vault)
+        if source == "-":
+            text = sys.stdin.read()
+        else:
+            text = Path(source).read_text()
+        values = load_secrets(text, fmt or format_from_path(source))
+        errors = kvs.import_secrets(
+            vault_url, [Secret(name, None, value) for name, value in values.items()]
+        )
+        click.secho(
+            f"Imported {len(values) - len(errors)} secrets to {vault_url}",
+            fg="bright_green",
+            err=True,
+        )
+        report_throttling(kvs.throttle.stats)
+        report_errors(errors)
+    except (KeyError, OSError) as e:
+        click.secho(str(e.args[0] if isinstance(e, KeyError) else e), fg="bright_red", err=True)
+        sys.exit(1)
+    except SecretsFormatError as e:
+        click.secho(f"Invalid input: {e}", fg="bright_red", err=True)
+        sys.exit(1)
+    except ClientNotInitializedError:
+        click.secho("Client not initialized!", fg="bright_red", err=True)
+        sys.exit(1)
+
+
+def select_vault(kvs: KeyVaultClients, vault: Optional[str]) -> str:
+    if vault:
+        return kvs.find_client(vault).vault_url  # type: ignore
+    active = [k for k, kv in kvs.clients.items() if kv.is_active]
+    if len(active) != 1:
+        raise KeyError("Please select a single vault with --vault.")
+    return active[0]
+
+
+def report_errors(errors: dict[str, Exception]):
+    if not errors:
+        return
+    for name, error in errors.items():
+        click.secho(f"  {name}: {error}", fg="red", err=True)
+    click.secho(f"{len(errors)} secrets failed!", fg="bright_red", err=True)
+    sys.exit(1)
+
+
+def report_throttling(stats: ThrottleStats):
+    if not stats.throttled:
+        return
+    click.secho(
+        f"Key Vault throttled {stats.throttled} of {stats.requests} requests, "
+        f"retried {stats.retried} and gave up on {stats.exhausted}.",
+        fg="yellow",
+        err=True,
+    )
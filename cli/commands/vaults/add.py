@@ -1,8 +1,12 @@
+import sys
+from pathlib import Path
 from urllib.parse import urlparse
 
+import click
 from InquirerPy import inquirer
 
 from cli.client.keyvault_client import KeyVaultClient
+from cli.client.onboarding import parse_vault_urls
 
 
 def add(clients, vault_url=None):
@@ -27,3 +31,46 @@ def is_valid_url(url):
         return all([result.scheme, result.netloc])
     except Exception:
         return False
+
+
+def add_from_file(clients, path: Path):
+    """Add the vaults listed in `path` with one login per tenant and one settings write."""
+    vault_urls, invalid = parse_vault_urls(path.read_text())
+    if invalid:
+        for number, line in invalid:
+            click.secho(f"Line {number}: {line} is not a vault URL", fg="bright_red", err=True)
+        sys.exit(1)
+    known = {url.rstrip("/") for url in clients.clients}
+    for vault_url in (u for u in vault_urls if u in known):
+        click.secho(f"Vault {vault_url} already exists.", fg="bright_yellow", err=True)
+    vault_urls = [u for u in vault_urls if u not in known]
+    if not vault_urls:
+        return
+
+    failed = {}
+    by_tenant: dict[str, list[str]] = {}
+    for vault_url, probe in clients.probe_vaults(vault_urls).items():
+        if probe.error:
+            failed[vault_url] = probe.error
+        else:
+            by_tenant.setdefault(probe.tenant_id, []).append(vault_url)
+    added = []
+    for tenant_id, urls in by_tenant.items():
+        click.secho(f"Logging in to tenant {tenant_id} for {len(urls)} vaults", err=True)
+        try:
+            record, logged_in_at = clients.login_for_tenant(tenant_id)
+        except Exception as e:
+            failed.update((vault_url, str(e)) for vault_url in urls)
+            continue
+        for vault_url in urls:
+            kv = KeyVaultClient(vault_url)
+            kv.use_login(record, logged_in_at)
+            added.append(kv)
+    if added:
+        clients.add_clients(added)
+        click.secho(f"Added {len(added)} vaults.", fg="bright_green", err=True)
+    if failed:
+        for vault_url, error in failed.items():
+            click.secho(f"  {vault_url}: {error}", fg="red", err=True)
+        click.secho(f"{len(failed)} vaults could not be added!", fg="bright_red", err=True)
+        sys.exit(1)
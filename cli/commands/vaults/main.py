@@ -1,19 +1,29 @@
-import click
+from pathlib import Path
 
-from cli.commands.vaults.add import add as add_cmd
-from cli.commands.vaults.login import login as login_cmd
-from cli.commands.vaults.remove import remove as remove_cmd
-from cli.commands.vaults.select import VaultsNotFoundError
-from cli.commands.vaults.select import select as select_cmd
+import click
 
 
 @click.command()
 @click.option("--vault-url", required=False, help="URL of the Key Vault")
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="Add the vault URLs listed in a file, one per line",
+)
 @click.pass_obj
-def add(vaults, vault_url):
+def add(vaults, vault_url, from_file):
     """Add a new vault"""
+    from cli.commands.vaults.add import add as add_cmd
+    from cli.commands.vaults.add import add_from_file
+
+    if vault_url and from_file:
+        raise click.UsageError("Please use either --vault-url or --from-file.")
     try:
-        add_cmd(vaults, vault_url)
+        if from_file:
+            add_from_file(vaults, from_file)
+        else:
+            add_cmd(vaults, vault_url)
     except ValueError:
         click.secho("Vault already exists.", fg="bright_yellow")
     except Exception as e:
@@ -25,6 +35,9 @@ def add(vaults, vault_url):
 @click.pass_obj
 def select(vaults, enable_all):
     """List and select vaults"""
+    from cli.commands.vaults.select import VaultsNotFoundError
+    from cli.commands.vaults.select import select as select_cmd
+
     try:
         select_cmd(vaults, enable_all)
     except VaultsNotFoundError:
@@ -42,6 +55,8 @@ def select(vaults, enable_all):
 @click.pass_obj
 def login(vaults, vault_url):
     """Login to a vault"""
+    from cli.commands.vaults.login import login as login_cmd
+
     try:
         login_cmd(vaults, vault_url)
     except KeyError:
@@ -55,6 +70,8 @@ def login(vaults, vault_url):
 @click.pass_obj
 def remove(vaults, vault_url):
     """Remove a vault"""
+    from cli.commands.vaults.remove import remove as remove_cmd
+
     try:
         remove_cmd(vaults, vault_url)
     except KeyError:
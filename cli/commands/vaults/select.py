@@ -9,6 +9,7 @@ def select(clients, enable_all=False):
     if enable_all:
         for client in clients.clients.values():
             client.is_active = True
+        clients.save()
         return
     if len(clients.clients) == 0:
         raise VaultsNotFoundError("No vaults found. Please add a vault first.")
@@ -1,12 +1,11 @@
-import asyncio
 from functools import wraps
 
-from cli.commands.vaults.add import add as add_vault
-
 
 def run_async(f):
     @wraps(f)
     def async_wrapper(*args, **kwargs):
+        import asyncio  # imported here to keep it out of the CLI startup
+
         return asyncio.run(f(*args, **kwargs))
 
     return async_wrapper
@@ -15,10 +14,20 @@ def run_async(f):
 def login(f):
     @wraps(f)
     def login_wrapper(vaults, **kwargs):
+        from cli.client.agent_client import AgentClient
+
+        if isinstance(vaults, AgentClient):
+            # the agent has logged in already
+            return f(vaults, **kwargs)
         if not vaults.clients:
+            from cli.commands.vaults.add import add as add_vault
+
             add_vault(vaults)
         vaults.login()
-        vaults.save()
-        return f(vaults, **kwargs)
+        try:
+            return f(vaults, **kwargs)
+        finally:
+            # vaults log in lazily, so new logins are only known afterwards
+            vaults.save()
 
     return login_wrapper
@@ -1,29 +1,47 @@
 import sys
+from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 
 import click
-import toml  # type: ignore
 
-from cli.azkv import azkv as azkv_cmd
-from cli.commands.check import check as check_cmd
-from cli.commands.edit import edit_list
-from cli.commands.show import show_list
+from cli.commands.duration import Duration
+from cli.commands.filters import filter_options, secret_filter
+from cli.commands.formats import FORMATS, REPORT_FORMATS
 from cli.commands.vaults.main import add as vaults_add_cmd
 from cli.commands.vaults.main import login as vaults_login_cmd
 from cli.commands.vaults.main import remove as vaults_remove_cmd
 from cli.commands.vaults.main import select as vaults_select_cmd
+from cli.client.agent_client import AgentClient, socket_path
+from cli.client.agent_client import connect as connect_agent
 from cli.decorators import login
+from cli.tracing import configure as configure_tracing
+from cli.tracing import span
 
-pyproject_file = Path(__file__).parent.parent / "pyproject.toml"
-version = toml.load(pyproject_file)["tool"]["poetry"]["version"]
+# The commands import their implementation when they run, so that '--help' and
+# '--version' do not have to load the Azure SDK, InquirerPy and friends.
+
+# commands a running agent answers, without loading the vaults in this process.
+# 'show' opens the picker, which lists the vaults here, so it is not one of them.
+AGENT_COMMANDS = ("get", "check")
 
 
 @click.group(invoke_without_command=True, no_args_is_help=True)
-@click.version_option(version)
+@click.version_option(package_name="azure-keyvault-cli")
 @click.pass_context
 @click.option("-r", "--reset", is_flag=True, default=False, help="Reset all settings")
-def azkv(ctx, reset):
+@click.option("--profile", is_flag=True, default=False, help="Print where the time went when done")
+def azkv(ctx, reset, profile):
     """A CLI tool to manage Azure Key Vault secrets"""
+    configure_tracing(profile)
+    if ctx.invoked_subcommand in AGENT_COMMANDS and not reset:
+        agent = connect_agent()
+        if agent:
+            ctx.obj = agent
+            return
+    with span("import"):
+        from cli.azkv import azkv as azkv_cmd
+
     try:
         azkv_cmd(ctx, reset)
     except ValueError:
@@ -36,8 +54,13 @@ def azkv(ctx, reset):
 
 
 @azkv.group(no_args_is_help=True)
-def vaults():
+@click.pass_context
+def vaults(ctx):
     """Manage vaults"""
+    from cli.commands.agent import reload
+
+    # a running agent loaded the vaults when it started
+    ctx.call_on_close(reload)
 
 
 vaults.add_command(vaults_add_cmd)
@@ -48,28 +71,312 @@ vaults.add_command(vaults_remove_cmd)
 
 @azkv.command()
 @click.argument("name", required=False)
+@click.option("--refresh", is_flag=True, default=False, help="Bypass the cached secret listing")
+@filter_options
 @click.pass_obj
 @login
-def show(vaults, name):
+def show(vaults, name, refresh, **filters):
     """List and show secrets"""
-    show_list(vaults, name)
+    from cli.commands.show import show_list
+
+    if refresh:
+        vaults.invalidate_listings()
+    show_list(vaults, name, secret_filter(**filters))
 
 
 @azkv.command()
 @click.argument("name", required=False)
+@click.option("--refresh", is_flag=True, default=False, help="Bypass the cached secret listing")
 @click.pass_obj
 @login
-def edit(vaults, name):
+def edit(vaults, name, refresh):
     """List and edit secrets"""
-    edit_list(vaults, name)
+    from cli.commands.agent import invalidate
+    from cli.commands.edit import edit_list
+
+    if refresh:
+        vaults.invalidate_listings()
+    try:
+        edit_list(vaults, name)
+    finally:
+        invalidate()
+
+
+@azkv.command()
+@click.argument("name")
+@click.option("--vault", required=False, help="URL or name of the vault of the secret")
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    default=25,
+    show_default=True,
+    help="Number of versions to show, the newest first",
+)
+@click.pass_obj
+@login
+def history(vaults, name: str, vault: Optional[str], limit: int):
+    """List the versions of a secret"""
+    from cli.commands.history import history as history_cmd
+
+    history_cmd(vaults, name, vault, limit)
+
+
+@azkv.command()
+@click.argument("name")
+@click.argument("old", required=False)
+@click.argument("new", required=False)
+@click.option("--vault", required=False, help="URL or name of the vault of the secret")
+@click.pass_obj
+@login
+def diff(vaults, name: str, old: Optional[str], new: Optional[str], vault: Optional[str]):
+    """Compare two versions of a secret, the previous and the current one by default"""
+    from cli.commands.history import diff as diff_cmd
+
+    diff_cmd(vaults, name, old, new, vault)
+
+
+@azkv.command()
+@click.argument("names", nargs=-1)
+@click.option(
+    "--from-file",
+    type=click.File("r"),
+    required=False,
+    help="Read secret names from a file, one per line, or '-' for stdin",
+)
+@click.option("--vault", required=False, help="URL or name of the vault to get the secrets from")
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    required=False,
+    help="Output format, json by default for more than one secret",
+)
+@click.option("--raw", is_flag=True, default=False, help="Print a single value without a newline")
+@click.pass_obj
+@login
+def get(vaults, names: tuple[str, ...], from_file, vault: Optional[str], fmt, raw: bool):
+    """Print the values of secrets"""
+    from cli.commands.formats import read_names
+
+    if isinstance(vaults, AgentClient):
+        from cli.commands.agent import get_secret, get_secrets
+    else:
+        from cli.commands.get import get_secret, get_secrets
+
+    names = names + tuple(read_names(from_file.read())) if from_file else names
+    if not names:
+        raise click.UsageError("Please pass secret names or --from-file.")
+    if len(names) == 1 and not fmt and not from_file:
+        get_secret(vaults, names[0], vault, raw)  # type: ignore
+    elif raw:
+        raise click.UsageError("--raw only works with a single secret.")
+    else:
+        get_secrets(vaults, list(names), vault, fmt or "json")  # type: ignore
 
 
 @azkv.command()
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(REPORT_FORMATS),
+    default="text",
+    help="Report format",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="Write the report to a file instead of stdout",
+)
+@click.option(
+    "--all",
+    "all_vaults",
+    is_flag=True,
+    default=False,
+    help="Check all vaults, not only active ones",
+)
+@click.option(
+    "--fail-on",
+    type=click.Choice(["expired", "soon"]),
+    required=False,
+    help=(
+        "Exit with 2 if secrets are expired, or 3 if secrets expire soon with 'soon'. "
+        "Exits with 1 if a vault could not be checked"
+    ),
+)
+@click.option(
+    "--within",
+    type=Duration(),
+    required=False,
+    help="Report secrets expiring within this time, e.g. 7d or 90d. Defaults to 15d per vault",
+)
+@click.option("--refresh", is_flag=True, default=False, help="Bypass the cached secret listing")
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Keep checking and report newly expired or soon to expire secrets",
+)
+@click.option(
+    "--interval",
+    type=Duration(),
+    default="5m",
+    show_default=True,
+    help="Time between the checks with --watch",
+)
+@filter_options
 @click.pass_obj
 @login
-def check(vaults):
+def check(
+    vaults,
+    fmt: str,
+    output: Optional[Path],
+    all_vaults: bool,
+    fail_on: Optional[str],
+    within: Optional[timedelta],
+    refresh: bool,
+    watch: bool,
+    interval: timedelta,
+    **filters,
+):
     """Check for expired secrets"""
-    check_cmd(vaults)
+    where = secret_filter(**filters)
+    if output and fmt == "text":
+        raise click.UsageError("Please choose a report format with --format to use --output.")
+    if watch:
+        if fmt != "text" or fail_on:
+            raise click.UsageError("--watch only reports as text and has no exit codes.")
+        if isinstance(vaults, AgentClient):
+            return _without_agent(
+                check,
+                fmt=fmt,
+                output=output,
+                all_vaults=all_vaults,
+                fail_on=fail_on,
+                within=within,
+                refresh=refresh,
+                watch=watch,
+                interval=interval,
+                **filters,
+            )
+        from cli.commands.check import watch as watch_cmd
+
+        watch_cmd(vaults, interval, all_vaults, within, where=where)
+        return
+    if isinstance(vaults, AgentClient):
+        from cli.commands.agent import check as agent_check_cmd
+
+        agent_check_cmd(vaults, fmt, output, all_vaults, fail_on, within, refresh, where)
+        return
+    from cli.commands.check import check as check_cmd
+
+    if refresh:
+        vaults.invalidate_listings(vaults.clients if all_vaults else None)
+    check_cmd(vaults, fmt, output, all_vaults, fail_on, within, where)
+
+
+@azkv.command()
+@click.option("--vault", required=False, help="URL or name of the vault to export")
+@click.option(
+    "-f", "--format", "fmt", type=click.Choice(FORMATS), default="json", help="Output format"
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="Write to a file instead of stdout",
+)
+@filter_options
+@click.pass_obj
+@login
+def export(vaults, vault: Optional[str], fmt: str, output: Optional[Path], **filters):
+    """Export all secrets of a vault"""
+    from cli.commands.transfer import export_secrets
+
+    export_secrets(vaults, vault, fmt, output, secret_filter(**filters))
+
+
+@azkv.command(name="import")
+@click.argument("source")
+@click.option("--vault", required=False, help="URL or name of the vault to import into")
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    required=False,
+    help="Input format, derived from the file name by default",
+)
+@click.pass_obj
+@login
+def import_(vaults, source: str, vault: Optional[str], fmt: Optional[str]):
+    """Import secrets into a vault from a file or '-' for stdin"""
+    from cli.commands.agent import invalidate
+    from cli.commands.transfer import import_secrets
+
+    try:
+        import_secrets(vaults, vault, fmt, source)
+    finally:
+        invalidate()
+
+
+@azkv.command()
+@click.argument("src")
+@click.argument("dst")
+@click.option("--dry-run", is_flag=True, default=False, help="Only print the plan")
+@click.option("-y", "--yes", is_flag=True, default=False, help="Apply without asking")
+@click.option(
+    "--parallel",
+    type=click.IntRange(1, 64),
+    default=8,
+    show_default=True,
+    help="Requests to run at the same time",
+)
+@click.pass_obj
+@login
+def sync(vaults, src: str, dst: str, dry_run: bool, yes: bool, parallel: int):
+    """Copy changed secrets from one vault to another"""
+    from cli.commands.agent import invalidate
+    from cli.commands.sync import sync_vaults
+
+    try:
+        sync_vaults(vaults, src, dst, dry_run, yes, parallel)
+    finally:
+        invalidate()
+
+
+@azkv.command()
+@click.option(
+    "--socket",
+    "path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=socket_path,
+    show_default="~/.azkv/agent.sock or AZKV_AGENT_SOCK",
+    help="Unix socket to listen on",
+)
+@click.option("--stop", is_flag=True, default=False, help="Stop the running agent")
+@click.pass_obj
+def agent(vaults, path: Path, stop: bool):
+    """Keep the vaults logged in and answer get and check"""
+    from cli.commands.agent import run_agent, stop_agent
+
+    if stop:
+        stop_agent(path)
+        return
+    login(run_agent)(vaults, path=path)
+
+
+def _without_agent(command: click.Command, **params):
+    """Run `command` with the vaults loaded in this process instead of the agent."""
+    from cli.azkv import azkv as azkv_cmd
+
+    ctx = click.get_current_context()
+    azkv_cmd(ctx)
+    return ctx.invoke(command, **params)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""Timing spans for the hot paths of the CLI.
+
+Spans are only recorded when tracing is enabled with `--profile` or the
+`AZKV_TRACE` environment variable, otherwise `span` and `traced` cost a
+flag check. At exit the spans are reported as a summary (`--profile`), as
+JSON (`AZKV_TRACE=json`) or exported to an OpenTelemetry collector
+(`AZKV_TRACE=otlp`, needs the `otel` extra).
+"""
+
+import atexit
+import contextvars
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import Any, Iterator, Optional
+
+
+@dataclass
+class Span:
+    id: int
+    name: str
+    start_ns: int
+    duration_ns: int = 0
+    parent_id: Optional[int] = None
+    thread: str = ""
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans: list[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+            "azkv_span", default=None
+        )
+        # spans are timed with perf_counter, this maps them to wall clock time
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if not self.enabled:
+            yield None
+            return
+        span = Span(
+            next(self._ids),
+            name,
+            time.perf_counter_ns(),
+            parent_id=self._current.get(),
+            thread=threading.current_thread().name,
+            attributes=attributes,
+        )
+        token = self._current.set(span.id)
+        try:
+            yield span
+        finally:
+            span.duration_ns = time.perf_counter_ns() - span.start_ns
+            self._current.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name: str, start_ns: int, **attributes: Any):
+        """Record a span that started at `start_ns` (perf_counter_ns) and ends now."""
+        if not self.enabled:
+            return
+        span = Span(
+            next(self._ids),
+            name,
+            start_ns,
+            time.perf_counter_ns() - start_ns,
+            self._current.get(),
+            threading.current_thread().name,
+            attributes,
+        )
+        with self._lock:
+            self.spans.append(span)
+
+    def wall_time_ns(self, perf_ns: int) -> int:
+        return perf_ns + self._wall_offset_ns
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attributes: Any):
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str):
+    """Record every call of the decorated function or coroutine function as a span."""
+
+    def decorator(f):
+        if inspect.iscoroutinefunction(f):
+
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await f(*args, **kwargs)
+                with tracer.span(name):
+                    return await f(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return f(*args, **kwargs)
+            with tracer.span(name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure(profile: bool = False):
+    """Enable tracing for `--profile` or `AZKV_TRACE` and report the spans at exit."""
+    trace = os.environ.get("AZKV_TRACE", "").lower()
+    if not profile and not trace:
+        return
+    tracer.enabled = True
+    start_ns = time.perf_counter_ns()
+
+    def report():
+        if profile:
+            sys.stderr.write(summary(time.perf_counter_ns() - start_ns))
+        if trace == "json":
+            sys.stderr.write(dump_json())
+        elif trace in ("otlp", "otel"):
+            export_otlp()
+
+    atexit.register(report)
+
+
+def summary(total_ns: Optional[int] = None) -> str:
+    """Count, total and maximum duration per span name, the slowest first."""
+    stats: dict[str, list[int]] = {}
+    for s in tracer.spans:
+        entry = stats.setdefault(s.name, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += s.duration_ns
+        entry[2] = max(entry[2], s.duration_ns)
+    width = max([len(name) for name in stats] + [4])
+    lines = ["", "Profile" + (f" ({total_ns / 1e6:.1f} ms)" if total_ns else "")]
+    lines.append(f"  {'span':<{width}}  {'count':>5}  {'total':>10}  {'max':>10}")
+    for name, (count, total, longest) in sorted(stats.items(), key=lambda e: -e[1][1]):
+        lines.append(
+            f"  {name:<{width}}  {count:>5}  {total / 1e6:>7.1f} ms  {longest / 1e6:>7.1f} ms"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def dump_json() -> str:
+    spans = []
+    for s in sorted(tracer.spans, key=lambda s: s.start_ns):
+        data = asdict(s)
+        data["start_ns"] = tracer.wall_time_ns(s.start_ns)
+        spans.append(data)
+    return json.dumps(spans) + "\n"
+
+
+def export_otlp():
+    """Send the spans to the OTLP collector of `OTEL_EXPORTER_OTLP_ENDPOINT`."""
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        sys.stderr.write(
+            "AZKV_TRACE=otlp needs OpenTelemetry, install azure-keyvault-cli[otel].\n"
+        )
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": "azkv"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    otel_tracer = provider.get_tracer("azkv")
+    exported: dict[int, Any] = {}
+    for s in sorted(tracer.spans, key=lambda s: s.start_ns):
+        parent = exported.get(s.parent_id) if s.parent_id else None
+        otel_span = otel_tracer.start_span(
+            s.name,
+            context=trace.set_span_in_context(parent) if parent else None,
+            start_time=tracer.wall_time_ns(s.start_ns),
+            attributes={"thread": s.thread, **s.attributes},
+        )
+        otel_span.end(end_time=tracer.wall_time_ns(s.start_ns + s.duration_ns))
+        exported[s.id] = otel_span
+    provider.shutdown()
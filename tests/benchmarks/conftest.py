@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+from emulator import FakeCredential, KeyVaultEmulator
+
+from cli.client.agent_client import connect
+from cli.client.agent_server import AgentServer
+from cli.client.keyvault_client import KeyVaultClient
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.commands.check import scan
+
+EMULATOR_OPTIONS = {"connection_verify": False, "verify_challenge_resource": False}
+
+
+@pytest.fixture
+def emulator():
+    emulators = []
+
+    def start(vaults: int = 1, secrets: int = 0, **options) -> KeyVaultEmulator:
+        emulator = KeyVaultEmulator(**options)
+        for n in range(vaults):
+            emulator.add_vault(f"kv{n}", secrets)
+        emulators.append(emulator.start())
+        return emulator
+
+    yield start
+    for emulator in emulators:
+        emulator.stop()
+
+
+@pytest.fixture
+def emulated_clients(mocker, tmp_path):
+    """KeyVaultClients for all vaults of an emulator, with a fresh settings directory."""
+    mocker.patch("cli.client.keyvault_clients.Path.home", return_value=tmp_path)
+
+    def connect(emulator: KeyVaultEmulator) -> KeyVaultClients:
+        kvs = KeyVaultClients(client_options=EMULATOR_OPTIONS)
+        credential = FakeCredential()
+        for vault_url in emulator.urls:
+            client = KeyVaultClient(vault_url)
+            client._credential = credential
+            kvs.clients[vault_url] = client
+        return kvs
+
+    return connect
+
+
+@pytest.fixture
+def agent(tmp_path):
+    """Serve KeyVaultClients with an agent, yield a client of it."""
+    agents = []
+
+    def start(kvs: KeyVaultClients):
+        path = tmp_path / "agent.sock"
+        started = threading.Event()
+        server = AgentServer(kvs, path, scan)
+        thread = threading.Thread(target=asyncio.run, args=(server.serve(started.set),))
+        thread.start()
+        started.wait(5)
+        agents.append((connect(path), thread))
+        return agents[-1][0]
+
+    yield start
+    for client, thread in agents:
+        client.stop()
+        thread.join(5)
@@ -0,0 +1,345 @@
+"""A local stand-in for the Key Vault secrets REST API.
+
+Every vault is served over TLS on its own port of 127.0.0.1 with a
+self-signed certificate, so clients need `connection_verify=False` and
+`verify_challenge_resource=False`. Requests without a bearer token get the
+Key Vault authentication challenge, any token is accepted.
+"""
+
+import asyncio
+import ipaddress
+import math
+import ssl
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+from azure.core.credentials import AccessToken
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+CHALLENGE = (
+    'Bearer authorization="https://login.microsoftonline.com/'
+    '00000000-0000-0000-0000-000000000000", resource="https://vault.azure.net"'
+)
+
+
+class FakeCredential:
+    """Sync credential that hands out tokens the emulator accepts."""
+
+    def get_token(self, *scopes, **kwargs) -> AccessToken:
+        return AccessToken("emulator-token", int(time.time()) + 3600)
+
+
+class _Vault:
+    def __init__(self, name: str):
+        self.name = name
+        self.url = ""
+        self.secrets: dict[str, list[dict]] = {}
+        self.tokens = float("inf")
+        self.refilled_at = time.monotonic()
+
+
+class KeyVaultEmulator:
+    """Serve emulated vaults until the emulator is stopped.
+
+    `latency` delays every response, `page_size` is the number of secrets per
+    listing page and `rate_limit` the number of requests per second a vault
+    accepts before it answers with 429 and Retry-After. `requests` counts the
+    requests per vault and operation, `throttled` the 429 responses.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, page_size: int = 25, rate_limit: Optional[float] = None
+    ):
+        self.latency = latency
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.requests: Counter = Counter()
+        self.throttled = 0
+        self._vaults: dict[int, _Vault] = {}
+        self._pending: list[_Vault] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ssl: Optional[ssl.SSLContext] = None
+
+    def add_vault(
+        self, name: str, count: int = 0, expires_in: Optional[timedelta] = None
+    ) -> "KeyVaultEmulator":
+        """Add a vault with `count` secrets named `secret-<n>`, before `start`."""
+        vault = _Vault(name)
+        now = datetime.now(timezone.utc)
+        for n in range(count):
+            expires_on = now + expires_in if expires_in else None
+            vault.secrets[f"secret-{n}"] = [_version(f"value-{n}", expires_on, now)]
+        self._pending.append(vault)
+        return self
+
+    def put_secret(
+        self,
+        vault: str,
+        name: str,
+        value: str,
+        updated_on: Optional[datetime] = None,
+        content_type: Optional[str] = None,
+        tags: Optional[dict] = None,
+    ):
+        """Add a version of a secret, as if it was written at `updated_on`."""
+        for v in [*self._vaults.values(), *self._pending]:
+            if v.name == vault:
+                version = _version(
+                    value, None, updated_on or datetime.now(timezone.utc), content_type, tags
+                )
+                v.secrets.setdefault(name, []).append(version)
+                return
+        raise KeyError(vault)
+
+    def url(self, name: str) -> str:
+        for vault in self._vaults.values():
+            if vault.name == name:
+                return vault.url
+        raise KeyError(name)
+
+    @property
+    def urls(self) -> list[str]:
+        return [vault.url for vault in self._vaults.values()]
+
+    def start(self) -> "KeyVaultEmulator":
+        self._ssl = _self_signed_context()
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._serve())  # type: ignore
+            started.set()
+            self._loop.run_forever()  # type: ignore
+
+        self._thread = threading.Thread(target=run, name="keyvault-emulator", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if not self._loop or not self._runner:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()  # type: ignore
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get("/secrets", self._list)
+        app.router.add_get("/secrets/{name}/versions", self._list_versions)
+        app.router.add_get("/secrets/{name}", self._get)
+        app.router.add_get("/secrets/{name}/", self._get)
+        app.router.add_get("/secrets/{name}/{version}", self._get)
+        app.router.add_put("/secrets/{name}", self._set)
+        app.router.add_patch("/secrets/{name}/", self._update)
+        app.router.add_patch("/secrets/{name}/{version}", self._update)
+        app.middlewares.append(self._middleware)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        for vault in self._pending:
+            site = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=self._ssl)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]  # type: ignore
+            vault.url = f"https://127.0.0.1:{port}"
+            self._vaults[port] = vault
+        self._pending = []
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        vault = self._vault(request)
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response(
+                {"error": {"code": "Unauthorized"}},
+                status=401,
+                headers={"WWW-Authenticate": CHALLENGE},
+            )
+        self.requests[(vault.name, handler.__name__.lstrip("_"))] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        retry_after = self._take_token(vault)
+        if retry_after:
+            self.throttled += 1
+            return web.json_response(
+                {"error": {"code": "Throttled", "message": "Too many requests"}},
+                status=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+        return await handler(request)
+
+    def _vault(self, request: web.Request) -> _Vault:
+        return self._vaults[request.transport.get_extra_info("sockname")[1]]  # type: ignore
+
+    def _take_token(self, vault: _Vault) -> int:
+        """Token bucket of `rate_limit` per second; the seconds to wait if it is empty."""
+        if not self.rate_limit:
+            return 0
+        now = time.monotonic()
+        vault.tokens = min(
+            self.rate_limit, vault.tokens + (now - vault.refilled_at) * self.rate_limit
+        )
+        vault.refilled_at = now
+        if vault.tokens >= 1:
+            vault.tokens -= 1
+            return 0
+        return max(1, math.ceil((1 - vault.tokens) / self.rate_limit))
+
+    async def _list(self, request: web.Request):
+        vault = self._vault(request)
+        items = [_item(vault, name, versions[-1]) for name, versions in vault.secrets.items()]
+        return self._page(request, items, f"{vault.url}/secrets")
+
+    async def _list_versions(self, request: web.Request):
+        vault = self._vault(request)
+        name = request.match_info["name"]
+        if name not in vault.secrets:
+            return _not_found(name)
+        items = [_item(vault, name, version, True) for version in vault.secrets[name]]
+        return self._page(request, items, f"{vault.url}/secrets/{name}/versions")
+
+    def _page(self, request: web.Request, items: list[dict], base: str):
+        page_size = min(int(request.query.get("maxresults", self.page_size)), self.page_size)
+        start = int(request.query.get("$skiptoken", 0))
+        end = start + page_size
+        next_link = f"{base}?api-version=7.4&$skiptoken={end}" if end < len(items) else None
+        return web.json_response({"value": items[start:end], "nextLink": next_link})
+
+    async def _get(self, request: web.Request):
+        vault = self._vault(request)
+        name = request.match_info["name"]
+        versions = vault.secrets.get(name)
+        if not versions:
+            return _not_found(name)
+        version_id = request.match_info.get("version")
+        if version_id:
+            versions = [v for v in versions if v["version"] == version_id]
+            if not versions:
+                return _not_found(name)
+        return web.json_response(_bundle(vault, name, versions[-1]))
+
+    async def _set(self, request: web.Request):
+        vault = self._vault(request)
+        name = request.match_info["name"]
+        body = await request.json()
+        expires_on = body.get("attributes", {}).get("exp")
+        version = _version(
+            body["value"],
+            datetime.fromtimestamp(expires_on, timezone.utc) if expires_on else None,
+            datetime.now(timezone.utc),
+            body.get("contentType"),
+            body.get("tags"),
+        )
+        vault.secrets.setdefault(name, []).append(version)
+        return web.json_response(_bundle(vault, name, version))
+
+    async def _update(self, request: web.Request):
+        vault = self._vault(request)
+        name = request.match_info["name"]
+        versions = vault.secrets.get(name)
+        if not versions:
+            return _not_found(name)
+        body = await request.json()
+        version = versions[-1]
+        for key in ("contentType", "tags"):
+            if key in body:
+                version[key] = body[key]
+        version["attributes"]["updated"] = int(time.time())
+        return web.json_response(_item(vault, name, version, True))
+
+
+def _version(
+    value: str,
+    expires_on: Optional[datetime],
+    updated_on: datetime,
+    content_type: Optional[str] = None,
+    tags: Optional[dict] = None,
+) -> dict:
+    attributes = {
+        "enabled": True,
+        "created": int(updated_on.timestamp()),
+        "updated": int(updated_on.timestamp()),
+        "recoveryLevel": "Recoverable+Purgeable",
+    }
+    if expires_on:
+        attributes["exp"] = int(expires_on.timestamp())
+    return {
+        "version": f"{time.monotonic_ns():032x}"[-32:],
+        "value": value,
+        "attributes": attributes,
+        "contentType": content_type,
+        "tags": tags,
+    }
+
+
+def _item(vault: _Vault, name: str, version: dict, with_version: bool = False) -> dict:
+    id = f"{vault.url}/secrets/{name}"
+    return {
+        "id": f"{id}/{version['version']}" if with_version else id,
+        "attributes": version["attributes"],
+        "contentType": version["contentType"],
+        "tags": version["tags"],
+    }
+
+
+def _bundle(vault: _Vault, name: str, version: dict) -> dict:
+    return {**_item(vault, name, version, True), "value": version["value"]}
+
+
+def _not_found(name: str):
+    return web.json_response(
+        {"error": {"code": "SecretNotFound", "message": f"Secret not found: {name}"}},
+        status=404,
+    )
+
+
+def _self_signed_context() -> ssl.SSLContext:
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=1))
+        .not_valid_after(now + timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        cert_file = Path(directory) / "cert.pem"
+        key_file = Path(directory) / "key.pem"
+        cert_file.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+        key_file.write_bytes(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+    return context
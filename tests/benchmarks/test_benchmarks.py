@@ -0,0 +1,229 @@
+import asyncio
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from InquirerPy import inquirer
+
+from cli.client.keyvault_secret import Secret
+from cli.client.operations import list_secrets
+from cli.client.secret_cache import SecretCache
+from cli.client.secret_filter import SecretFilter
+from cli.commands.common import Listing, _use_index
+
+ROOT = Path(__file__).parents[2]
+
+
+def run(benchmark, function, *args):
+    # network benchmarks are slow, a few rounds are enough to spot regressions
+    return benchmark.pedantic(function, args=args, rounds=3, iterations=1)
+
+
+def list_vaults(kvs):
+    """List every vault, without the metadata cache."""
+    return asyncio.run(kvs.gather_async(list_secrets(), kvs.clients)).unwrap()
+
+
+@pytest.mark.benchmark(group="listing")
+def test_list_one_vault(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=1, secrets=500, latency=0.005, page_size=25)
+    kvs = emulated_clients(kv)
+
+    listings = run(benchmark, list_vaults, kvs)
+
+    assert len(listings[kv.url("kv0")]) == 500
+
+
+@pytest.mark.benchmark(group="listing")
+def test_list_cached_vault(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=1, secrets=500, latency=0.005, page_size=25)
+    kvs = emulated_clients(kv)
+    kvs.get_secrets()
+
+    listings = run(benchmark, kvs.get_secrets)
+
+    assert len(listings[kv.url("kv0")]) == 500
+    assert kv.requests[("kv0", "list")] == 20
+
+
+@pytest.mark.benchmark(group="fan-out")
+@pytest.mark.parametrize("vaults", [1, 20])
+def test_fan_out(benchmark, emulator, emulated_clients, vaults):
+    kv = emulator(vaults=vaults, secrets=50, latency=0.02, page_size=25)
+    kvs = emulated_clients(kv)
+
+    listings = run(benchmark, list_vaults, kvs)
+
+    assert len(listings) == vaults
+
+
+@pytest.mark.benchmark(group="get")
+def test_find_secret(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=10, secrets=20, latency=0.01)
+    kvs = emulated_clients(kv)
+
+    _, secret = run(benchmark, kvs.find_secret, "secret-3")
+
+    assert secret.value == "value-3"
+
+
+@pytest.mark.benchmark(group="get")
+def test_find_many_secrets(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=2, secrets=100, latency=0.01)
+    kvs = emulated_clients(kv)
+    names = [f"secret-{n}" for n in range(100)]
+
+    found, errors = run(benchmark, kvs.find_secrets, names)
+
+    assert len(found) == 100
+    assert errors == {}
+
+
+@pytest.mark.benchmark(group="bulk")
+def test_export_vault(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=1, secrets=300, latency=0.01)
+    kvs = emulated_clients(kv)
+
+    secrets, errors = run(benchmark, kvs.export_secrets, kv.url("kv0"))
+
+    assert len(secrets) == 300
+    assert errors == {}
+
+
+@pytest.mark.benchmark(group="bulk")
+def test_export_throttled_vault(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=1, secrets=100, latency=0.005, rate_limit=200)
+    kvs = emulated_clients(kv)
+
+    secrets, errors = run(benchmark, kvs.export_secrets, kv.url("kv0"))
+
+    assert len(secrets) == 100
+    assert errors == {}
+
+
+@pytest.mark.benchmark(group="bulk")
+def test_export_without_certificates(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=1, secrets=100, latency=0.01)
+    for n in range(1000):
+        kv.put_secret("kv0", f"cert-{n}", "pfx", content_type="application/x-pkcs12")
+    kvs = emulated_clients(kv)
+    where = SecretFilter(content_types=("!application/x-pkcs12",))
+
+    secrets, errors = run(benchmark, kvs.export_secrets, kv.url("kv0"), where)
+
+    assert len(secrets) == 100
+    # the values of the certificates are never fetched, 44 pages are listed per round
+    rounds = kv.requests[("kv0", "list")] // 44
+    assert kv.requests[("kv0", "get")] == rounds * 100
+
+
+@pytest.mark.benchmark(group="sync")
+def test_sync_with_few_changes(benchmark, emulator, emulated_clients):
+    kv = emulator(vaults=2, secrets=1500, latency=0.005, page_size=25)
+    kvs = emulated_clients(kv)
+    src, dst = kv.url("kv0"), kv.url("kv1")
+    kvs.plan_sync(src, dst, kvs.sync_state)
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    for n in range(10):
+        kv.put_secret("kv0", f"secret-{n}", "changed", later)
+
+    plan = run(benchmark, kvs.plan_sync, src, dst, kvs.sync_state)
+
+    assert len(plan.changes) == 10
+    assert plan.fetched == 10
+
+
+@pytest.mark.benchmark(group="agent")
+@pytest.mark.parametrize("value_cache_seconds", [0, 60])
+def test_agent_get(benchmark, emulator, emulated_clients, agent, value_cache_seconds):
+    kv = emulator(vaults=2, secrets=10, latency=0.005)
+    kvs = emulated_clients(kv)
+    for client in kvs.clients.values():
+        client.value_cache_seconds = value_cache_seconds
+    client = agent(kvs)
+    client.get_secrets(["secret-0"])
+
+    secrets, errors = benchmark(client.get_secrets, ["secret-0"])
+
+    assert secrets["secret-0"]["value"] == "value-0"
+    assert errors == {}
+
+
+@pytest.fixture(scope="module")
+def picker_listing():
+    """Listing of 100k secrets in four vaults, as the secrets picker keeps it."""
+    words = ["db", "api", "conn", "password", "token", "storage", "redis", "cert", "service"]
+    listing = Listing(None)
+    for n in range(4):
+        vault_url = f"https://kv{n}.vault.azure.net"
+        secrets = [
+            Secret(f"{words[i % 9]}-{words[i // 9 % 9]}-{words[i // 81 % 9]}-{i}", None)
+            for i in range(25_000)
+        ]
+        listing.update(vault_url, secrets, False)
+    return listing
+
+
+@pytest.mark.benchmark(group="picker")
+# 'redcrt' is in no name, it only matches fuzzily
+@pytest.mark.parametrize("query", ["r", "redis-cert", "redcrt"])
+def test_picker_filter(benchmark, picker_listing, query):
+    prompt = inquirer.fuzzy(message="", choices=picker_listing.choices())
+    _use_index(prompt, picker_listing)
+    prompt.content_control._current_text = lambda: query
+
+    def filter_choices():
+        return asyncio.run(prompt.content_control._filter_choices(0))
+
+    choices = benchmark(filter_choices)
+
+    assert choices
+
+
+@pytest.mark.benchmark(group="memory")
+def test_cached_listing_memory(benchmark, tmp_path):
+    now = datetime.now(timezone.utc)
+    cache = SecretCache(tmp_path / "cache.json")
+    for n in range(2):
+        secrets = [
+            Secret(
+                f"secret-{i}",
+                now + timedelta(days=i % 400) if i % 3 else None,
+                updated_on=now - timedelta(seconds=i),
+                enabled=True,
+                tags={"env": "prod"} if i % 10 == 0 else None,
+            )
+            for i in range(25_000)
+        ]
+        cache.put(f"https://kv{n}.vault.azure.net", secrets)
+    cache.save()
+
+    def load():
+        loaded = SecretCache(cache.location)
+        loaded.load()
+        return loaded
+
+    benchmark(load)
+    tracemalloc.start()
+    try:
+        loaded = load()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # names, timestamps and tags included, reported only, as object sizes
+    # differ between Python versions
+    benchmark.extra_info["bytes_per_secret"] = round(size / 50_000)
+    assert len(loaded.get("https://kv0.vault.azure.net").secrets) == 25_000
+
+
+@pytest.mark.benchmark(group="startup")
+@pytest.mark.parametrize("args", [["-c", "import cli.main"], ["-m", "cli.main", "--help"]])
+def test_cold_startup(benchmark, args):
+    def start():
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True)
+
+    benchmark.pedantic(start, rounds=5, iterations=1)
@@ -0,0 +1,124 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client.keyvault_client import SecretNotFoundError, SecretThrottledError
+from cli.client.throttling import Throttle
+from cli.client.keyvault_secret import Secret
+from cli.client.operations import list_secrets
+
+
+def test_emulator_lists_pages_and_gets_secrets(emulator, emulated_clients):
+    kv = emulator(vaults=2, secrets=30, page_size=10)
+    kvs = emulated_clients(kv)
+
+    listings = asyncio.run(kvs.gather_async(list_secrets(), kvs.clients)).results
+    vault_url, secret = kvs.find_secret("secret-7")
+
+    assert [len(secrets) for secrets in listings.values()] == [30, 30]
+    assert secret.value == "value-7"
+    assert kv.requests[("kv0", "list")] == 3
+
+
+def test_emulator_sets_secrets(emulator, emulated_clients):
+    kv = emulator()
+    kvs = emulated_clients(kv)
+
+    errors = kvs.import_secrets(kv.url("kv0"), [Secret("new", None, "value")])
+    _, secret = kvs.find_secret("new")
+
+    assert errors == {}
+    assert secret.value == "value"
+
+
+def test_emulator_reports_missing_secrets(emulator, emulated_clients):
+    kvs = emulated_clients(emulator())
+
+    with pytest.raises(SecretNotFoundError):
+        kvs.find_secret("missing")
+
+
+def test_emulator_throttles_with_retry_after(emulator, emulated_clients):
+    kv = emulator(secrets=1, rate_limit=1)
+    kvs = emulated_clients(kv)
+    kvs._throttle = Throttle(attempts=1)
+    kvs.find_secret("secret-0")
+
+    with pytest.raises(SecretThrottledError) as e:
+        kvs.find_secret("secret-0")
+
+    assert e.value.retry_after == 1
+    assert kv.throttled == 1
+
+
+def test_throttled_requests_are_retried_after_retry_after(emulator, emulated_clients):
+    kv = emulator(secrets=1, rate_limit=1)
+    kvs = emulated_clients(kv)
+    kvs.find_secret("secret-0")
+
+    vault_url, secret = kvs.find_secret("secret-0")
+
+    assert secret.value == "value-0"
+    assert kv.throttled == 1
+    assert kvs.throttle.stats.retried == 1
+
+
+def test_sync_fetches_only_values_that_may_differ(emulator, emulated_clients):
+    kv = emulator(vaults=2, secrets=20)
+    kvs = emulated_clients(kv)
+    src, dst = kv.url("kv0"), kv.url("kv1")
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    kv.put_secret("kv0", "secret-3", "changed", later)
+    kv.put_secret("kv0", "new", "value", later)
+
+    first = kvs.plan_sync(src, dst, kvs.sync_state)
+    errors = kvs.apply_sync(first, kvs.sync_state)
+    kv.requests.clear()
+    kv.put_secret("kv0", "secret-5", "changed", later + timedelta(minutes=1))
+    second = kvs.plan_sync(src, dst, kvs.sync_state)
+
+    assert errors == {}
+    assert [(c.name, c.action) for c in first.changes] == [
+        ("new", "create"),
+        ("secret-3", "update"),
+    ]
+    assert first.fetched == 41
+    assert [(c.name, c.reasons) for c in second.changes] == [("secret-5", ["value"])]
+    assert second.unchanged == 20
+    assert kv.requests[("kv0", "get")] == 1
+    assert kv.requests[("kv1", "get")] == 0
+
+
+def test_sync_updates_tags_without_a_new_version(emulator, emulated_clients):
+    kv = emulator(vaults=2, secrets=1)
+    kvs = emulated_clients(kv)
+    src, dst = kv.url("kv0"), kv.url("kv1")
+    kvs.import_secrets(src, [Secret("secret-0", None, "value-0", tags={"env": "prod"})])
+
+    plan = kvs.plan_sync(src, dst, kvs.sync_state)
+    kvs.apply_sync(plan, kvs.sync_state)
+    again = kvs.plan_sync(src, dst, kvs.sync_state)
+
+    assert [(c.name, c.action, c.reasons) for c in plan.changes] == [
+        ("secret-0", "properties", ["tags"])
+    ]
+    assert kv.requests[("kv1", "update")] == 1
+    assert kv.requests[("kv1", "set")] == 0
+    assert again.changes == []
+
+
+def test_emulator_vaults_are_probed_without_login(emulator, emulated_clients):
+    kv = emulator(vaults=3)
+    kvs = emulated_clients(kv)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        unreachable = f"https://127.0.0.1:{s.getsockname()[1]}"
+
+    probes = kvs.probe_vaults([*kv.urls, unreachable])
+
+    assert {probes[url].tenant_id for url in kv.urls} == {"00000000-0000-0000-0000-000000000000"}
+    assert probes[unreachable].tenant_id is None
+    assert probes[unreachable].error
+    assert sum(kv.requests.values()) == 0
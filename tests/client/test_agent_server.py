@@ -0,0 +1,127 @@
+import asyncio
+import stat
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from cli.client.agent_client import NOT_FOUND, UNKNOWN_VAULT, AgentError, connect
+from cli.client.agent_server import AgentServer
+from cli.client.keyvault_client import SecretNotFoundError
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.commands.check import OK, Finding
+
+VAULT_URL = "https://test.vault.azure.net"
+
+
+@pytest.fixture
+def kvs(mocker):
+    kvs = mocker.MagicMock(spec=KeyVaultClients)
+    kvs.pinned_session.return_value = mocker.AsyncMock()
+    kvs.find_secrets_async = mocker.AsyncMock(
+        return_value=({"a": Secret("a", None, "1")}, {"b": SecretNotFoundError("missing")})
+    )
+    kvs.find_client.side_effect = KeyError("Vault other not found")
+    return kvs
+
+
+@pytest.fixture
+def serve(kvs, tmp_path):
+    path = tmp_path / "agent.sock"
+    check = []
+    started = threading.Event()
+    server = AgentServer(kvs, path, lambda *args: check.pop()(*args))
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(started.set),))
+    thread.start()
+    started.wait(5)
+    yield path, check
+    agent = connect(path)
+    if agent:
+        agent.stop()
+    thread.join(5)
+
+
+def test_socket_is_only_accessible_by_the_user(serve):
+    path, _ = serve
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_get_secrets(serve, kvs):
+    path, _ = serve
+    agent = connect(path)
+
+    secrets, errors = agent.get_secrets(["a", "b"])
+
+    assert secrets["a"]["value"] == "1"
+    assert errors["b"]["kind"] == NOT_FOUND
+    kvs.find_secrets_async.assert_awaited_once_with(["a", "b"], None)
+
+
+def test_get_secrets_from_unknown_vault(serve):
+    path, _ = serve
+
+    _, errors = connect(path).get_secrets(["a"], "other")
+
+    assert errors == {"a": {"kind": UNKNOWN_VAULT, "message": "Vault other not found"}}
+
+
+def test_check(serve, kvs):
+    path, check = serve
+    now = datetime.now(timezone.utc)
+    check.append(
+        lambda *args: ([Finding(VAULT_URL, "a", None, OK)], {VAULT_URL: Exception("failed")}, now)
+    )
+
+    result = connect(path).check(refresh=True)
+
+    assert result["findings"] == [
+        {"vault_url": VAULT_URL, "name": "a", "expires_on": None, "status": OK, "updated_on": None}
+    ]
+    assert result["errors"] == {VAULT_URL: "failed"}
+    assert datetime.fromisoformat(result["now"]) == now
+    kvs.invalidate_listings.assert_called_once_with(None)
+
+
+def test_unknown_request(serve):
+    path, _ = serve
+
+    with pytest.raises(AgentError, match="Unknown request: other"):
+        connect(path).request("other")
+
+
+def test_invalidate(serve, kvs):
+    path, _ = serve
+
+    connect(path).request("invalidate")
+
+    kvs.cache.invalidate.assert_called_once()
+    kvs.values.invalidate.assert_called_once()
+
+
+def test_reload(serve, kvs):
+    path, _ = serve
+
+    connect(path).request("reload")
+
+    kvs.reload.assert_called_once()
+
+
+def test_stop_removes_the_socket(serve):
+    path, _ = serve
+
+    connect(path).stop()
+
+    for _ in range(50):
+        if not path.exists():
+            break
+        threading.Event().wait(0.01)
+    assert not path.exists()
+    assert connect(path) is None
+
+
+def test_connect_without_agent(tmp_path):
+    assert connect(tmp_path / "agent.sock") is None
+    (tmp_path / "stale.sock").touch()
+    assert connect(tmp_path / "stale.sock") is None
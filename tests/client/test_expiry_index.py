@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+from cli.client.expiry_index import ExpiryIndex
+from cli.client.keyvault_secret import Secret
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def days(n):
+    return NOW + timedelta(days=n)
+
+
+def test_index_sorts_secrets_of_all_vaults_by_expiry():
+    listings = {
+        "https://a.vault.azure.net": [Secret("a1", days(10)), Secret("a2", None)],
+        "https://b.vault.azure.net": [Secret("b1", days(-1)), Secret("b2", days(3))],
+    }
+
+    index = ExpiryIndex(listings)
+
+    assert len(index) == 3
+    assert [(v, s.name) for v, s in index.between()] == [
+        ("https://b.vault.azure.net", "b1"),
+        ("https://b.vault.azure.net", "b2"),
+        ("https://a.vault.azure.net", "a1"),
+    ]
+
+
+def test_between_is_a_half_open_range():
+    index = ExpiryIndex(
+        {"https://a.vault.azure.net": [Secret(str(n), days(n)) for n in range(10)]}
+    )
+
+    assert [s.name for _, s in index.between(days(2), days(5))] == ["2", "3", "4"]
+    assert [s.name for _, s in index.between(days(8))] == ["8", "9"]
+
+
+def test_expired():
+    index = ExpiryIndex(
+        {"https://a.vault.azure.net": [Secret("old", days(-1)), Secret("now", NOW)]}
+    )
+
+    assert [s.name for _, s in index.expired(NOW)] == ["old"]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cli.client.keyvault_async_client import AsyncCredential, AsyncKeyVaultSession
+from cli.client.keyvault_client import ClientNotInitializedError, KeyVaultClient
+
+
+def make_client(mocker, vault_url, credential):
+    client = mocker.MagicMock(spec=KeyVaultClient)
+    client.vault_url = vault_url
+    client.credential = credential
+    return client
+
+
+def test_session_shares_transport_and_credential(mocker):
+    secret_client_mock = mocker.patch("cli.client.keyvault_async_client.SecretClient")
+    secret_client_mock.return_value.close = mocker.AsyncMock()
+    credential = mocker.MagicMock()
+    other_credential = mocker.MagicMock()
+    kv1 = make_client(mocker, "https://kv1.vault.azure.net", credential)
+    kv2 = make_client(mocker, "https://kv2.vault.azure.net", credential)
+    kv3 = make_client(mocker, "https://kv3.vault.azure.net", other_credential)
+
+    async def open_clients():
+        async with AsyncKeyVaultSession() as session:
+            clients = [session.client(kv) for kv in (kv1, kv2, kv3)]
+            assert session.client(kv1) is clients[0]
+
+    asyncio.run(open_clients())
+
+    c1, c2, c3 = [c.kwargs for c in secret_client_mock.call_args_list]
+    assert c1["transport"] is c2["transport"] is c3["transport"]
+    assert c1["credential"] is c2["credential"]
+    assert c1["credential"] is not c3["credential"]
+
+
+def test_session_client_requires_open_session(mocker):
+    kv = make_client(mocker, "https://kv1.vault.azure.net", mocker.MagicMock())
+
+    with pytest.raises(ClientNotInitializedError):
+        AsyncKeyVaultSession().client(kv)
+
+
+def test_open_client_logs_in_off_the_event_loop(mocker):
+    secret_client_mock = mocker.patch("cli.client.keyvault_async_client.SecretClient")
+    secret_client_mock.return_value.close = mocker.AsyncMock()
+    logged_in_on = []
+
+    def login():
+        # the browser login blocks until the user is done
+        logged_in_on.append(threading.current_thread())
+        time.sleep(0.2)
+        return mocker.MagicMock()
+
+    kv = mocker.MagicMock(spec=KeyVaultClient)
+    kv.vault_url = "https://kv1.vault.azure.net"
+    type(kv).credential = mocker.PropertyMock(side_effect=login)
+
+    async def open_client():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        async with AsyncKeyVaultSession() as session:
+            await session.open_client(kv)
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(open_client()) > 5
+    assert logged_in_on[0] is not threading.main_thread()
+
+
+def test_async_credential_delegates_to_sync_credential(mocker):
+    credential = mocker.MagicMock()
+    credential.get_token.return_value = "token"
+
+    token = asyncio.run(AsyncCredential(credential).get_token("scope", tenant_id="tenant"))
+
+    assert token == "token"
+    credential.get_token.assert_called_once_with("scope", tenant_id="tenant")
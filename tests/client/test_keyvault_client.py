@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from azure.identity import AuthenticationRecord
+
+from cli.client import keyvault_client
+from cli.client.keyvault_client import KeyVaultClient
+from cli.client.keyvault_secret import Secret
+from cli.client.value_cache import ValueCache
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_record(tenant_id="tenant"):
+    return AuthenticationRecord(
+        tenant_id, "client", "login.microsoftonline.com", "account", "user"
+    )
+
+
+@pytest.fixture(autouse=True)
+def credential_mock(mocker):
+    mocker.patch.dict(keyvault_client._credentials, clear=True)
+    mocker.patch.dict(keyvault_client._logins, clear=True)
+    mocker.patch("cli.client.keyvault_client.SecretClient")
+    credential_mock = mocker.patch("cli.client.keyvault_client.InteractiveBrowserCredential")
+    credential_mock.return_value.authenticate.return_value = make_record()
+    return credential_mock
+
+
+def make_client(vault_url, record=None, login_hours_ago=1):
+    return KeyVaultClient(
+        vault_url,
+        auth_record=record.serialize() if record else None,
+        last_login_time=datetime.now(timezone.utc) - timedelta(hours=login_hours_ago),
+    )
+
+
+def test_login_lazily_defers_login_until_first_use(credential_mock):
+    client = make_client("https://a.vault.azure.net", make_record())
+
+    client.login_lazily()
+
+    credential_mock.assert_not_called()
+    assert client.credential is credential_mock.return_value
+    credential_mock.assert_called_once()
+
+
+def test_login_lazily_with_force_reauth(credential_mock):
+    client = make_client("https://a.vault.azure.net", make_record())
+
+    client.login_lazily(force_reauth=True)
+    client.credential
+
+    credential_mock.return_value.authenticate.assert_called_once()
+
+
+def test_vaults_of_a_tenant_share_one_credential(credential_mock):
+    a = make_client("https://a.vault.azure.net", make_record())
+    b = make_client("https://b.vault.azure.net", make_record())
+    c = make_client("https://c.vault.azure.net", make_record("other"))
+
+    for client in (a, b, c):
+        client.login()
+
+    assert a.credential is b.credential
+    assert credential_mock.call_count == 2
+
+
+def test_vaults_of_a_tenant_reuse_a_fresh_login(credential_mock):
+    a = make_client("https://a.vault.azure.net", make_record(), login_hours_ago=10)
+    b = make_client("https://b.vault.azure.net", make_record(), login_hours_ago=10)
+
+    a.login()
+    b.login()
+
+    credential_mock.return_value.authenticate.assert_called_once()
+    assert b.auth_record == a.auth_record
+    assert b.last_login_time == a.last_login_time
+
+
+def test_client_without_login_is_not_initialized():
+    client = make_client("https://a.vault.azure.net", make_record())
+
+    with pytest.raises(keyvault_client.ClientNotInitializedError):
+        client.get_secret("name")
+
+
+def make_cached_client(mocker, value_cache_seconds=60):
+    client = make_client("https://a.vault.azure.net", make_record())
+    client.value_cache_seconds = value_cache_seconds
+    client.use_value_cache(ValueCache())
+    client.login()
+    secret_client = keyvault_client.SecretClient.return_value
+    secret_client.get_secret.return_value = mocker.MagicMock(value="value")
+    secret_client.get_secret.return_value.properties.name = "name"
+    secret_client.get_secret.return_value.properties.expires_on = None
+    return client, secret_client
+
+
+def test_get_secret_uses_value_cache(mocker):
+    client, secret_client = make_cached_client(mocker)
+
+    assert client.get_secret("name").value == "value"
+    assert client.get_secret("name").value == "value"
+
+    secret_client.get_secret.assert_called_once_with("name", None)
+
+
+def test_get_secret_without_value_cache(mocker):
+    client, secret_client = make_cached_client(mocker, value_cache_seconds=0)
+
+    client.get_secret("name")
+    client.get_secret("name")
+
+    assert secret_client.get_secret.call_count == 2
+
+
+def test_set_secret_invalidates_value_cache(mocker):
+    client, secret_client = make_cached_client(mocker)
+    client.get_secret("name")
+
+    client.set_secret(Secret("name", None, "new"))
+    client.get_secret("name")
+
+    assert secret_client.get_secret.call_count == 2
+
+
+def test_get_secret_of_a_version_skips_value_cache(mocker):
+    client, secret_client = make_cached_client(mocker)
+    client.get_secret("name")
+
+    client.get_secret("name", "v1")
+    client.get_secret("name", fresh=True)
+    client.get_secret("name")
+
+    assert secret_client.get_secret.call_args_list == [
+        mocker.call("name", None),
+        mocker.call("name", "v1"),
+        mocker.call("name", None),
+    ]
+
+
+def test_get_versions_pages_lazily(mocker):
+    client, secret_client = make_cached_client(mocker)
+    pages = [
+        [mocker.MagicMock(version="v1", created_on=NOW - timedelta(days=2))],
+        [mocker.MagicMock(version="v2", created_on=NOW - timedelta(days=1))],
+    ]
+    secret_client.list_properties_of_secret_versions.return_value.by_page.return_value = iter(
+        pages
+    )
+
+    versions = client.get_versions("name")
+    secret_client.list_properties_of_secret_versions.assert_not_called()
+    first = next(versions)
+
+    assert [s.version for s in first] == ["v1"]
+    assert [s.version for s in next(versions)] == ["v2"]
+    secret_client.list_properties_of_secret_versions.assert_called_once_with("name")
+
+
+def test_authenticate_to_a_tenant(credential_mock):
+    record = keyvault_client.authenticate("tenant")
+
+    assert credential_mock.call_args.kwargs["tenant_id"] == "tenant"
+    assert record == credential_mock.return_value.authenticate.return_value
+    # vaults of the tenant reuse the login
+    client = make_client("https://a.vault.azure.net", make_record(), login_hours_ago=10)
+    client.login()
+    credential_mock.return_value.authenticate.assert_called_once()
+
+
+def test_use_login_without_browser(credential_mock):
+    client = KeyVaultClient("https://a.vault.azure.net")
+
+    client.use_login(make_record(), NOW)
+
+    credential_mock.return_value.authenticate.assert_not_called()
+    assert client.credential is credential_mock.return_value
+    assert client.auth_record == make_record().serialize()
+    assert client.last_login_time == NOW
+
+
+def test_fresh_login():
+    assert make_client("https://a.vault.azure.net", make_record()).fresh_login()[0].tenant_id == (
+        "tenant"
+    )
+    assert make_client("https://a.vault.azure.net", make_record(), 10).fresh_login() is None
+    assert KeyVaultClient("https://a.vault.azure.net").fresh_login() is None
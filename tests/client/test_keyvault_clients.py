@@ -0,0 +1,672 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client import keyvault_client
+from cli.client.keyvault_async_client import AsyncKeyVaultClient, AsyncKeyVaultSession
+from cli.client.keyvault_client import KeyVaultClient, SecretNotFoundError, SecretRequestError
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.client.operations import get_secret, list_secrets
+from cli.client.secret_filter import SecretFilter
+
+
+@pytest.fixture
+def kv_clients(mocker, tmp_path):
+    mocker.patch("cli.client.keyvault_clients.Path.home", return_value=tmp_path)
+    mocker.patch.dict(keyvault_client._logins, clear=True)
+    return KeyVaultClients()
+
+
+@pytest.fixture(autouse=True)
+def async_clients(mocker):
+    clients = {}
+
+    def client(self, kv):
+        return clients[kv.vault_url]
+
+    mocker.patch.object(AsyncKeyVaultSession, "client", client)
+    return clients
+
+
+@pytest.fixture
+def make_client(mocker, async_clients):
+    def make(vault_url, is_active=True):
+        client = mocker.MagicMock(spec=KeyVaultClient)
+        client.vault_url = vault_url
+        client.is_active = is_active
+        client.cache_ttl_seconds = 300
+        client.cached_secret.return_value = None
+        async_clients[vault_url] = mocker.AsyncMock(spec=AsyncKeyVaultClient)
+        return client, async_clients[vault_url]
+
+    return make
+
+
+def sleep_and_return(seconds, value=None):
+    async def side_effect():
+        await asyncio.sleep(seconds)
+        return value
+
+    return side_effect
+
+
+def gather(kv_clients, operation):
+    outcome = asyncio.run(kv_clients.gather_async(operation, kv_clients.clients))
+    kv_clients._errors = outcome.errors
+    return outcome.unwrap()
+
+
+def test_executor_runs_vaults_concurrently(make_client, async_clients, kv_clients):
+    clients = [make_client(f"https://kv{i}.vault.azure.net")[0] for i in range(4)]
+    for client in clients:
+        async_clients[client.vault_url].get_secrets.side_effect = sleep_and_return(0.2, [])
+    kv_clients.clients = {c.vault_url: c for c in clients}
+
+    start = time.monotonic()
+    result = gather(kv_clients, list_secrets())
+
+    assert 0.2 <= time.monotonic() - start < 0.6
+    assert list(result) == [c.vault_url for c in clients]
+
+
+def test_executor_returns_partial_results(make_client, kv_clients):
+    ok, ok_async = make_client("https://ok.vault.azure.net")
+    ok_async.get_secrets.return_value = []
+    failing, failing_async = make_client("https://failing.vault.azure.net")
+    failing_async.get_secrets.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {ok.vault_url: ok, failing.vault_url: failing}
+
+    result = gather(kv_clients, list_secrets())
+
+    assert result == {"https://ok.vault.azure.net": []}
+    assert list(kv_clients.errors) == ["https://failing.vault.azure.net"]
+
+
+def test_executor_raises_when_all_vaults_fail(make_client, kv_clients):
+    failing, failing_async = make_client("https://failing.vault.azure.net")
+    failing_async.get_secrets.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {failing.vault_url: failing}
+
+    with pytest.raises(SecretRequestError):
+        gather(kv_clients, list_secrets())
+
+
+def test_executor_times_out_slow_vaults(make_client, kv_clients):
+    fast, fast_async = make_client("https://fast.vault.azure.net")
+    fast_async.get_secrets.return_value = []
+    slow, slow_async = make_client("https://slow.vault.azure.net")
+    slow_async.get_secrets.side_effect = sleep_and_return(1)
+    kv_clients.clients = {fast.vault_url: fast, slow.vault_url: slow}
+    kv_clients._timeout_seconds = 0.1
+
+    result = gather(kv_clients, list_secrets())
+
+    assert result == {"https://fast.vault.azure.net": []}
+    assert isinstance(kv_clients.errors["https://slow.vault.azure.net"], SecretRequestError)
+
+
+def test_executor_passes_vault_args(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net")
+    a_async.get_secret.return_value = Secret("x", None, "1")
+    b_async.get_secret.return_value = Secret("y", None, "2")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+
+    result = gather(kv_clients, get_secret("x", {b.vault_url: "y"}))
+
+    assert result == {a.vault_url: Secret("x", None, "1"), b.vault_url: Secret("y", None, "2")}
+    a_async.get_secret.assert_awaited_once_with("x")
+    b_async.get_secret.assert_awaited_once_with("y")
+
+
+def test_executor_streams_vaults_as_they_finish(make_client, kv_clients):
+    slow, slow_async = make_client("https://slow.vault.azure.net")
+    slow_async.get_secrets.side_effect = sleep_and_return(0.2, [])
+    fast, fast_async = make_client("https://fast.vault.azure.net")
+    fast_async.get_secrets.return_value = []
+    failing, failing_async = make_client("https://failing.vault.azure.net")
+    failing_async.get_secrets.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {c.vault_url: c for c in (slow, fast, failing)}
+
+    async def stream():
+        async with kv_clients._session() as session:
+            executor = kv_clients.executor(session)
+            return [u async for u in executor.stream(list_secrets(), kv_clients.clients)]
+
+    updates = asyncio.run(stream())
+
+    assert updates[-1] == (slow.vault_url, [])
+    assert (fast.vault_url, []) in updates
+    assert isinstance(dict(updates)[failing.vault_url], SecretRequestError)
+
+
+def test_executor_stream_cancels_unfinished_vaults(make_client, kv_clients):
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    fast, fast_async = make_client("https://fast.vault.azure.net")
+    fast_async.get_secrets.side_effect = sleep_and_return(0.05, [])
+    slow, slow_async = make_client("https://slow.vault.azure.net")
+    slow_async.get_secrets.side_effect = hang
+    kv_clients.clients = {fast.vault_url: fast, slow.vault_url: slow}
+    stop = threading.Event()
+
+    async def stream():
+        async with kv_clients._session() as session:
+            executor = kv_clients.executor(session)
+            async for vault_url, _ in executor.stream(list_secrets(), kv_clients.clients, stop):
+                assert vault_url == fast.vault_url
+                stop.set()
+
+    start = time.monotonic()
+    asyncio.run(stream())
+
+    assert cancelled.is_set()
+    assert time.monotonic() - start < 1
+
+
+def test_executor_maps_calls_with_the_limit_of_the_vaults(kv_clients):
+    running = []
+    peak = []
+
+    async def call(name):
+        running.append(name)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(name)
+        if name == "failing":
+            raise SecretRequestError("Test error")
+        if name == "slow":
+            await asyncio.sleep(1)
+        return name.upper()
+
+    async def run():
+        async with kv_clients._session() as session:
+            executor = kv_clients.executor(session, max_workers=2)
+            return await executor.map(call, ["a", "failing", "b", "slow", "c"])
+
+    kv_clients._timeout_seconds = 0.1
+    outcome = asyncio.run(run())
+
+    assert outcome.results == {"a": "A", "b": "B", "c": "C"}
+    assert list(outcome.errors) == ["failing", "slow"]
+    assert "timed out" in str(outcome.errors["slow"])
+    assert max(peak) == 2
+
+
+def test_get_secrets_lists_uncached_vaults_and_fills_cache(make_client, kv_clients):
+    client, client_async = make_client("https://a.vault.azure.net")
+    client_async.get_secrets.return_value = [Secret("secret1", None)]
+    kv_clients.clients = {client.vault_url: client}
+
+    first = kv_clients.get_secrets()
+    second = kv_clients.get_secrets()
+
+    assert first == second == {"https://a.vault.azure.net": [Secret("secret1", None)]}
+    client_async.get_secrets.assert_called_once()
+    assert kv_clients.cache.location.exists()
+
+
+def test_get_secrets_revalidates_stale_entries_in_background(make_client, kv_clients):
+    client, client_async = make_client("https://a.vault.azure.net")
+    client.cache_ttl_seconds = 0
+    client_async.get_secrets.return_value = [Secret("new", None)]
+    kv_clients.clients = {client.vault_url: client}
+    kv_clients.cache.put(client.vault_url, [Secret("old", None)])
+    kv_clients.cache.get(client.vault_url).fetched_at -= timedelta(seconds=1)
+
+    result = kv_clients.get_secrets()
+    kv_clients.wait_for_revalidation()
+
+    assert result == {"https://a.vault.azure.net": [Secret("old", None)]}
+    assert kv_clients.cache.get(client.vault_url).secrets == [Secret("new", None)]
+    # a hanging vault must not keep the command from exiting
+    assert kv_clients._revalidation.daemon
+
+
+def test_get_secrets_refreshes_stale_entries_right_away(make_client, kv_clients):
+    fresh, fresh_async = make_client("https://a.vault.azure.net")
+    stale, stale_async = make_client("https://b.vault.azure.net")
+    failing, failing_async = make_client("https://c.vault.azure.net")
+    stale.cache_ttl_seconds = failing.cache_ttl_seconds = 0
+    stale_async.get_secrets.return_value = [Secret("new", None)]
+    failing_async.get_secrets.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {c.vault_url: c for c in (fresh, stale, failing)}
+    for client in (fresh, stale, failing):
+        kv_clients.cache.put(client.vault_url, [Secret("old", None)])
+    for client in (stale, failing):
+        kv_clients.cache.get(client.vault_url).fetched_at -= timedelta(seconds=1)
+
+    result = kv_clients.get_secrets(refresh_stale=True)
+
+    assert result == {
+        fresh.vault_url: [Secret("old", None)],
+        stale.vault_url: [Secret("new", None)],
+        failing.vault_url: [Secret("old", None)],
+    }
+    fresh_async.get_secrets.assert_not_called()
+    assert list(kv_clients.errors) == [failing.vault_url]
+
+
+def test_stream_secrets_yields_pages_and_revalidated_listings(make_client, kv_clients):
+    uncached, uncached_async = make_client("https://a.vault.azure.net")
+    stale, stale_async = make_client("https://b.vault.azure.net")
+    stale.cache_ttl_seconds = 0
+    kv_clients.clients = {uncached.vault_url: uncached, stale.vault_url: stale}
+    kv_clients.cache.put(stale.vault_url, [Secret("old", None)])
+    kv_clients.cache.get(stale.vault_url).fetched_at -= timedelta(seconds=1)
+
+    async def pages(*secrets):
+        for secret in secrets:
+            yield [secret]
+
+    uncached_async.get_secrets_by_page = lambda: pages(Secret("s1", None), Secret("s2", None))
+    stale_async.get_secrets_by_page = lambda: pages(Secret("new", None))
+
+    updates = list(kv_clients.stream_secrets())
+
+    assert updates[0] == ("https://b.vault.azure.net", [Secret("old", None)], True)
+    assert sorted(updates[1:], key=lambda u: u[1][0].name) == [
+        ("https://b.vault.azure.net", [Secret("new", None)], True),
+        ("https://a.vault.azure.net", [Secret("s1", None)], False),
+        ("https://a.vault.azure.net", [Secret("s2", None)], False),
+    ]
+    assert kv_clients.cache.get(uncached.vault_url).secrets == [
+        Secret("s1", None),
+        Secret("s2", None),
+    ]
+
+
+def test_stream_secrets_filters_pages_but_caches_listings(make_client, kv_clients):
+    cached, _ = make_client("https://a.vault.azure.net")
+    uncached, uncached_async = make_client("https://b.vault.azure.net")
+    kv_clients.clients = {cached.vault_url: cached, uncached.vault_url: uncached}
+    kv_clients.cache.put(cached.vault_url, [Secret("app-old", None), Secret("web", None)])
+
+    async def pages():
+        yield [Secret("app-new", None), Secret("cert", None)]
+
+    uncached_async.get_secrets_by_page = pages
+
+    updates = list(kv_clients.stream_secrets(where=SecretFilter(prefix="app-")))
+
+    assert updates == [
+        (cached.vault_url, [Secret("app-old", None)], True),
+        (uncached.vault_url, [Secret("app-new", None)], False),
+    ]
+    assert kv_clients.cache.get(uncached.vault_url).secrets == [
+        Secret("app-new", None),
+        Secret("cert", None),
+    ]
+
+
+def test_stream_secrets_stops_listing_when_closed(make_client, kv_clients):
+    client, client_async = make_client("https://a.vault.azure.net")
+    kv_clients.clients = {client.vault_url: client}
+    listed = []
+
+    async def pages():
+        for i in range(100):
+            listed.append(i)
+            yield [Secret(f"s{i}", None)]
+            await asyncio.sleep(0.01)
+
+    client_async.get_secrets_by_page = pages
+    stop = threading.Event()
+    updates = kv_clients.stream_secrets(stop)
+
+    next(updates)
+    updates.close()
+
+    assert stop.is_set()
+    time.sleep(0.1)
+    assert len(listed) < 100
+
+
+def test_find_secret_returns_first_hit_and_cancels_the_rest(make_client, kv_clients):
+    slow, slow_async = make_client("https://slow.vault.azure.net")
+    fast, fast_async = make_client("https://fast.vault.azure.net")
+    missing, missing_async = make_client("https://missing.vault.azure.net")
+    cancelled = asyncio.Event()
+
+    async def get_slow(name):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def get_fast(name):
+        await asyncio.sleep(0.05)
+        return Secret(name, None, "value")
+
+    slow_async.get_secret.side_effect = get_slow
+    fast_async.get_secret.side_effect = get_fast
+    missing_async.get_secret.side_effect = SecretNotFoundError()
+    kv_clients.clients = {c.vault_url: c for c in (missing, fast, slow)}
+
+    start = time.monotonic()
+    vault_url, secret = kv_clients.find_secret("name")
+
+    assert time.monotonic() - start < 1
+    assert vault_url == "https://fast.vault.azure.net"
+    assert secret.value == "value"
+    assert cancelled.is_set()
+    fast_async.get_secrets.assert_not_called()
+
+
+def test_find_secret_prefers_earlier_vaults_over_faster_ones(make_client, kv_clients):
+    staging, staging_async = make_client("https://staging.vault.azure.net")
+    prod, prod_async = make_client("https://prod.vault.azure.net")
+
+    async def get_staging(name):
+        await asyncio.sleep(0.1)
+        return Secret(name, None, "staging")
+
+    staging_async.get_secret.side_effect = get_staging
+    prod_async.get_secret.return_value = Secret("name", None, "prod")
+    kv_clients.clients = {c.vault_url: c for c in (staging, prod)}
+
+    vault_url, secret = kv_clients.find_secret("name")
+
+    assert vault_url == staging.vault_url
+    assert secret.value == "staging"
+
+
+def test_find_secret_only_asks_given_vaults(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net", is_active=False)
+    b_async.get_secret.return_value = Secret("name", None, "value")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+
+    vault_url, _ = kv_clients.find_secret("name", [b.vault_url])
+
+    assert vault_url == b.vault_url
+    a_async.get_secret.assert_not_called()
+
+
+def test_locate_secret_uses_cached_listings(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+    kv_clients.cache.put(b.vault_url, [Secret("name", None)])
+
+    assert kv_clients.locate_secret("name") == b.vault_url
+    a_async.get_secret.assert_not_called()
+    b_async.get_secret.assert_not_called()
+
+
+def test_locate_secret_lists_the_vaults_if_not_cached(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+    kv_clients.cache.put(a.vault_url, [Secret("other", None)])
+    a_async.get_secrets.return_value = [Secret("other", None)]
+    b_async.get_secrets.return_value = [Secret("name", None)]
+
+    assert kv_clients.locate_secret("name") == b.vault_url
+    a_async.get_secret.assert_not_called()
+    b_async.get_secret.assert_not_called()
+    assert kv_clients.cache.get(b.vault_url).secrets == [Secret("name", None)]
+
+
+def test_locate_secret_not_listed(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    kv_clients.clients = {a.vault_url: a}
+    a_async.get_secrets.return_value = [Secret("other", None)]
+
+    with pytest.raises(SecretNotFoundError):
+        kv_clients.locate_secret("name")
+
+
+def test_invalidate_listings_of_active_vaults(make_client, kv_clients):
+    active, _ = make_client("https://a.vault.azure.net")
+    inactive, _ = make_client("https://b.vault.azure.net", is_active=False)
+    kv_clients.clients = {active.vault_url: active, inactive.vault_url: inactive}
+    kv_clients.cache.put(active.vault_url, [Secret("a", None)])
+    kv_clients.cache.put(inactive.vault_url, [Secret("b", None)])
+
+    kv_clients.invalidate_listings()
+
+    assert kv_clients.cache.get(active.vault_url) is None
+    assert kv_clients.cache.get(inactive.vault_url).secrets == [Secret("b", None)]
+
+
+def test_find_secret_not_found(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net")
+    a_async.get_secret.side_effect = SecretNotFoundError()
+    b_async.get_secret.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+
+    with pytest.raises(SecretNotFoundError):
+        kv_clients.find_secret("name")
+    assert list(kv_clients.errors) == [b.vault_url]
+
+
+def test_find_secret_raises_when_all_vaults_fail(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    a_async.get_secret.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {a.vault_url: a}
+
+    with pytest.raises(SecretRequestError, match="Test error"):
+        kv_clients.find_secret("name")
+
+
+def test_find_secrets_uses_one_session(mocker, make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    b, b_async = make_client("https://b.vault.azure.net")
+
+    async def get_a(name):
+        if name == "only-in-b":
+            raise SecretNotFoundError()
+        return Secret(name, None, "a")
+
+    a_async.get_secret.side_effect = get_a
+    b_async.get_secret.side_effect = lambda name: Secret(name, None, "b")
+    kv_clients.clients = {a.vault_url: a, b.vault_url: b}
+    session = mocker.spy(AsyncKeyVaultSession, "__aenter__")
+
+    found, errors = kv_clients.find_secrets(["only-in-b", "only-in-b"])
+
+    assert session.call_count == 1
+    assert list(found) == ["only-in-b"]
+    assert found["only-in-b"].value == "b"
+    assert errors == {}
+
+
+def test_find_secrets_async_runs_on_the_callers_loop(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+    a_async.get_secret.side_effect = lambda name: Secret(name, None, "a")
+    kv_clients.clients = {a.vault_url: a}
+
+    async def find():
+        return await kv_clients.find_secrets_async(["name"])
+
+    found, errors = asyncio.run(find())
+
+    assert found["name"].value == "a"
+    assert errors == {}
+
+
+def test_find_secrets_reports_errors_by_name(make_client, kv_clients):
+    a, a_async = make_client("https://a.vault.azure.net")
+
+    async def get(name):
+        if name == "missing":
+            raise SecretNotFoundError()
+        if name == "failing":
+            raise SecretRequestError("Test error")
+        return Secret(name, None, "value")
+
+    a_async.get_secret.side_effect = get
+    kv_clients.clients = {a.vault_url: a}
+
+    found, errors = kv_clients.find_secrets(["failing", "ok", "missing"])
+
+    assert list(found) == ["ok"]
+    assert list(errors) == ["failing", "missing"]
+    assert isinstance(errors["failing"], SecretRequestError)
+    assert isinstance(errors["missing"], SecretNotFoundError)
+
+
+def test_login_is_lazy(make_client, kv_clients):
+    a, _ = make_client("https://a.vault.azure.net")
+    kv_clients.clients = {a.vault_url: a}
+
+    kv_clients.login()
+
+    a.login_lazily.assert_called_once_with(True)
+    a.login.assert_not_called()
+
+
+def test_login_forces_reauth_only_when_the_last_login_is_old(mocker, kv_clients):
+    client = KeyVaultClient("https://a.vault.azure.net")
+    kv_clients.add_client(client)
+    mocker.patch.object(client, "login_lazily")
+    kv_clients.login()
+    # the forced login happens when the vault is used
+    mocker.patch.dict(keyvault_client._logins, {"tenant": (None, datetime.now(timezone.utc))})
+    kv_clients.save()
+    loaded = KeyVaultClients()
+    loaded.load()
+    loaded_client = loaded.clients[client.vault_url]
+    mocker.patch.object(loaded_client, "login_lazily")
+
+    loaded.login()
+
+    client.login_lazily.assert_called_once_with(True)
+    loaded_client.login_lazily.assert_called_once_with(False)
+
+
+def test_login_without_using_a_vault_keeps_forcing_reauth(mocker, kv_clients):
+    client = KeyVaultClient("https://a.vault.azure.net")
+    kv_clients.add_client(client)
+    mocker.patch.object(client, "login_lazily")
+    kv_clients.login()
+    kv_clients.save()
+    loaded = KeyVaultClients()
+    loaded.load()
+    loaded_client = loaded.clients[client.vault_url]
+    mocker.patch.object(loaded_client, "login_lazily")
+
+    loaded.login()
+
+    loaded_client.login_lazily.assert_called_once_with(True)
+
+
+def test_save_skips_unchanged_settings(kv_clients):
+    kv_clients.add_client(KeyVaultClient("https://a.vault.azure.net"))
+    kv_clients.location.write_text("untouched")
+
+    kv_clients.save()
+
+    assert kv_clients.location.read_text() == "untouched"
+    kv_clients.clients["https://a.vault.azure.net"].is_active = False
+    kv_clients.save()
+    assert (
+        json.loads(kv_clients.location.read_text())["vaults"]["https://a.vault.azure.net"][
+            "is_active"
+        ]
+        is False
+    )
+
+
+def test_add_clients_writes_settings_once(mocker, kv_clients):
+    save = mocker.spy(kv_clients._settings, "save")
+    kv_clients.add_clients([KeyVaultClient(f"https://kv{i}.vault.azure.net") for i in range(40)])
+
+    save.assert_called_once()
+    assert len(json.loads(kv_clients.location.read_text())["vaults"]) == 40
+    with pytest.raises(ValueError):
+        kv_clients.add_clients([KeyVaultClient("https://kv0.vault.azure.net")])
+
+
+def test_login_for_tenant_reuses_a_fresh_login(mocker, kv_clients):
+    client = mocker.MagicMock(spec=KeyVaultClient)
+    record = mocker.MagicMock(tenant_id="tenant")
+    client.fresh_login.return_value = (record, "logged in at")
+    kv_clients.clients = {"https://a.vault.azure.net": client}
+    authenticate = mocker.patch("cli.client.keyvault_clients.authenticate")
+
+    assert kv_clients.login_for_tenant("tenant") == (record, "logged in at")
+    authenticate.assert_not_called()
+    assert kv_clients.login_for_tenant("other")[0] is authenticate.return_value
+    authenticate.assert_called_once_with("other")
+
+
+def test_load_does_not_count_as_change(kv_clients):
+    kv_clients.add_client(KeyVaultClient("https://a.vault.azure.net"))
+    loaded = KeyVaultClients()
+    loaded.load()
+    loaded.location.write_text("untouched")
+
+    loaded.save()
+
+    assert loaded.location.read_text() == "untouched"
+
+
+def test_reload_picks_up_changes_and_keeps_unchanged_vaults(kv_clients):
+    kv_clients.add_clients(
+        [KeyVaultClient(f"https://{name}.vault.azure.net") for name in ("a", "b", "c")]
+    )
+    unchanged = kv_clients.clients["https://a.vault.azure.net"]
+    changed = kv_clients.clients["https://b.vault.azure.net"]
+    other = KeyVaultClients()
+    other.load()
+    other.clients["https://b.vault.azure.net"].is_active = False
+    other.remove_client(other.clients["https://c.vault.azure.net"])
+    other.add_client(KeyVaultClient("https://d.vault.azure.net"))
+
+    kv_clients.reload()
+
+    assert list(kv_clients.clients) == [
+        "https://a.vault.azure.net",
+        "https://b.vault.azure.net",
+        "https://d.vault.azure.net",
+    ]
+    assert kv_clients.clients["https://a.vault.azure.net"] is unchanged
+    assert kv_clients.clients["https://b.vault.azure.net"] is not changed
+    assert kv_clients.clients["https://b.vault.azure.net"].is_active is False
+
+
+def test_watch_secrets_lists_vaults_every_interval(mocker, make_client, kv_clients):
+    ok, ok_async = make_client("https://ok.vault.azure.net")
+    failing, failing_async = make_client("https://failing.vault.azure.net")
+    ok_async.get_secrets.return_value = [Secret("secret", None)]
+    failing_async.get_secrets.side_effect = SecretRequestError("Test error")
+    kv_clients.clients = {ok.vault_url: ok, failing.vault_url: failing}
+    session = mocker.spy(AsyncKeyVaultSession, "__aenter__")
+    stop = threading.Event()
+
+    cycles = []
+    for listings, errors in kv_clients.watch_secrets(list(kv_clients.clients), 0.05, stop):
+        cycles.append((listings, list(errors)))
+        if len(cycles) == 3:
+            stop.set()
+
+    assert cycles == [({ok.vault_url: [Secret("secret", None)]}, [failing.vault_url])] * 3
+    assert session.call_count == 1
+    assert kv_clients.cache.get(ok.vault_url).secrets == [Secret("secret", None)]
+
+
+def test_find_secret_answers_from_value_cache(make_client, kv_clients):
+    cached, cached_async = make_client("https://cached.vault.azure.net")
+    cached.cached_secret.return_value = Secret("name", None, "value")
+    kv_clients.clients = {cached.vault_url: cached}
+
+    vault_url, secret = kv_clients.find_secret("name")
+
+    assert (vault_url, secret.value) == ("https://cached.vault.azure.net", "value")
+    cached_async.get_secret.assert_not_called()
@@ -0,0 +1,28 @@
+import dataclasses
+from datetime import datetime, timedelta, timezone
+
+from cli.client.keyvault_secret import Secret
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_secret_has_no_instance_dict():
+    secret = Secret("name", None)
+
+    assert not hasattr(secret, "__dict__")
+    assert Secret.__slots__ == tuple(f.name for f in dataclasses.fields(Secret))
+
+
+def test_secret_works_as_a_dataclass():
+    secret = Secret("name", None, "value", tags={"env": "prod"})
+
+    assert dataclasses.replace(secret, value="other") == Secret(
+        "name", None, "other", tags={"env": "prod"}
+    )
+    assert dataclasses.asdict(secret)["tags"] == {"env": "prod"}
+
+
+def test_secret_is_soon_expired_within_default_window():
+    assert Secret("name", NOW + timedelta(days=14)).is_soon_expired(NOW)
+    assert not Secret("name", NOW + timedelta(days=16)).is_soon_expired(NOW)
+    assert Secret("name", NOW + timedelta(days=16)).is_soon_expired(NOW, timedelta(days=30))
@@ -0,0 +1,40 @@
+from cli.client.onboarding import parse_vault_urls, tenant_from_challenge
+
+
+def test_parse_vault_urls():
+    text = "\n".join(
+        [
+            "# prod",
+            "https://a.vault.azure.net/",
+            "",
+            '  "https://b.vault.azure.net"  ',
+            "https://a.vault.azure.net",
+            "a.vault.azure.net",
+            "ftp://c.vault.azure.net",
+            "https://d.vault.azure.net/secrets",
+        ]
+    )
+
+    urls, invalid = parse_vault_urls(text)
+
+    assert urls == ["https://a.vault.azure.net", "https://b.vault.azure.net"]
+    assert invalid == [
+        (6, "a.vault.azure.net"),
+        (7, "ftp://c.vault.azure.net"),
+        (8, "https://d.vault.azure.net/secrets"),
+    ]
+
+
+def test_tenant_from_challenge():
+    assert (
+        tenant_from_challenge(
+            'Bearer authorization="https://login.microsoftonline.com/tenant-id", '
+            'resource="https://vault.azure.net"'
+        )
+        == "tenant-id"
+    )
+    assert (
+        tenant_from_challenge('Bearer authorization_uri="https://login.windows.net/tenant-id/"')
+        == "tenant-id"
+    )
+    assert tenant_from_challenge('Basic realm="x"') is None
@@ -0,0 +1,28 @@
+import pytest
+
+from cli.client.keyvault_client import SecretRequestError
+from cli.client.operations import Outcome, get_secret
+
+
+def test_operation_uses_vault_args_over_default_args():
+    operation = get_secret("default", {"https://b.vault.azure.net": "other"})
+
+    assert operation.args_for("https://a.vault.azure.net") == ("default",)
+    assert operation.args_for("https://b.vault.azure.net") == ("other",)
+
+
+def test_outcome_unwrap_returns_partial_results():
+    outcome = Outcome({"a": 1}, {"b": SecretRequestError("Test error")})
+
+    assert outcome.unwrap() == {"a": 1}
+
+
+def test_outcome_unwrap_raises_when_every_vault_failed():
+    outcome = Outcome({}, {"a": SecretRequestError("first"), "b": ValueError("second")})
+
+    with pytest.raises(SecretRequestError, match="first"):
+        outcome.unwrap()
+
+
+def test_outcome_unwrap_without_vaults():
+    assert Outcome().unwrap() == {}
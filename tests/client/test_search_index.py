@@ -0,0 +1,78 @@
+import pytest
+
+from cli.client.keyvault_secret import Secret
+from cli.client.search_index import SearchIndex, vault_label
+
+SECRETS = [
+    Secret("db-password", None),
+    Secret("api-key", None, tags={"owner": "Payments"}),
+    Secret("DB_USER", None),
+    Secret("redis-connection", None),
+]
+
+
+def test_vault_label():
+    assert vault_label("https://kv-prod.vault.azure.net/") == "kv-prod"
+
+
+def test_index_finds_substrings_of_names_ignoring_case():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS)
+
+    assert index.label == "test"
+    assert len(index) == 4
+    assert index.search("DB_") == [2]
+    assert index.search("conn") == [3]
+    assert index.search("pass") == [0]
+    assert index.search("word") == [0]
+    assert index.search("dbuser") == []
+
+
+def test_index_finds_tags():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS)
+
+    assert index.search("payments") == [1]
+    assert index.search("owner=pay") == [1]
+
+
+def test_short_queries_match_the_start_of_words():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS)
+
+    assert index.search("db") == [0, 2]
+    assert index.search("k") == [1]
+    assert index.search("or") == []
+
+
+def test_candidates_contain_every_character_not_shown_anyway():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS)
+
+    assert index.candidates("dbpw") == [0]
+    assert index.candidates("DBUS") == [2]
+    assert index.candidates("rdscn") == [3]
+    assert index.candidates("test api", shown="[test] ") == [1]
+    assert index.candidates("test", shown="[test] ") == [0, 1, 2, 3]
+    assert index.candidates("payments") == []
+
+
+def test_index_is_extended_with_added_secrets():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS[:2])
+
+    index.add(SECRETS[2:])
+
+    assert index.search("db") == [0, 2]
+
+
+def test_index_roundtrip():
+    index = SearchIndex("https://test.vault.azure.net", SECRETS)
+
+    loaded = SearchIndex.from_dict("https://test.vault.azure.net", SECRETS, index.to_dict())
+
+    for query in ("db", "k", "conn", "payments", "nothing"):
+        assert loaded.search(query) == index.search(query)
+        assert loaded.candidates(query) == index.candidates(query)
+
+
+def test_index_of_other_secrets_is_not_loaded():
+    data = SearchIndex("https://test.vault.azure.net", SECRETS).to_dict()
+
+    with pytest.raises(ValueError):
+        SearchIndex.from_dict("https://test.vault.azure.net", SECRETS[:1], data)
@@ -0,0 +1,123 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from cli.client.keyvault_secret import Secret
+from cli.client.search_index import SearchIndex
+from cli.client.secret_cache import SecretCache
+
+
+def test_cache_roundtrip(tmp_path):
+    expires_on = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put(
+        "https://test.vault.azure.net",
+        [Secret("secret1", expires_on, enabled=True, tags={"env": "dev"})],
+    )
+    cache.save()
+
+    loaded = SecretCache(tmp_path / "cache.json")
+    loaded.load()
+
+    entry = loaded.get("https://test.vault.azure.net")
+    assert entry is not None
+    assert entry.secrets == [Secret("secret1", expires_on, enabled=True, tags={"env": "dev"})]
+
+
+def test_cache_never_stores_values(tmp_path):
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put("https://test.vault.azure.net", [Secret("secret1", None, "value")])
+    cache.save()
+
+    data = json.loads((tmp_path / "cache.json").read_text())
+    [stored] = data["https://test.vault.azure.net"]["secrets"]
+    assert stored["name"] == "secret1"
+    assert "value" not in stored
+
+
+def test_cache_entry_is_stale_after_ttl(tmp_path):
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put("https://test.vault.azure.net", [])
+    entry = cache.get("https://test.vault.azure.net")
+    assert entry is not None
+
+    assert entry.is_stale(300) is False
+    entry.fetched_at -= timedelta(seconds=301)
+    assert entry.is_stale(300) is True
+
+
+def test_cache_invalidate(tmp_path):
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put("https://a.vault.azure.net", [])
+    cache.put("https://b.vault.azure.net", [])
+
+    cache.invalidate("https://a.vault.azure.net")
+    assert cache.get("https://a.vault.azure.net") is None
+    assert cache.get("https://b.vault.azure.net") is not None
+
+    cache.invalidate()
+    assert cache.get("https://b.vault.azure.net") is None
+
+
+def test_cache_load_ignores_broken_file(tmp_path):
+    (tmp_path / "cache.json").write_text("{broken")
+    cache = SecretCache(tmp_path / "cache.json")
+
+    cache.load()
+
+    assert cache.get("https://test.vault.azure.net") is None
+
+
+def test_expiry_index_is_kept_until_the_cache_changes(tmp_path):
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put("https://a.vault.azure.net", [Secret("a", datetime.now(timezone.utc))])
+
+    index = cache.expiry_index(["https://a.vault.azure.net"])
+
+    assert len(index) == 1
+    assert cache.expiry_index(["https://a.vault.azure.net"]) is index
+    cache.put("https://a.vault.azure.net", [])
+    assert len(cache.expiry_index(["https://a.vault.azure.net"])) == 0
+
+
+def test_search_index_is_persisted_with_the_cache(tmp_path, mocker):
+    vault_url = "https://test.vault.azure.net"
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put(vault_url, [Secret("db-password", None), Secret("api-key", None)])
+    index = cache.search_index(vault_url, cache.get(vault_url).secrets)
+    cache.save()
+
+    loaded = SecretCache(tmp_path / "cache.json")
+    loaded.load()
+    build = mocker.patch.object(SearchIndex, "add")
+    reloaded = loaded.search_index(vault_url, loaded.get(vault_url).secrets)
+
+    # only the empty index from_dict fills in
+    build.assert_called_once_with(())
+    assert reloaded.search("key") == index.search("key") == [1]
+    assert loaded.search_index(vault_url, loaded.get(vault_url).secrets) is reloaded
+
+
+def test_search_index_is_rebuilt_when_the_listing_changes(tmp_path):
+    vault_url = "https://test.vault.azure.net"
+    cache = SecretCache(tmp_path / "cache.json")
+    cache.put(vault_url, [Secret("db-password", None)])
+    cache.search_index(vault_url, cache.get(vault_url).secrets)
+    cache.save()
+
+    cache.put(vault_url, [Secret("api-key", None)])
+    index = cache.search_index(vault_url, cache.get(vault_url).secrets)
+    cache.save()
+
+    assert index.search("key") == [0]
+    data = json.loads((tmp_path / "search.json").read_text())
+    assert data[vault_url]["size"] == 1
+
+
+def test_search_index_of_uncached_secrets_is_not_kept(tmp_path):
+    cache = SecretCache(tmp_path / "cache.json")
+
+    index = cache.search_index("https://test.vault.azure.net", [Secret("api-key", None)])
+    cache.save()
+
+    assert index.search("key") == [0]
+    assert not (tmp_path / "search.json").exists()
@@ -0,0 +1,66 @@
+import pytest
+
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_filter import SecretFilter, parse_tags
+
+
+def secret(name="app-db", enabled=True, content_type=None, **tags) -> Secret:
+    return Secret(name, None, enabled=enabled, content_type=content_type, tags=tags or None)
+
+
+def test_empty_filter_keeps_the_listing():
+    secrets = [secret(), secret(enabled=False)]
+
+    assert not SecretFilter()
+    assert SecretFilter().apply(secrets) is secrets
+
+
+def test_filter_by_prefix_and_enabled_state():
+    where = SecretFilter(enabled_only=True, prefix="app-")
+
+    assert where.matches(secret("app-db"))
+    assert not where.matches(secret("web-db"))
+    assert not where.matches(secret("app-db", enabled=False))
+
+
+def test_filter_by_tags_needs_every_tag():
+    where = SecretFilter(tags=(("env", "prod"), ("team", "")))
+
+    assert where.matches(secret(env="prod", team=""))
+    assert not where.matches(secret(env="prod"))
+    assert not where.matches(secret(env="dev", team=""))
+    assert not where.matches(secret())
+
+
+def test_filter_by_content_type():
+    where = SecretFilter(content_types=("text/plain", "application/json"))
+
+    assert where.matches(secret(content_type="Text/Plain"))
+    assert not where.matches(secret(content_type="application/x-pkcs12"))
+    assert not where.matches(secret())
+
+
+def test_filter_out_content_type():
+    where = SecretFilter(content_types=("!application/x-pkcs12", "!application/x-pem-file"))
+
+    assert where.matches(secret(content_type="text/plain"))
+    assert where.matches(secret())
+    assert not where.matches(secret(content_type="application/x-pkcs12"))
+
+
+def test_filter_round_trips_as_dict():
+    where = SecretFilter((("env", "prod"),), ("!a/b",), True, "app-")
+
+    assert SecretFilter.from_dict(where.to_dict()) == where
+
+
+def test_parse_tags():
+    assert parse_tags(["env=prod", "query=a=b", "empty="]) == (
+        ("env", "prod"),
+        ("query", "a=b"),
+        ("empty", ""),
+    )
+    with pytest.raises(ValueError):
+        parse_tags(["env"])
+    with pytest.raises(ValueError):
+        parse_tags(["=prod"])
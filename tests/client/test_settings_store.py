@@ -0,0 +1,117 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client.settings_store import SettingsStore, write_atomic
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SettingsStore(tmp_path / "settings.json")
+
+
+def test_load_missing_file(store):
+    assert store.load() == {}
+    assert store.logged_in_at is None
+
+
+def test_load_settings_of_older_versions(store):
+    store.location.write_text(json.dumps({"https://a.vault.azure.net": {"is_active": True}}))
+
+    assert store.load() == {"https://a.vault.azure.net": {"is_active": True}}
+
+
+def test_load_broken_file(store):
+    store.location.write_text("{")
+
+    with pytest.raises(ValueError):
+        store.load()
+
+
+def test_save_and_load(store, tmp_path):
+    store.logged_in_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    assert store.save({"https://a.vault.azure.net": {"is_active": True}})
+
+    loaded = SettingsStore(tmp_path / "settings.json")
+    assert loaded.load() == {"https://a.vault.azure.net": {"is_active": True}}
+    assert loaded.logged_in_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_save_skips_unchanged_settings(store):
+    store.save({"https://a.vault.azure.net": {"is_active": True}})
+    mtime = store.location.stat().st_mtime_ns
+
+    assert not store.save({"https://a.vault.azure.net": {"is_active": True}})
+    assert store.location.stat().st_mtime_ns == mtime
+
+
+def test_save_merges_changes_of_other_processes(store, tmp_path):
+    store.load()
+    other = SettingsStore(tmp_path / "settings.json")
+    other.load()
+    other.save({"https://b.vault.azure.net": {"is_active": True}})
+
+    store.save({"https://a.vault.azure.net": {"is_active": True}})
+
+    assert SettingsStore(tmp_path / "settings.json").load() == {
+        "https://a.vault.azure.net": {"is_active": True},
+        "https://b.vault.azure.net": {"is_active": True},
+    }
+
+
+def test_save_removes_vaults(store, tmp_path):
+    store.save({"https://a.vault.azure.net": {}, "https://b.vault.azure.net": {}})
+
+    store.save({"https://a.vault.azure.net": {}})
+
+    assert SettingsStore(tmp_path / "settings.json").load() == {"https://a.vault.azure.net": {}}
+
+
+def test_save_replace(store, tmp_path):
+    other = SettingsStore(tmp_path / "settings.json")
+    other.save({"https://b.vault.azure.net": {}})
+
+    store.save({}, replace=True)
+
+    assert SettingsStore(tmp_path / "settings.json").load() == {}
+
+
+def test_concurrent_saves_keep_all_vaults(tmp_path):
+    stores = [SettingsStore(tmp_path / "settings.json") for _ in range(8)]
+    for store in stores:
+        store.load()
+    threads = [
+        threading.Thread(target=store.save, args=({f"https://kv{i}.vault.azure.net": {}},))
+        for i, store in enumerate(stores)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(SettingsStore(tmp_path / "settings.json").load()) == 8
+
+
+@pytest.mark.parametrize(
+    "logged_in_at, expected",
+    [
+        (None, False),
+        (datetime.now(timezone.utc) - timedelta(hours=1), True),
+        (datetime.now(timezone.utc) - timedelta(hours=25), False),
+    ],
+)
+def test_is_logged_in(store, logged_in_at, expected):
+    store.logged_in_at = logged_in_at
+
+    assert store.is_logged_in(24) is expected
+
+
+def test_write_atomic_leaves_no_temporary_files(tmp_path):
+    write_atomic(tmp_path / "file.json", "data")
+
+    assert (tmp_path / "file.json").read_text() == "data"
+    assert [p.name for p in tmp_path.iterdir()] == ["file.json"]
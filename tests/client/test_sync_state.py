@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from cli.client.keyvault_secret import Secret
+from cli.client.sync import SyncState
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+VAULT = "https://test.vault.azure.net"
+
+
+def test_hash_is_known_until_the_secret_is_updated(tmp_path):
+    state = SyncState(tmp_path / "sync.json")
+    state.record(VAULT, "name", NOW, state.digest("value"))
+
+    assert state.known(VAULT, Secret("name", None, updated_on=NOW)) == state.digest("value")
+    assert state.known(VAULT, Secret("name", None, updated_on=NOW + timedelta(seconds=1))) is None
+    assert state.known(VAULT, Secret("other", None, updated_on=NOW)) is None
+
+
+def test_state_roundtrip_keeps_the_key(tmp_path):
+    state = SyncState(tmp_path / "sync.json")
+    state.record(VAULT, "name", NOW, state.digest("value"))
+    state.save()
+
+    loaded = SyncState(tmp_path / "sync.json")
+    loaded.load()
+
+    assert loaded.known(VAULT, Secret("name", None, updated_on=NOW)) == loaded.digest("value")
+
+
+def test_hashes_are_keyed_per_state(tmp_path):
+    a = SyncState(tmp_path / "a.json")
+    b = SyncState(tmp_path / "b.json")
+
+    assert a.digest("value") != b.digest("value")
+    assert "value" not in a.digest("value")
+
+
+def test_load_ignores_broken_file(tmp_path):
+    (tmp_path / "sync.json").write_text("{not json")
+    state = SyncState(tmp_path / "sync.json")
+
+    state.load()
+
+    assert state.known(VAULT, Secret("name", None)) is None
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from cli.client.keyvault_client import SecretRequestError, SecretThrottledError, request_error
+from cli.client.throttling import RetryBudget, Throttle, ThrottlingPolicy, TokenBucket
+
+VAULT_URL = "https://test.vault.azure.net"
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+
+def test_bucket_halves_rate_and_waits_for_retry_after():
+    bucket = TokenBucket(rate=8)
+
+    bucket.throttled(2)
+    bucket.throttled(None)
+
+    assert bucket.rate == 2
+    assert bucket.reserve() == pytest.approx(2, abs=0.01)
+
+
+def test_bucket_recovers_rate_after_successes():
+    bucket = TokenBucket(rate=8)
+    bucket.throttled(None)
+
+    for _ in range(4):
+        bucket.succeeded()
+
+    assert bucket.rate == pytest.approx(5, abs=0.1)
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 8
+
+
+def test_retry_budget_limits_retries_to_ratio_of_requests():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    for _ in range(4):
+        budget.deposit()
+
+    assert [budget.withdraw() for _ in range(4)] == [True, True, True, False]
+
+
+def test_delay_honours_retry_after_with_jitter():
+    throttle = Throttle()
+
+    delays = [throttle.delay(1, 2) for _ in range(20)]
+
+    assert all(2 <= d <= 2.2 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_delay_backs_off_without_retry_after():
+    throttle = Throttle(backoff=0.5, max_delay=3)
+
+    assert all(0 <= throttle.delay(1, None) <= 0.5 for _ in range(20))
+    assert all(0 <= throttle.delay(10, None) <= 3 for _ in range(20))
+
+
+def response(mocker, status, headers=None):
+    return mocker.MagicMock(
+        http_response=mocker.MagicMock(status_code=status, headers=headers or {})
+    )
+
+
+def send(policy: ThrottlingPolicy, mocker, responses):
+    policy.next = mocker.MagicMock()
+    policy.next.send = mocker.AsyncMock(side_effect=responses)
+    return asyncio.run(policy.send(mocker.MagicMock()))
+
+
+def test_policy_retries_throttled_requests(mocker):
+    sleep = mocker.patch("cli.client.throttling.asyncio.sleep", mocker.AsyncMock())
+    throttle = Throttle()
+    ok = response(mocker, 200)
+
+    result = send(
+        throttle.policy(VAULT_URL), mocker, [response(mocker, 429, {"Retry-After": "1"}), ok]
+    )
+
+    assert result is ok
+    assert (throttle.stats.requests, throttle.stats.throttled, throttle.stats.retried) == (2, 1, 1)
+    assert max(call.args[0] for call in sleep.await_args_list) >= 1
+    assert throttle.bucket(VAULT_URL).rate < 400
+
+
+def test_policy_retries_server_errors_without_counting_them_as_throttled(mocker):
+    mocker.patch("cli.client.throttling.asyncio.sleep", mocker.AsyncMock())
+    throttle = Throttle()
+
+    result = send(
+        throttle.policy(VAULT_URL), mocker, [response(mocker, 503), response(mocker, 200)]
+    )
+
+    assert result.http_response.status_code == 200
+    assert (throttle.stats.throttled, throttle.stats.retried) == (0, 1)
+
+
+def test_policy_gives_up_after_attempts(mocker):
+    mocker.patch("cli.client.throttling.asyncio.sleep", mocker.AsyncMock())
+    throttle = Throttle(attempts=2)
+
+    result = send(throttle.policy(VAULT_URL), mocker, [response(mocker, 429)] * 2)
+
+    assert result.http_response.status_code == 429
+    assert (throttle.stats.throttled, throttle.stats.retried, throttle.stats.exhausted) == (
+        2,
+        1,
+        1,
+    )
+
+
+def test_policy_gives_up_when_budget_is_spent(mocker):
+    mocker.patch("cli.client.throttling.asyncio.sleep", mocker.AsyncMock())
+    throttle = Throttle(budget=RetryBudget(ratio=0, min_retries=0))
+
+    result = send(throttle.policy(VAULT_URL), mocker, [response(mocker, 429)])
+
+    assert result.http_response.status_code == 429
+    assert throttle.stats.exhausted == 1
+
+
+def test_policies_of_a_vault_share_the_bucket():
+    throttle = Throttle()
+
+    assert throttle.policy(VAULT_URL)._bucket is throttle.policy(VAULT_URL)._bucket
+    assert throttle.bucket(VAULT_URL) is not throttle.bucket("https://other.vault.azure.net")
+
+
+@pytest.mark.parametrize(
+    "status,headers,expected_type,retry_after",
+    [
+        (429, {"Retry-After": "3"}, SecretThrottledError, 3.0),
+        (429, {}, SecretThrottledError, None),
+        (500, {}, SecretRequestError, None),
+    ],
+)
+def test_request_error(mocker, status, headers, expected_type, retry_after):
+    response = mocker.MagicMock(status_code=status, headers=headers)
+    error = request_error(HttpResponseError(response=response))
+
+    assert type(error) is expected_type
+    assert getattr(error, "retry_after", None) == retry_after
+
+
+@pytest.mark.parametrize(
+    "headers,hint", [({"Retry-After": "3"}, "try again in 3 seconds"), ({}, "in a moment")]
+)
+def test_throttled_error_tells_when_to_retry(mocker, headers, hint):
+    response = mocker.MagicMock(status_code=429, headers=headers)
+
+    error = request_error(HttpResponseError(message="Too many requests", response=response))
+
+    assert hint in str(error)
+    assert "Too many requests" in str(error)
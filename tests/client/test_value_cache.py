@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client import value_cache
+from cli.client.keyvault_secret import Secret
+from cli.client.value_cache import EncryptedFileBackend, ValueCache, value_cache_from_env
+
+VAULT_URL = "https://test.vault.azure.net"
+
+
+def test_get_returns_cached_secret():
+    cache = ValueCache()
+    cache.put(VAULT_URL, Secret("name", None, "value"))
+
+    assert cache.get(VAULT_URL, "name", 60).value == "value"
+    assert cache.get(VAULT_URL, "other", 60) is None
+    assert cache.get("https://other.vault.azure.net", "name", 60) is None
+
+
+def test_get_evicts_expired_entries():
+    cache = ValueCache()
+    cache.put(VAULT_URL, Secret("name", None, "value"))
+
+    assert cache.get(VAULT_URL, "name", -1) is None
+    assert len(cache) == 0
+
+
+def test_put_evicts_least_recently_used():
+    cache = ValueCache(max_entries=2)
+    cache.put(VAULT_URL, Secret("a", None, "a"))
+    cache.put(VAULT_URL, Secret("b", None, "b"))
+    cache.get(VAULT_URL, "a", 60)
+
+    cache.put(VAULT_URL, Secret("c", None, "c"))
+
+    assert cache.get(VAULT_URL, "b", 60) is None
+    assert cache.get(VAULT_URL, "a", 60) is not None
+    assert cache.get(VAULT_URL, "c", 60) is not None
+
+
+def test_invalidate():
+    cache = ValueCache()
+    for name in ("a", "b"):
+        cache.put(VAULT_URL, Secret(name, None, name))
+    cache.put("https://other.vault.azure.net", Secret("a", None, "a"))
+
+    cache.invalidate(VAULT_URL, "a")
+    assert len(cache) == 2
+    cache.invalidate(VAULT_URL)
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_encrypted_backend_round_trip(tmp_path):
+    location = tmp_path / "values.bin"
+    expires_on = datetime.now(timezone.utc) + timedelta(days=1)
+    cache = ValueCache(backend=EncryptedFileBackend(location, "passphrase"))
+    cache.put(VAULT_URL, Secret("name", expires_on, "secret-value"))
+
+    cache.save()
+
+    assert b"secret-value" not in location.read_bytes()
+    assert oct(location.stat().st_mode & 0o777) == "0o600"
+    loaded = ValueCache(backend=EncryptedFileBackend(location, "passphrase"))
+    loaded.load()
+    secret = loaded.get(VAULT_URL, "name", 60)
+    assert (secret.value, secret.expires_on) == ("secret-value", expires_on)
+
+
+def test_encrypted_backend_with_wrong_passphrase_reads_empty(tmp_path):
+    location = tmp_path / "values.bin"
+    cache = ValueCache(backend=EncryptedFileBackend(location, "passphrase"))
+    cache.put(VAULT_URL, Secret("name", None, "value"))
+    cache.save()
+
+    loaded = ValueCache(backend=EncryptedFileBackend(location, "wrong"))
+    loaded.load()
+
+    assert len(loaded) == 0
+
+
+def test_encrypted_backend_keeps_key_in_keyring(mocker, tmp_path):
+    keys = {}
+    mocker.patch("keyring.get_password", side_effect=lambda s, u: keys.get((s, u)))
+    mocker.patch("keyring.set_password", side_effect=lambda s, u, k: keys.update({(s, u): k}))
+    cache = ValueCache(backend=EncryptedFileBackend(tmp_path / "values.bin"))
+    cache.put(VAULT_URL, Secret("name", None, "value"))
+
+    cache.save()
+    loaded = ValueCache(backend=EncryptedFileBackend(tmp_path / "values.bin"))
+    loaded.load()
+
+    assert list(keys) == [(value_cache.KEYRING_SERVICE, value_cache.KEYRING_USERNAME)]
+    assert loaded.get(VAULT_URL, "name", 60).value == "value"
+
+
+@pytest.mark.parametrize(
+    "setting,encrypted", [(None, False), ("memory", False), ("encrypted", True)]
+)
+def test_value_cache_from_env(monkeypatch, tmp_path, setting, encrypted):
+    if setting:
+        monkeypatch.setenv("AZKV_VALUE_CACHE", setting)
+    else:
+        monkeypatch.delenv("AZKV_VALUE_CACHE", raising=False)
+
+    cache = value_cache_from_env(tmp_path / "values.bin")
+
+    assert (cache._backend is not None) is encrypted
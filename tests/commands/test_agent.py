@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client.agent_client import NOT_FOUND, REQUEST_FAILED, AgentClient, AgentError
+from cli.commands.agent import check, get_secret, get_secrets, stop_agent
+from cli.commands.check import EXIT_SOON, SOON
+
+VAULT_URL = "https://test.vault.azure.net"
+
+
+def secret(name, value, expires_on=None):
+    return {"vault_url": VAULT_URL, "name": name, "expires_on": expires_on, "value": value}
+
+
+@pytest.fixture
+def agent(mocker):
+    agent = mocker.MagicMock(spec=AgentClient)
+    agent.get_secrets.return_value = ({"name": secret("name", "value")}, {})
+    return agent
+
+
+def test_get_secret(agent, capsys):
+    get_secret(agent, "name", raw=True)
+
+    agent.get_secrets.assert_called_once_with(["name"], None)
+    assert capsys.readouterr().out == "value"
+
+
+@pytest.mark.parametrize(
+    "error,message",
+    [
+        ({"kind": NOT_FOUND, "message": "missing"}, "Secret does not exist!\n"),
+        ({"kind": REQUEST_FAILED, "message": "failed"}, "Error getting the secret!\n"),
+    ],
+)
+def test_get_secret_fails(agent, capsys, error, message):
+    agent.get_secrets.return_value = ({}, {"name": error})
+
+    with pytest.raises(SystemExit):
+        get_secret(agent, "name")
+
+    assert capsys.readouterr().err.startswith(message)
+
+
+def test_get_secret_when_agent_fails(agent, capsys):
+    agent.get_secrets.side_effect = AgentError("broken")
+
+    with pytest.raises(SystemExit):
+        get_secret(agent, "name")
+
+    assert "broken" in capsys.readouterr().err
+
+
+def test_get_secrets_reports_missing(agent, capsys):
+    agent.get_secrets.return_value = (
+        {"a": secret("a", "1")},
+        {"b": {"kind": NOT_FOUND, "message": "Secret b not found"}},
+    )
+
+    with pytest.raises(SystemExit):
+        get_secrets(agent, ["a", "b"], None, "json")
+
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == {"a": "1"}
+    assert "Secret b not found" in captured.err
+
+
+def test_check(agent, capsys):
+    now = datetime.now(timezone.utc)
+    agent.check.return_value = {
+        "findings": [
+            {
+                "vault_url": VAULT_URL,
+                "name": "soon",
+                "expires_on": (now + timedelta(days=1)).isoformat(),
+                "status": SOON,
+                "updated_on": None,
+            }
+        ],
+        "errors": {},
+        "now": now.isoformat(),
+    }
+
+    with pytest.raises(SystemExit) as e:
+        check(agent, "json", within=timedelta(days=7), fail_on=SOON)
+
+    assert e.value.code == EXIT_SOON
+    agent.check.assert_called_once_with(False, 7 * 24 * 3600, False, None)
+    report = json.loads(capsys.readouterr().out)
+    assert [(s["name"], s["status"]) for s in report["secrets"]] == [("soon", SOON)]
+
+
+def test_stop_agent_without_agent(mocker, tmp_path, capsys):
+    stop_agent(tmp_path / "agent.sock")
+
+    assert capsys.readouterr().err == "No agent is running.\n"
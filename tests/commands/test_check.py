@@ -1,3 +1,9 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from xml.etree import ElementTree
+
 import pytest
 
 from cli.client.keyvault_client import (
@@ -5,37 +11,88 @@ from cli.client.keyvault_client import (
     KeyVaultClient,
     SecretRequestError,
 )
-from cli.commands.check import check
+from cli.client.expiry_index import ExpiryIndex
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_filter import SecretFilter
+from cli.client.throttling import Throttle
+from cli.commands.check import (
+    EXPIRED,
+    OK,
+    SOON,
+    Finding,
+    changed_findings,
+    check,
+    classify,
+    render_report,
+    watch,
+)
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+VAULT = "https://test.vault.azure.net"
+
+
+def make_secret(name, days):
+    return Secret(name, datetime.now(timezone.utc) + timedelta(days=days) if days else None)
 
 
 @pytest.fixture
-def kv_client_mock(mocker):
-    return mocker.MagicMock(spec=KeyVaultClient)
+def kv_clients_mock(mocker):
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    active = mocker.MagicMock(spec=KeyVaultClient, is_active=True, expiry_days=15)
+    inactive = mocker.MagicMock(spec=KeyVaultClient, is_active=False, expiry_days=15)
+    mock_clients.clients = {VAULT: active, "https://inactive.vault.azure.net": inactive}
+    mock_clients.errors = {}
+    mock_clients.throttle = Throttle()
+    mock_clients.cache.expiry_index.side_effect = lambda vault_urls: ExpiryIndex(
+        mock_clients.get_secrets.return_value
+    )
+    return mock_clients
 
 
 @pytest.mark.parametrize(
-    "expired,soon_expired,expected",
+    "days,expected",
     [
-        (False, False, "No expired secrets found!"),
-        (True, False, "Expired secrets:\n  secret1\n  secret2"),
-        (False, True, "Soon to expire secrets:\n  secret1\n  secret2"),
+        (None, "No expired secrets found!"),
+        (30, "No expired secrets found!"),
+        (-1, "Expired secrets:\n  secret1\n  secret2"),
+        (5, "Soon to expire secrets:\n  secret1\n  secret2"),
     ],
 )
-def test_check_with_secrets(mocker, kv_client_mock, capsys, expired, soon_expired, expected):
-    secret1 = mocker.MagicMock(is_expired=lambda: expired, is_soon_expired=lambda: soon_expired)
-    secret1.name = "secret1"
-    secret2 = mocker.MagicMock(is_expired=lambda: expired, is_soon_expired=lambda: soon_expired)
-    secret2.name = "secret2"
-    no_expired_secrets = [secret1, secret2]
-    kv_client_mock.get_secrets.return_value = no_expired_secrets
+def test_check_with_secrets(kv_clients_mock, capsys, days, expected):
+    secrets = [make_secret("secret1", days), make_secret("secret2", days)]
+    kv_clients_mock.get_secrets.return_value = {VAULT: secrets}
 
-    check(kv_client_mock)
+    check(kv_clients_mock)
 
     captured = capsys.readouterr()
     assert captured.out.strip() == expected
     assert captured.err == ""
 
 
+def test_check_only_matching_secrets(kv_clients_mock, capsys):
+    cert = Secret("cert", NOW, content_type="application/x-pkcs12")
+    kv_clients_mock.get_secrets.return_value = {VAULT: [make_secret("secret1", -1), cert]}
+
+    check(kv_clients_mock, where=SecretFilter(content_types=("!application/x-pkcs12",)))
+
+    assert capsys.readouterr().out.strip() == "Expired secrets:\n  secret1"
+
+
+@pytest.mark.parametrize(
+    "all_vaults,expected",
+    [(False, [VAULT]), (True, [VAULT, "https://inactive.vault.azure.net"])],
+)
+def test_check_scans_vaults_concurrently(kv_clients_mock, all_vaults, expected):
+    kv_clients_mock.get_secrets.return_value = {}
+
+    check(kv_clients_mock, all_vaults=all_vaults)
+
+    kv_clients_mock.get_secrets.assert_called_once_with(
+        expected, refresh_stale=True, max_workers=64
+    )
+
+
 @pytest.mark.parametrize(
     "error,expected",
     [
@@ -43,11 +100,180 @@ def test_check_with_secrets(mocker, kv_client_mock, capsys, expired, soon_expire
         (ClientNotInitializedError, "Client not initialized!\n"),
     ],
 )
-def test_check_with_error(kv_client_mock, capsys, error, expected):
-    kv_client_mock.get_secrets.side_effect = error("Test error")
+def test_check_with_error(kv_clients_mock, capsys, error, expected):
+    kv_clients_mock.get_secrets.side_effect = error("Test error")
 
     with pytest.raises(SystemExit):
-        check(kv_client_mock)
+        check(kv_clients_mock)
 
     captured = capsys.readouterr()
     assert captured.err == expected
+
+
+@pytest.mark.parametrize(
+    "days,errors,fail_on,expected",
+    [
+        (-1, {}, None, None),
+        (30, {}, "expired", None),
+        (-1, {}, "expired", 2),
+        (5, {}, "expired", None),
+        (5, {}, "soon", 3),
+        (-1, {}, "soon", 2),
+        (-1, {"https://other.vault.azure.net": SecretRequestError("Test error")}, "expired", 1),
+    ],
+)
+def test_check_exit_codes(kv_clients_mock, days, errors, fail_on, expected):
+    kv_clients_mock.get_secrets.return_value = {VAULT: [make_secret("secret", days)]}
+    kv_clients_mock.errors = errors
+
+    if expected is None:
+        check(kv_clients_mock, fail_on=fail_on)
+    else:
+        with pytest.raises(SystemExit) as e:
+            check(kv_clients_mock, fail_on=fail_on)
+        assert e.value.code == expected
+
+
+def test_check_writes_report_to_file(kv_clients_mock, tmp_path):
+    kv_clients_mock.get_secrets.return_value = {VAULT: [make_secret("secret", -1)]}
+
+    check(kv_clients_mock, "json", tmp_path / "report.json")
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert [s["name"] for s in report["secrets"]] == ["secret"]
+
+
+def test_classify_uses_one_reference_time():
+    listings = {
+        VAULT: [
+            Secret("expired", NOW - timedelta(seconds=1)),
+            Secret("soon", NOW + timedelta(days=14)),
+            Secret("ok", NOW + timedelta(days=16)),
+            Secret("never", None),
+        ]
+    }
+
+    findings = classify(listings, ExpiryIndex(listings), NOW, {VAULT: timedelta(days=15)})
+
+    assert [(f.name, f.status) for f in findings] == [
+        ("expired", EXPIRED),
+        ("soon", SOON),
+        ("ok", OK),
+        ("never", OK),
+    ]
+
+
+def test_classify_uses_the_window_of_each_vault():
+    other = "https://other.vault.azure.net"
+    listings = {
+        VAULT: [Secret("a", NOW + timedelta(days=5))],
+        other: [Secret("b", NOW + timedelta(days=5))],
+    }
+    windows = {VAULT: timedelta(days=7), other: timedelta(days=3)}
+
+    findings = classify(listings, ExpiryIndex(listings), NOW, windows)
+
+    assert [(f.name, f.status) for f in findings] == [("a", SOON), ("b", OK)]
+
+
+@pytest.mark.parametrize("within,expected", [(None, "No expired"), (timedelta(days=90), "Soon")])
+def test_check_within(kv_clients_mock, capsys, within, expected):
+    kv_clients_mock.get_secrets.return_value = {VAULT: [make_secret("secret", 30)]}
+
+    check(kv_clients_mock, within=within)
+
+    assert capsys.readouterr().out.startswith(expected)
+
+
+@pytest.fixture
+def findings():
+    return [
+        Finding(VAULT, "expired", NOW - timedelta(days=1), EXPIRED),
+        Finding(VAULT, "soon", NOW + timedelta(days=1), SOON),
+        Finding(VAULT, "ok", None, OK),
+    ]
+
+
+def test_render_json_report(findings):
+    errors = {"https://other.vault.azure.net": SecretRequestError("Test error")}
+
+    report = json.loads(render_report(findings, errors, NOW, "json"))
+
+    assert report["checked_at"] == NOW.isoformat()
+    assert [(s["name"], s["status"]) for s in report["secrets"]] == [
+        ("expired", "expired"),
+        ("soon", "soon"),
+    ]
+    assert report["errors"] == {"https://other.vault.azure.net": "Test error"}
+
+
+def test_render_csv_report(findings):
+    rows = list(csv.DictReader(io.StringIO(render_report(findings, {}, NOW, "csv"))))
+
+    assert [(r["vault_url"], r["name"], r["status"]) for r in rows] == [
+        (VAULT, "expired", "expired"),
+        (VAULT, "soon", "soon"),
+    ]
+
+
+@pytest.mark.parametrize("soon_fails,failures", [(False, "1"), (True, "2")])
+def test_render_junit_report(findings, soon_fails, failures):
+    errors = {"https://other.vault.azure.net": SecretRequestError("Test error")}
+
+    report = render_report(findings, errors, NOW, "junit", soon_fails)
+
+    suites = ElementTree.fromstring(report)
+    vault, other = suites.findall("testsuite")
+    assert vault.get("tests") == "3"
+    assert vault.get("failures") == failures
+    assert other.get("errors") == "1"
+    assert other.find("testcase/error").get("message") == "Test error"
+
+
+def test_watch_reports_only_new_findings(kv_clients_mock, capsys):
+    soon = make_secret("soon", 5)
+    expired = make_secret("expired", -1)
+    updated = Secret("soon", soon.expires_on, updated_on=NOW)
+    kv_clients_mock.watch_secrets.return_value = iter(
+        [
+            ({VAULT: [soon]}, {}),
+            ({VAULT: [soon]}, {}),
+            ({VAULT: [soon, expired]}, {}),
+            ({VAULT: [updated, expired]}, {}),
+        ]
+    )
+
+    watch(kv_clients_mock, timedelta(minutes=5))
+
+    kv_clients_mock.watch_secrets.assert_called_once_with([VAULT], 300.0, None)
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("  ")]
+    assert lines == [f"  soon ({VAULT})", f"  expired ({VAULT})", f"  soon ({VAULT})"]
+
+
+def test_watch_only_matching_secrets(kv_clients_mock, capsys):
+    kv_clients_mock.watch_secrets.return_value = iter(
+        [({VAULT: [make_secret("app-db", -1), make_secret("web-db", -1)]}, {})]
+    )
+
+    watch(kv_clients_mock, timedelta(minutes=5), where=SecretFilter(prefix="app-"))
+
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("  ")]
+    assert lines == [f"  app-db ({VAULT})"]
+
+
+def test_watch_reports_failing_vaults_once(kv_clients_mock, capsys):
+    error = SecretRequestError("Test error")
+    kv_clients_mock.watch_secrets.return_value = iter([({}, {VAULT: error}), ({}, {VAULT: error})])
+
+    watch(kv_clients_mock, timedelta(minutes=5))
+
+    assert capsys.readouterr().err.count("Test error") == 1
+
+
+def test_changed_findings():
+    previous = Finding(VAULT, "a", NOW, EXPIRED)
+    snapshot = {(VAULT, "a"): previous}
+
+    assert changed_findings([Finding(VAULT, "a", NOW, EXPIRED)], snapshot) == []
+    assert changed_findings([Finding(VAULT, "a", NOW, EXPIRED, NOW)], snapshot) != []
+    assert changed_findings([Finding(VAULT, "b", NOW, OK)], snapshot) == []
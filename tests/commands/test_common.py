@@ -1,11 +1,24 @@
+import asyncio
 from copy import deepcopy
 
 import pytest
+from InquirerPy import inquirer
 from InquirerPy.base.control import Choice
+from pfzy.score import fzy_scorer
 
-from cli.client.keyvault_client import KeyVaultClient
+from cli.client.keyvault_client import KeyVaultClient, SecretRequestError
 from cli.client.keyvault_clients import KeyVaultClients
-from cli.commands.common import secret_selection, secrets_blade, vaults_blade
+from cli.client.keyvault_secret import Secret
+from cli.client.secret_cache import SecretCache
+from cli.commands.common import (
+    Listing,
+    _add_choices,
+    _set_choices,
+    _use_index,
+    secret_selection,
+    secrets_blade,
+    vaults_blade,
+)
 
 
 @pytest.fixture
@@ -13,6 +26,7 @@ def mock_secret(mocker):
     secret = mocker.MagicMock()
     secret.name = "test_secret"
     secret.value = "test_value"
+    secret.tags = None
     return secret
 
 
@@ -25,8 +39,9 @@ def mock_kv_client(mocker):
 
 
 @pytest.fixture
-def mock_kv_clients(mocker, mock_kv_client):
+def mock_kv_clients(mocker, mock_kv_client, tmp_path):
     mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.cache = SecretCache(tmp_path / "cache.json")
     mock_kv_client1 = deepcopy(mock_kv_client)
     mock_kv_client1.vault_url = "https://test.vault.azure.net"
     mock_kv_client2 = deepcopy(mock_kv_client)
@@ -49,7 +64,10 @@ def test_secret_selection(mocker, mock_kv_clients):
 
     # Assert
     secrets_blade_mock.assert_has_calls(
-        [mocker.call(mock_kv_clients, "test_secret"), mocker.call(mock_kv_clients, "test_secret")]
+        [
+            mocker.call(mock_kv_clients, "test_secret", None),
+            mocker.call(mock_kv_clients, "test_secret", None),
+        ]
     )
     vaults_blade_mock.assert_called_once()
     assert choice == "test_secret"
@@ -89,14 +107,18 @@ def test_secret_selection_remove_previous_print_when_switching_blades(mocker, mo
 def test_secrets_blade(mocker, mock_kv_clients, mock_secret):
     # Arrange
     inquirer_fuzzy_mock = mocker.patch("cli.commands.common.inquirer.fuzzy")
-    mock_kv_clients.run_command.return_value = {"https://test.vault.azure.net": [mock_secret]}
-    inquirer_fuzzy_mock.return_value.execute.return_value = (mock_kv_clients, "test_secret")
+    mock_kv_clients.stream_secrets.return_value = iter(
+        [("https://test.vault.azure.net", [mock_secret], True)]
+    )
+    inquirer_fuzzy_mock.return_value.execute_async = mocker.AsyncMock(
+        return_value=("https://test.vault.azure.net", "test_secret")
+    )
     secret_names = [
         {"name": "[test] test_secret", "value": ("https://test.vault.azure.net", "test_secret")}
     ]
 
     # Act
-    secrets_blade(mock_kv_clients, "test_secret")
+    choice = secrets_blade(mock_kv_clients, "test_secret")
 
     # Assert
     inquirer_fuzzy_mock.assert_called_once_with(
@@ -107,6 +129,211 @@ def test_secrets_blade(mocker, mock_kv_clients, mock_secret):
         mandatory=mocker.ANY,
         instruction=mocker.ANY,
     )
+    assert choice == ("https://test.vault.azure.net", "test_secret")
+
+
+def test_secrets_blade_adds_pages_arriving_after_the_picker_opened(
+    mocker, mock_kv_clients, mock_secret
+):
+    # Arrange
+    inquirer_fuzzy_mock = mocker.patch("cli.commands.common.inquirer.fuzzy")
+    add_choices_mock = mocker.patch("cli.commands.common._add_choices")
+    late_secret = mocker.MagicMock()
+    late_secret.name = "late_secret"
+    mock_kv_clients.stream_secrets.return_value = iter(
+        [
+            ("https://test.vault.azure.net", [mock_secret], False),
+            ("https://test2.vault.azure.net", [late_secret], False),
+        ]
+    )
+
+    async def execute_async():
+        await asyncio.sleep(0.1)
+
+    inquirer_fuzzy_mock.return_value.execute_async = execute_async
+
+    # Act
+    secrets_blade(mock_kv_clients)
+
+    # Assert
+    assert inquirer_fuzzy_mock.call_args.kwargs["choices"] == [
+        {"name": "[test] test_secret", "value": ("https://test.vault.azure.net", "test_secret")}
+    ]
+    add_choices_mock.assert_called_once_with(
+        inquirer_fuzzy_mock.return_value,
+        [
+            {
+                "name": "[test2] late_secret",
+                "value": ("https://test2.vault.azure.net", "late_secret"),
+            },
+        ],
+    )
+
+
+def test_secrets_blade_raises_when_no_vault_could_be_listed(mocker, mock_kv_clients):
+    # Arrange
+    inquirer_fuzzy_mock = mocker.patch("cli.commands.common.inquirer.fuzzy")
+    mock_kv_clients.stream_secrets.return_value = iter([])
+    mock_kv_clients.errors = {"https://test.vault.azure.net": SecretRequestError("Test error")}
+
+    # Act
+    with pytest.raises(SecretRequestError):
+        secrets_blade(mock_kv_clients)
+
+    # Assert
+    inquirer_fuzzy_mock.assert_not_called()
+
+
+def test_listing_search_finds_positions_across_vaults(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://a.vault.azure.net", [Secret("db-password", None)], True)
+    listing.update("https://b.vault.azure.net", [Secret("api-key", None)], False)
+    listing.update("https://a.vault.azure.net", [Secret("db-user", None)], False)
+
+    assert [c["name"] for c in listing.choices()] == [
+        "[a] db-password",
+        "[b] api-key",
+        "[a] db-user",
+    ]
+    assert listing.search("db") == [0, 2]
+    assert listing.search("key") == [1]
+    assert listing.candidates("dbu") == [2]
+
+
+def test_listing_adds_pages_after_the_earlier_choices(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    assert listing.update("https://a.vault.azure.net", [Secret("db-password", None)], True)
+    assert listing.update("https://b.vault.azure.net", [Secret("api-key", None)], False)
+    assert listing.update("https://a.vault.azure.net", [Secret("db-user", None)], False)
+
+    assert [c["name"] for c in listing.choices(2)] == ["[a] db-user"]
+
+
+def test_listing_replacing_a_vault_renumbers_the_choices(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://a.vault.azure.net", [Secret("db-password", None)], False)
+    listing.update("https://b.vault.azure.net", [Secret("api-key", None)], False)
+
+    assert not listing.update("https://a.vault.azure.net", [Secret("db-user", None)], True)
+
+    assert [c["name"] for c in listing.choices()] == ["[b] api-key", "[a] db-user"]
+    assert listing.search("db") == [1]
+    assert listing.search("key") == [0]
+
+
+def test_use_index_scores_only_candidates_of_the_index(mocker, mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    secrets = [
+        Secret("db-password", None),
+        Secret("api-key", None, tags={"owner": "db-team"}),
+        Secret("redis", None),
+    ]
+    listing.update("https://a.vault.azure.net", secrets, True)
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    scorer = prompt.content_control._scorer = mocker.Mock(wraps=fzy_scorer)
+    _use_index(prompt, listing)
+    prompt.content_control._current_text = lambda: "db-"
+
+    choices = asyncio.run(prompt.content_control._filter_choices(0))
+
+    assert [c["name"] for c in choices] == ["[a] db-password", "[a] api-key"]
+    assert choices[0]["indices"] == [4, 5, 6]
+    assert choices[1]["indices"] == []
+    scorer.assert_called_once_with("db-", "[a] db-password")
+
+
+def test_use_index_finds_fuzzy_matches_spanning_words(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update(
+        "https://a.vault.azure.net", [Secret("db-password", None), Secret("redis", None)], True
+    )
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    _use_index(prompt, listing)
+    prompt.content_control._current_text = lambda: "dbpw"
+
+    choices = asyncio.run(prompt.content_control._filter_choices(0))
+
+    assert [c["name"] for c in choices] == ["[a] db-password"]
+
+
+def test_use_index_matches_the_vault_shown(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://kv-prod.vault.azure.net", [Secret("api-key", None)], True)
+    listing.update("https://kv-dev.vault.azure.net", [Secret("api-key", None)], True)
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    _use_index(prompt, listing)
+    prompt.content_control._current_text = lambda: "prod api"
+
+    choices = asyncio.run(prompt.content_control._filter_choices(0))
+
+    assert [c["name"] for c in choices] == ["[kv-prod] api-key"]
+
+
+def test_use_index_can_be_cancelled_while_typing(mocker, mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://a.vault.azure.net", [Secret("db-password", None)], True)
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    scorer = prompt.content_control._scorer = mocker.Mock(wraps=fzy_scorer)
+    _use_index(prompt, listing)
+    prompt.content_control._current_text = lambda: "db"
+
+    async def type_on():
+        task = asyncio.create_task(prompt.content_control._filter_choices(10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(type_on())
+
+    scorer.assert_not_called()
+
+
+def test_fuzzy_prompt_has_the_internals_used_by_the_picker():
+    prompt = inquirer.fuzzy(message="", choices=["a"])
+    control = prompt.content_control
+
+    assert callable(control._filter_choices)
+    assert control._current_text() == ""
+    assert isinstance(control._max_lines, int)
+    assert isinstance(control._height, int)
+    assert callable(prompt._on_text_changed)
+
+
+def test_add_choices_appends_to_the_choices_of_a_prompt(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://a.vault.azure.net", [Secret("db-password", None)], True)
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    first = prompt.content_control.choices[0]
+    listing.update("https://a.vault.azure.net", [Secret("api-key", None)], False)
+
+    async def add_choices():
+        _add_choices(prompt, listing.choices(1))
+        await prompt._task
+
+    asyncio.run(add_choices())
+
+    choices = prompt.content_control.choices
+    assert [c["name"] for c in choices] == ["[a] db-password", "[a] api-key"]
+    assert choices[0] is first
+    assert choices[1]["index"] == 1
+    assert prompt.content_control._height == 2
+
+
+def test_set_choices_replaces_the_choices_of_a_prompt(mock_kv_clients):
+    listing = Listing(mock_kv_clients)
+    listing.update("https://a.vault.azure.net", [Secret("db-password", None)], True)
+    prompt = inquirer.fuzzy(message="", choices=listing.choices())
+    listing.update("https://a.vault.azure.net", [Secret("api-key", None)], True)
+
+    async def set_choices():
+        _set_choices(prompt, listing.choices())
+        await prompt._task
+
+    asyncio.run(set_choices())
+
+    assert [c["name"] for c in prompt.content_control.choices] == ["[a] api-key"]
+    assert prompt.content_control._height == 1
 
 
 def test_vaults_blade(mocker, mock_kv_clients, mock_secret):
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+import click
+import pytest
+
+from cli.commands.duration import Duration, parse_duration
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("90s", timedelta(seconds=90)),
+        ("5m", timedelta(minutes=5)),
+        ("12h", timedelta(hours=12)),
+        ("7d", timedelta(days=7)),
+        (" 2W ", timedelta(weeks=2)),
+    ],
+)
+def test_parse_duration(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "7", "d", "7y", "-1d", "1.5h"])
+def test_parse_invalid_duration(text):
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+def test_duration_param_type():
+    with pytest.raises(click.BadParameter):
+        Duration().convert("soon", None, None)
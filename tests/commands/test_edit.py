@@ -38,13 +38,26 @@ def test_edit_secret_with_existing_secret(mocker, mock_kv_client):
     edit_secret(mock_kv_client, "test_secret")
 
     # Assert
-    mock_kv_client.get_secret.assert_called_once_with("test_secret")
+    mock_kv_client.get_secret.assert_called_once_with("test_secret", fresh=True)
     mock_kv_client.set_secret.assert_called_once_with(
         Secret(name="test_secret", value="new_value", expires_on=None)
     )
     click_secho_spy.assert_called_with("new_value", fg="blue")
 
 
+def test_edit_secret_skips_unchanged_value(mocker, mock_kv_client):
+    # Arrange
+    click_secho_spy = mocker.spy(click, "secho")
+    mocker.patch("click.edit", return_value="test_value\n")
+
+    # Act
+    edit_secret(mock_kv_client, "test_secret")
+
+    # Assert
+    mock_kv_client.set_secret.assert_not_called()
+    click_secho_spy.assert_called_with("Value unchanged, nothing saved.", fg="bright_blue")
+
+
 def test_edit_secret_with_nonexistent_secret(mocker, mock_kv_client):
     # Arrange
     click_secho_spy = mocker.spy(click, "secho")
@@ -55,7 +68,7 @@ def test_edit_secret_with_nonexistent_secret(mocker, mock_kv_client):
         edit_secret(mock_kv_client, "nonexistent_secret")
 
     # Assert
-    mock_kv_client.get_secret.assert_called_once_with("nonexistent_secret")
+    mock_kv_client.get_secret.assert_called_once_with("nonexistent_secret", fresh=True)
     click_secho_spy.assert_called_with("Secret does not exist!", fg="bright_red", err=True)
 
 
@@ -69,7 +82,7 @@ def test_edit_secret_with_request_error(mocker, mock_kv_client):
         edit_secret(mock_kv_client, "test_secret")
 
     # Assert
-    mock_kv_client.get_secret.assert_called_once_with("test_secret")
+    mock_kv_client.get_secret.assert_called_once_with("test_secret", fresh=True)
     click_secho_spy.assert_has_calls(
         [
             mocker.call("Error getting the secret!", fg="bright_red", err=True),
@@ -88,7 +101,7 @@ def test_edit_secret_with_client_not_initialized_error(mocker, mock_kv_client):
         edit_secret(mock_kv_client, "test_secret")
 
     # Assert
-    mock_kv_client.get_secret.assert_called_once_with("test_secret")
+    mock_kv_client.get_secret.assert_called_once_with("test_secret", fresh=True)
     click_secho_spy.assert_called_with("Client not initialized!", fg="bright_red", err=True)
 
 
@@ -106,7 +119,7 @@ def test_edit_list_with_existing_secret(mocker, mock_kv_clients):
 
     # Assert
     mock_kv_clients.clients["https://test.vault.azure.net"].get_secret.assert_called_once_with(
-        "test_secret"
+        "test_secret", fresh=True
     )
     mock_kv_clients.clients["https://test.vault.azure.net"].set_secret.assert_called_once_with(
         Secret(name="test_secret", value="new_value", expires_on=None)
@@ -0,0 +1,45 @@
+import pytest
+
+from cli.commands.formats import (
+    SecretsFormatError,
+    dump_secrets,
+    format_from_path,
+    load_secrets,
+    read_names,
+)
+
+
+@pytest.mark.parametrize("fmt", ["json", "env", "yaml"])
+def test_dump_and_load_roundtrip(fmt):
+    values = {"plain": "value", "quoted": 'a "b" c', "multiline": "line1\nline2", "empty": ""}
+
+    assert load_secrets(dump_secrets(values, fmt), fmt) == values
+
+
+def test_load_env_with_comments_and_export():
+    text = "# comment\n\nexport first=1\nsecond='two words'\n"
+
+    assert load_secrets(text, "env") == {"first": "1", "second": "two words"}
+
+
+@pytest.mark.parametrize(
+    "text,fmt",
+    [("{broken", "json"), ("[1, 2]", "json"), ("no separator", "env"), ("- a\n- b", "yaml")],
+)
+def test_load_invalid_input(text, fmt):
+    with pytest.raises(SecretsFormatError):
+        load_secrets(text, fmt)
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    [("dump.json", "json"), ("dump.yml", "yaml"), ("dump.YAML", "yaml"), (".env", "env")],
+)
+def test_format_from_path(path, expected):
+    assert format_from_path(path) == expected
+
+
+def test_read_names():
+    text = "a\n\n# comment\nb  # trailing comment\n  c\n"
+
+    assert read_names(text) == ["a", "b", "c"]
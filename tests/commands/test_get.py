@@ -0,0 +1,126 @@
+import json
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from cli.client.keyvault_client import (
+    KeyVaultClient,
+    Secret,
+    SecretNotFoundError,
+    SecretRequestError,
+    SecretThrottledError,
+)
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.commands.get import get_secret, get_secrets
+
+
+@pytest.fixture
+def mock_kv_clients(mocker):
+    mock_client = mocker.MagicMock(spec=KeyVaultClient)
+    mock_client.vault_url = "https://test.vault.azure.net"
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.clients = {"https://test.vault.azure.net": mock_client}
+    mock_clients.find_client.return_value = mock_client
+    mock_clients.find_secret.return_value = (
+        "https://test.vault.azure.net",
+        Secret("name", None, "value"),
+    )
+    return mock_clients
+
+
+def test_get_secret(mock_kv_clients, capsys):
+    get_secret(mock_kv_clients, "name")
+
+    mock_kv_clients.find_secret.assert_called_once_with("name", None)
+    assert capsys.readouterr().out == "value\n"
+
+
+def test_get_secret_raw(mock_kv_clients, capsys):
+    get_secret(mock_kv_clients, "name", raw=True)
+
+    assert capsys.readouterr().out == "value"
+
+
+def test_get_secret_from_vault(mock_kv_clients):
+    get_secret(mock_kv_clients, "name", "test")
+
+    mock_kv_clients.find_client.assert_called_once_with("test")
+    mock_kv_clients.find_secret.assert_called_once_with("name", ["https://test.vault.azure.net"])
+
+
+def test_get_secret_unknown_vault(mock_kv_clients, capsys):
+    mock_kv_clients.find_client.side_effect = KeyError("Vault test not found")
+
+    with pytest.raises(SystemExit) as e:
+        get_secret(mock_kv_clients, "name", "test")
+
+    assert e.value.code == 1
+    assert "Vault test not found" in capsys.readouterr().err
+
+
+def test_get_secret_not_found(mock_kv_clients, capsys):
+    mock_kv_clients.find_secret.side_effect = SecretNotFoundError()
+
+    with pytest.raises(SystemExit) as e:
+        get_secret(mock_kv_clients, "name")
+
+    assert e.value.code == 1
+    assert "Secret does not exist!" in capsys.readouterr().err
+
+
+def test_get_secret_request_error(mock_kv_clients, capsys):
+    mock_kv_clients.find_secret.side_effect = SecretRequestError("Test error")
+
+    with pytest.raises(SystemExit) as e:
+        get_secret(mock_kv_clients, "name")
+
+    assert e.value.code == 1
+    assert "Test error" in capsys.readouterr().err
+
+
+def test_get_secret_throttled(mocker, mock_kv_clients, capsys):
+    response = mocker.MagicMock(status_code=429)
+    mock_kv_clients.find_secret.side_effect = SecretThrottledError(
+        HttpResponseError(message="Too many requests", response=response), 5
+    )
+
+    with pytest.raises(SystemExit):
+        get_secret(mock_kv_clients, "name")
+
+    assert "try again in 5 seconds" in capsys.readouterr().err
+
+
+def test_get_secrets_as_json(mock_kv_clients, capsys):
+    mock_kv_clients.find_secrets.return_value = (
+        {"a": Secret("a", None, "1"), "b": Secret("b", None, "2")},
+        {},
+    )
+
+    get_secrets(mock_kv_clients, ["a", "b"], None, "json")
+
+    mock_kv_clients.find_secrets.assert_called_once_with(["a", "b"], None)
+    assert json.loads(capsys.readouterr().out) == {"a": "1", "b": "2"}
+
+
+def test_get_secrets_as_env(mock_kv_clients, capsys):
+    mock_kv_clients.find_secrets.return_value = ({"a": Secret("a", None, "1")}, {})
+
+    get_secrets(mock_kv_clients, ["a"], "test", "env")
+
+    mock_kv_clients.find_secrets.assert_called_once_with(["a"], ["https://test.vault.azure.net"])
+    assert capsys.readouterr().out == 'a="1"\n'
+
+
+def test_get_secrets_reports_missing(mock_kv_clients, capsys):
+    mock_kv_clients.find_secrets.return_value = (
+        {"a": Secret("a", None, "1")},
+        {"b": SecretNotFoundError("Secret b not found")},
+    )
+
+    with pytest.raises(SystemExit) as e:
+        get_secrets(mock_kv_clients, ["a", "b"], None, "json")
+
+    assert e.value.code == 1
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == {"a": "1"}
+    assert "Secret b not found" in captured.err
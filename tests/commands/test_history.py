@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cli.client.keyvault_client import KeyVaultClient, Secret, SecretNotFoundError
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.commands.history import diff, history, resolve_versions
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+V1 = "1" * 32
+V2 = "2" * 32
+V3 = "3" * 32
+
+
+def version(version: str, days_ago: int, enabled=True) -> Secret:
+    return Secret(
+        "name",
+        None,
+        version=version,
+        created_on=NOW - timedelta(days=days_ago),
+        enabled=enabled,
+    )
+
+
+@pytest.fixture
+def mock_kv_client(mocker):
+    mock_client = mocker.MagicMock(spec=KeyVaultClient)
+    mock_client.vault_url = "https://test.vault.azure.net"
+    # pages in no particular order, as Key Vault returns them
+    mock_client.get_versions.side_effect = lambda name: iter(
+        [[version(V2, 1), version(V1, 3, enabled=False)], [version(V3, 0)]]
+    )
+    values = {V1: "a\nb", V2: "a\nc", V3: "a\nc", None: "a\nc"}
+    mock_client.get_secret.side_effect = lambda name, v=None, fresh=False: Secret(
+        name, None, values[v]
+    )
+    return mock_client
+
+
+@pytest.fixture
+def mock_kv_clients(mocker, mock_kv_client):
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.clients = {"https://test.vault.azure.net": mock_kv_client}
+    mock_clients.locate_secret.return_value = "https://test.vault.azure.net"
+    mock_clients.find_client.return_value = mock_kv_client
+    return mock_clients
+
+
+def test_history_lists_versions_newest_first(mock_kv_clients, capsys):
+    history(mock_kv_clients, "name")
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("VERSION")
+    assert lines[1].startswith(V3) and lines[1].endswith("(current)")
+    assert lines[2].startswith(V2)
+    assert lines[3].startswith(V1) and "  no  " in lines[3]
+    mock_kv_clients.locate_secret.assert_called_once_with("name")
+
+
+def test_history_shows_only_the_newest_versions(mock_kv_clients, mock_kv_client, capsys):
+    history(mock_kv_clients, "name", limit=2)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].startswith(V3) and lines[1].endswith("(current)")
+    assert lines[2].startswith(V2)
+    assert lines[3] == "1 older versions not shown, see --limit."
+    mock_kv_client.get_secret.assert_not_called()
+
+
+def test_history_of_unknown_secret(mock_kv_clients, mock_kv_client, capsys):
+    mock_kv_client.get_versions.side_effect = lambda name: iter([[]])
+
+    with pytest.raises(SystemExit) as e:
+        history(mock_kv_clients, "name", "test")
+
+    assert e.value.code == 1
+    assert "Secret does not exist!" in capsys.readouterr().err
+
+
+def test_resolve_versions_defaults_to_previous_and_current(mock_kv_client):
+    assert resolve_versions(mock_kv_client, "name", None, None) == (V2, None)
+
+
+def test_resolve_versions_does_not_list_full_ids(mock_kv_client):
+    assert resolve_versions(mock_kv_client, "name", V1, V2) == (V1, V2)
+    mock_kv_client.get_versions.assert_not_called()
+
+
+def test_resolve_versions_expands_prefixes(mock_kv_client):
+    assert resolve_versions(mock_kv_client, "name", "11", "3") == (V1, V3)
+    mock_kv_client.get_versions.assert_called_once_with("name")
+
+
+def test_diff_prints_changed_lines(mock_kv_clients, capsys):
+    diff(mock_kv_clients, "name", "1")
+
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == f"--- name@{V1}"
+    assert out[1] == "+++ name@current"
+    assert out[-2:] == ["-b", "+c"]
+
+
+def test_diff_of_versions_with_the_same_value(mock_kv_clients, mock_kv_client, capsys):
+    diff(mock_kv_clients, "name")
+
+    assert capsys.readouterr().out == "The versions have the same value.\n"
+    assert [c.args[1] for c in mock_kv_client.get_secret.call_args_list] == [V2, None]
+
+
+def test_diff_unknown_version(mock_kv_clients, capsys):
+    with pytest.raises(SystemExit) as e:
+        diff(mock_kv_clients, "name", "4")
+
+    assert e.value.code == 1
+    assert "Version 4 not found" in capsys.readouterr().err
+
+
+def test_diff_unknown_secret(mock_kv_clients, mock_kv_client, capsys):
+    mock_kv_client.get_secret.side_effect = SecretNotFoundError()
+
+    with pytest.raises(SystemExit) as e:
+        diff(mock_kv_clients, "name", V1, V2)
+
+    assert e.value.code == 1
+    assert "Secret or version does not exist!" in capsys.readouterr().err
@@ -0,0 +1,97 @@
+import pytest
+
+from cli.client.keyvault_client import KeyVaultClient, Secret, SecretRequestError
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.sync import CREATE, PROPERTIES, UPDATE, Change, SyncPlan, SyncState
+from cli.client.throttling import Throttle
+from cli.commands.sync import sync_vaults
+
+SRC = "https://src.vault.azure.net"
+DST = "https://dst.vault.azure.net"
+
+
+@pytest.fixture
+def mock_kv_clients(mocker, tmp_path):
+    clients = {}
+    for vault_url in (SRC, DST):
+        clients[vault_url] = mocker.MagicMock(spec=KeyVaultClient)
+        clients[vault_url].vault_url = vault_url
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.clients = clients
+    mock_clients.find_client.side_effect = lambda vault: clients[
+        f"https://{vault}.vault.azure.net"
+    ]
+    mock_clients.throttle = Throttle()
+    mock_clients.sync_state = SyncState(tmp_path / "sync.json")
+    mock_clients.plan_sync.return_value = SyncPlan(
+        SRC,
+        DST,
+        changes=[
+            Change("added", CREATE, [], Secret("added", None, "1")),
+            Change("changed", UPDATE, ["value", "tags"], Secret("changed", None, "2")),
+            Change("tagged", PROPERTIES, ["tags"], Secret("tagged", None)),
+        ],
+        unchanged=1497,
+        only_in_dst=["old"],
+        fetched=3,
+    )
+    mock_clients.apply_sync.return_value = {}
+    return mock_clients
+
+
+def test_sync_prints_the_plan_and_applies_it(mock_kv_clients, capsys):
+    sync_vaults(mock_kv_clients, "src", "dst", yes=True, parallel=4)
+
+    state = mock_kv_clients.sync_state
+    mock_kv_clients.plan_sync.assert_called_once_with(SRC, DST, state, 4)
+    mock_kv_clients.apply_sync.assert_called_once_with(
+        mock_kv_clients.plan_sync.return_value, state, 4
+    )
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == [
+        f"Sync {SRC} -> {DST}",
+        "  + added",
+        "  ~ changed  value, tags",
+        "  ~ tagged   tags",
+        "3 to change, 1497 unchanged, 1 only in the destination.",
+    ]
+    assert "Fetched 3 values to compare." in captured.err
+    assert f"Applied 3 changes to {DST}" in captured.err
+    assert state.location.exists()
+
+
+def test_sync_dry_run_only_prints_the_plan(mock_kv_clients, capsys):
+    sync_vaults(mock_kv_clients, "src", "dst", dry_run=True)
+
+    mock_kv_clients.apply_sync.assert_not_called()
+    assert "3 to change" in capsys.readouterr().out
+
+
+def test_sync_asks_before_applying(mocker, mock_kv_clients):
+    confirm = mocker.patch("click.confirm", return_value=False)
+
+    sync_vaults(mock_kv_clients, "src", "dst")
+
+    confirm.assert_called_once()
+    mock_kv_clients.apply_sync.assert_not_called()
+
+
+def test_sync_reports_failed_changes(mock_kv_clients, capsys):
+    mock_kv_clients.apply_sync.return_value = {"changed": SecretRequestError("Test error")}
+
+    with pytest.raises(SystemExit) as e:
+        sync_vaults(mock_kv_clients, "src", "dst", yes=True)
+
+    assert e.value.code == 1
+    err = capsys.readouterr().err
+    assert f"Applied 2 changes to {DST}" in err
+    assert "changed: Test error" in err
+
+
+def test_sync_into_the_same_vault(mock_kv_clients, capsys):
+    with pytest.raises(SystemExit) as e:
+        sync_vaults(mock_kv_clients, "src", "src")
+
+    assert e.value.code == 1
+    assert "Please choose two different vaults." in capsys.readouterr().err
+    mock_kv_clients.plan_sync.assert_not_called()
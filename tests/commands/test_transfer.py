@@ -0,0 +1,123 @@
+import pytest
+
+from cli.client.keyvault_client import (
+    KeyVaultClient,
+    Secret,
+    SecretRequestError,
+)
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.secret_filter import SecretFilter
+from cli.client.throttling import Throttle
+from cli.commands.formats import load_secrets
+from cli.commands.transfer import export_secrets, import_secrets, report_throttling
+
+
+@pytest.fixture
+def mock_kv_client(mocker):
+    mock_client = mocker.MagicMock(spec=KeyVaultClient)
+    mock_client.vault_url = "https://test.vault.azure.net"
+    mock_client.is_active = True
+    return mock_client
+
+
+@pytest.fixture
+def mock_kv_clients(mocker, mock_kv_client):
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.clients = {"https://test.vault.azure.net": mock_kv_client}
+    mock_clients.throttle = Throttle()
+    return mock_clients
+
+
+def test_export_secrets(mock_kv_clients, capsys):
+    mock_kv_clients.export_secrets.return_value = ([Secret("name", None, "value")], {})
+
+    export_secrets(mock_kv_clients, None, "env")
+
+    mock_kv_clients.export_secrets.assert_called_once_with("https://test.vault.azure.net", None)
+    assert capsys.readouterr().out == 'name="value"\n'
+
+
+def test_export_secrets_with_filter(mock_kv_clients):
+    mock_kv_clients.export_secrets.return_value = ([], {})
+    where = SecretFilter(prefix="app-")
+
+    export_secrets(mock_kv_clients, None, "json", where=where)
+
+    mock_kv_clients.export_secrets.assert_called_once_with("https://test.vault.azure.net", where)
+
+
+def test_export_secrets_to_file(mock_kv_clients, tmp_path):
+    mock_kv_clients.export_secrets.return_value = ([Secret("name", None, "value")], {})
+
+    export_secrets(mock_kv_clients, None, "json", tmp_path / "dump.json")
+
+    assert load_secrets((tmp_path / "dump.json").read_text(), "json") == {"name": "value"}
+
+
+def test_export_secrets_reports_failed_secrets(mock_kv_clients, capsys):
+    mock_kv_clients.export_secrets.return_value = (
+        [Secret("name", None, "value")],
+        {"broken": SecretRequestError("Test error")},
+    )
+
+    with pytest.raises(SystemExit):
+        export_secrets(mock_kv_clients, None, "json")
+
+    captured = capsys.readouterr()
+    assert '"name": "value"' in captured.out
+    assert captured.err == "  broken: Test error\n1 secrets failed!\n"
+
+
+def test_export_secrets_requires_single_vault(mock_kv_clients, mock_kv_client, capsys):
+    mock_kv_clients.clients["https://test2.vault.azure.net"] = mock_kv_client
+
+    with pytest.raises(SystemExit):
+        export_secrets(mock_kv_clients, None, "json")
+
+    assert capsys.readouterr().err == "Please select a single vault with --vault.\n"
+    mock_kv_clients.export_secrets.assert_not_called()
+
+
+def test_export_secrets_with_vault_name(mock_kv_clients, mock_kv_client):
+    mock_kv_clients.find_client.return_value = mock_kv_client
+    mock_kv_clients.export_secrets.return_value = ([], {})
+
+    export_secrets(mock_kv_clients, "test", "json")
+
+    mock_kv_clients.find_client.assert_called_once_with("test")
+    mock_kv_clients.export_secrets.assert_called_once_with("https://test.vault.azure.net", None)
+
+
+def test_import_secrets(mock_kv_clients, tmp_path):
+    (tmp_path / "secrets.yaml").write_text("first: one\nsecond: two\n")
+    mock_kv_clients.import_secrets.return_value = {}
+
+    import_secrets(mock_kv_clients, None, None, str(tmp_path / "secrets.yaml"))
+
+    mock_kv_clients.import_secrets.assert_called_once_with(
+        "https://test.vault.azure.net",
+        [Secret("first", None, "one"), Secret("second", None, "two")],
+    )
+
+
+def test_import_secrets_with_invalid_file(mock_kv_clients, tmp_path, capsys):
+    (tmp_path / "secrets.json").write_text("{broken")
+
+    with pytest.raises(SystemExit):
+        import_secrets(mock_kv_clients, None, None, str(tmp_path / "secrets.json"))
+
+    assert capsys.readouterr().err.startswith("Invalid input:")
+    mock_kv_clients.import_secrets.assert_not_called()
+
+
+def test_report_throttling(capsys):
+    throttle = Throttle()
+    report_throttling(throttle.stats)
+    throttle.stats.requests, throttle.stats.throttled, throttle.stats.retried = 10, 3, 2
+    throttle.stats.exhausted = 1
+
+    report_throttling(throttle.stats)
+
+    assert capsys.readouterr().err == (
+        "Key Vault throttled 3 of 10 requests, retried 2 and gave up on 1.\n"
+    )
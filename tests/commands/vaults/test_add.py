@@ -1,8 +1,13 @@
+from datetime import datetime, timezone
+
 import pytest
 
 from cli.client.keyvault_client import KeyVaultClient
 from cli.client.keyvault_clients import KeyVaultClients
-from cli.commands.vaults.add import add, is_valid_url
+from cli.client.onboarding import Probe
+from cli.commands.vaults.add import add, add_from_file, is_valid_url
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
 
 
 @pytest.fixture
@@ -42,3 +47,69 @@ def test_is_valid_url():
     assert is_valid_url("http://example.com") is True
     assert is_valid_url("ftp://example.") is False
     assert is_valid_url("example.com") is False
+
+
+@pytest.fixture
+def vaults_file(tmp_path):
+    path = tmp_path / "vaults.txt"
+    path.write_text(
+        "https://test.vault.azure.net\n"
+        "https://a1.vault.azure.net\n"
+        "https://a2.vault.azure.net\n"
+        "https://b1.vault.azure.net\n"
+        "https://gone.vault.azure.net\n"
+    )
+    return path
+
+
+def test_add_from_file_logs_in_once_per_tenant(mocker, mock_kv_clients, vaults_file, capsys):
+    mock_kv = mocker.patch("cli.commands.vaults.add.KeyVaultClient", autospec=True)
+    mock_kv_clients.probe_vaults.return_value = {
+        "https://a1.vault.azure.net": Probe("https://a1.vault.azure.net", "a"),
+        "https://a2.vault.azure.net": Probe("https://a2.vault.azure.net", "a"),
+        "https://b1.vault.azure.net": Probe("https://b1.vault.azure.net", "b"),
+        "https://gone.vault.azure.net": Probe("https://gone.vault.azure.net", error="Timeout"),
+    }
+    mock_kv_clients.login_for_tenant.side_effect = lambda tenant_id: (tenant_id, NOW)
+
+    with pytest.raises(SystemExit) as e:
+        add_from_file(mock_kv_clients, vaults_file)
+
+    assert e.value.code == 1
+    mock_kv_clients.probe_vaults.assert_called_once_with(
+        [
+            "https://a1.vault.azure.net",
+            "https://a2.vault.azure.net",
+            "https://b1.vault.azure.net",
+            "https://gone.vault.azure.net",
+        ]
+    )
+    assert mock_kv_clients.login_for_tenant.call_args_list == [mocker.call("a"), mocker.call("b")]
+    assert [c.args[0] for c in mock_kv.call_args_list] == [
+        "https://a1.vault.azure.net",
+        "https://a2.vault.azure.net",
+        "https://b1.vault.azure.net",
+    ]
+    assert [c.args for c in mock_kv.return_value.use_login.call_args_list] == [
+        ("a", NOW),
+        ("a", NOW),
+        ("b", NOW),
+    ]
+    mock_kv_clients.add_clients.assert_called_once()
+    assert len(mock_kv_clients.add_clients.call_args.args[0]) == 3
+    err = capsys.readouterr().err
+    assert "Vault https://test.vault.azure.net already exists." in err
+    assert "Added 3 vaults." in err
+    assert "https://gone.vault.azure.net: Timeout" in err
+
+
+def test_add_from_file_with_invalid_urls(mock_kv_clients, tmp_path, capsys):
+    path = tmp_path / "vaults.txt"
+    path.write_text("https://a.vault.azure.net\nnot a url\n")
+
+    with pytest.raises(SystemExit):
+        add_from_file(mock_kv_clients, path)
+
+    assert "Line 2: not a url is not a vault URL" in capsys.readouterr().err
+    mock_kv_clients.probe_vaults.assert_not_called()
+    mock_kv_clients.add_clients.assert_not_called()
@@ -34,3 +34,10 @@ def test_select_with_no_clients(mock_kv_clients):
     mock_kv_clients.clients = {}
     with pytest.raises(VaultsNotFoundError):
         select(mock_kv_clients)
+
+
+def test_select_enable_all(mock_kv_clients, mock_kv_client):
+    select(mock_kv_clients, enable_all=True)
+
+    assert mock_kv_client.is_active is True
+    mock_kv_clients.save.assert_called_once()
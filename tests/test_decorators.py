@@ -0,0 +1,47 @@
+import pytest
+
+from cli.client.agent_client import AgentClient
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.decorators import login, run_async
+
+
+@pytest.fixture
+def mock_kv_clients(mocker):
+    mock_clients = mocker.MagicMock(spec=KeyVaultClients)
+    mock_clients.clients = {"https://test.vault.azure.net": mocker.MagicMock()}
+    return mock_clients
+
+
+def test_login_saves_after_the_command(mocker, mock_kv_clients):
+    command = mocker.MagicMock(return_value="result")
+
+    result = login(command)(mock_kv_clients, name="name")
+
+    assert result == "result"
+    command.assert_called_once_with(mock_kv_clients, name="name")
+    assert mock_kv_clients.method_calls == [mocker.call.login(), mocker.call.save()]
+
+
+def test_login_saves_when_the_command_exits(mocker, mock_kv_clients):
+    command = mocker.MagicMock(side_effect=SystemExit(1))
+
+    with pytest.raises(SystemExit):
+        login(command)(mock_kv_clients)
+
+    mock_kv_clients.save.assert_called_once()
+
+
+def test_login_leaves_the_agent_alone(mocker):
+    agent = mocker.MagicMock(spec=AgentClient)
+    command = mocker.MagicMock(return_value="result")
+
+    assert login(command)(agent) == "result"
+    command.assert_called_once_with(agent)
+    assert agent.method_calls == []
+
+
+def test_run_async_returns_the_result():
+    async def add(a, b):
+        return a + b
+
+    assert run_async(add)(1, 2) == 3
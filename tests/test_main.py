@@ -0,0 +1,148 @@
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from cli.client.agent_client import AgentClient
+from cli.client.agent_client import connect as connect_agent
+from cli.client.agent_server import AgentServer
+from cli.client.keyvault_client import KeyVaultClient
+from cli.client.keyvault_clients import KeyVaultClients
+from cli.client.keyvault_secret import Secret
+from cli.main import azkv
+
+HEAVY_MODULES = ("azure", "InquirerPy", "halo", "pyperclip", "pydantic", "aiohttp", "yaml")
+
+
+def test_import_does_not_load_heavy_modules():
+    # the import time itself is measured by the startup benchmarks
+    script = (
+        "import json, sys\n"
+        "import cli.main\n"
+        "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = json.loads(result.stdout)
+
+    assert not set(HEAVY_MODULES) & set(modules)
+
+
+def test_help():
+    result = CliRunner().invoke(azkv, ["--help"])
+
+    assert result.exit_code == 0
+    assert "List and show secrets" in result.output
+
+
+def test_version(mocker):
+    mocker.patch("importlib.metadata.version", return_value="1.2.3")
+
+    result = CliRunner().invoke(azkv, ["--version"])
+
+    assert result.exit_code == 0
+    assert "1.2.3" in result.output
+
+
+def test_get_is_answered_by_a_running_agent(mocker):
+    agent = mocker.MagicMock(spec=AgentClient)
+    agent.get_secrets.return_value = ({"name": {"value": "value"}}, {})
+    mocker.patch("cli.main.connect_agent", return_value=agent)
+    load = mocker.patch("cli.azkv.azkv")
+
+    result = CliRunner().invoke(azkv, ["get", "name"])
+
+    assert result.exit_code == 0
+    assert result.output == "value\n"
+    load.assert_not_called()
+
+
+def test_check_passes_the_filters_to_the_agent(mocker):
+    agent = mocker.MagicMock(spec=AgentClient)
+    agent.check.return_value = {"findings": [], "errors": {}, "now": "2024-01-01T00:00:00+00:00"}
+    mocker.patch("cli.main.connect_agent", return_value=agent)
+
+    result = CliRunner().invoke(
+        azkv, ["check", "--tag", "env=prod", "--content-type", "!application/x-pkcs12"]
+    )
+
+    assert result.exit_code == 0
+    assert agent.check.call_args.args[3] == {
+        "tags": [["env", "prod"]],
+        "content_types": ["!application/x-pkcs12"],
+        "enabled_only": False,
+        "prefix": None,
+    }
+
+
+def test_filter_with_invalid_tag(mocker):
+    mocker.patch("cli.main.connect_agent", return_value=mocker.MagicMock(spec=AgentClient))
+
+    result = CliRunner().invoke(azkv, ["check", "--tag", "env"])
+
+    assert result.exit_code == 2
+    assert "env is not a tag like key=value" in result.output
+
+
+def test_show_opens_the_picker_with_or_without_an_agent(mocker):
+    vaults = mocker.MagicMock(spec=KeyVaultClients)
+    vaults.clients = {"https://test.vault.azure.net": mocker.MagicMock()}
+
+    def load(ctx, reset=False):
+        ctx.obj = vaults
+
+    mocker.patch("cli.azkv.azkv", side_effect=load)
+    show_list = mocker.patch("cli.commands.show.show_list")
+    results = []
+    for agent in (None, mocker.MagicMock(spec=AgentClient)):
+        mocker.patch("cli.main.connect_agent", return_value=agent)
+        result = CliRunner().invoke(azkv, ["show", "part-of-a-name"])
+        results.append((result.exit_code, show_list.call_args))
+
+    assert results[0] == results[1]
+    assert results[0][0] == 0
+    assert show_list.call_args.args[1] == "part-of-a-name"
+
+
+def test_agent_sees_vaults_selected_after_it_started(mocker, tmp_path, monkeypatch):
+    mocker.patch("cli.client.keyvault_clients.Path.home", return_value=tmp_path)
+    monkeypatch.setenv("AZKV_AGENT_SOCK", str(tmp_path / "agent.sock"))
+    KeyVaultClients().add_clients(
+        [
+            KeyVaultClient("https://a.vault.azure.net"),
+            KeyVaultClient("https://b.vault.azure.net", is_active=False),
+        ]
+    )
+    kvs = KeyVaultClients()
+    kvs.load()
+
+    async def find_secrets_async(names, vault_urls):
+        vault_url = next(url for url, kv in kvs.clients.items() if kv.is_active)
+        return {name: Secret(name, None, vault_url) for name in names}, {}
+
+    mocker.patch.object(kvs, "find_secrets_async", side_effect=find_secrets_async)
+    server = AgentServer(kvs, tmp_path / "agent.sock", mocker.MagicMock())
+    started = threading.Event()
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(started.set),))
+    thread.start()
+    started.wait(5)
+    checkbox = mocker.patch("cli.commands.common.inquirer.checkbox")
+    checkbox.return_value.execute.return_value = ["https://b.vault.azure.net"]
+    try:
+        assert CliRunner().invoke(azkv, ["get", "name"]).output == "https://a.vault.azure.net\n"
+
+        CliRunner().invoke(azkv, ["vaults", "select"])
+
+        assert CliRunner().invoke(azkv, ["get", "name"]).output == "https://b.vault.azure.net\n"
+    finally:
+        connect_agent().stop()
+        thread.join(5)
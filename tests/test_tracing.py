@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+
+from cli import tracing
+from cli.tracing import Tracer, span, traced
+
+
+@pytest.fixture
+def tracer(mocker):
+    tracer = Tracer()
+    tracer.enabled = True
+    mocker.patch.object(tracing, "tracer", tracer)
+    return tracer
+
+
+def test_spans_are_not_recorded_when_disabled(mocker):
+    tracer = Tracer()
+    mocker.patch.object(tracing, "tracer", tracer)
+
+    with span("outer") as s:
+        assert s is None
+    traced("call")(lambda: None)()
+    tracer.record("page", 0)
+
+    assert tracer.spans == []
+
+
+def test_spans_are_nested(tracer):
+    with span("outer", vault_url="https://test.vault.azure.net") as outer:
+        with span("inner") as inner:
+            pass
+
+    assert [s.name for s in tracer.spans] == ["inner", "outer"]
+    assert inner.parent_id == outer.id
+    assert outer.parent_id is None
+    assert outer.attributes == {"vault_url": "https://test.vault.azure.net"}
+    assert outer.duration_ns >= inner.duration_ns
+
+
+def test_span_is_recorded_when_the_call_fails(tracer):
+    @traced("fails")
+    def fails():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        fails()
+
+    assert [s.name for s in tracer.spans] == ["fails"]
+
+
+def test_traced_coroutine(tracer):
+    @traced("coroutine")
+    async def coroutine():
+        tracer.record("page", 0)
+        return "result"
+
+    assert asyncio.run(coroutine()) == "result"
+
+    page, call = tracer.spans
+    assert call.name == "coroutine"
+    assert page.parent_id == call.id
+
+
+def test_summary(tracer):
+    for _ in range(2):
+        with span("get"):
+            pass
+    with span("login"):
+        pass
+
+    lines = tracing.summary(5_000_000).splitlines()
+
+    assert lines[1] == "Profile (5.0 ms)"
+    rows = {line.split()[0]: line.split()[1] for line in lines[3:]}
+    assert rows == {"get": "2", "login": "1"}
+
+
+def test_dump_json(tracer):
+    with span("outer"):
+        with span("inner"):
+            pass
+
+    spans = json.loads(tracing.dump_json())
+
+    assert [s["name"] for s in spans] == ["outer", "inner"]
+    assert spans[1]["parent_id"] == spans[0]["id"]
+
+
+def test_configure_is_off_by_default(mocker, monkeypatch):
+    monkeypatch.delenv("AZKV_TRACE", raising=False)
+    tracer = Tracer()
+    mocker.patch.object(tracing, "tracer", tracer)
+    register = mocker.patch("atexit.register")
+
+    tracing.configure()
+
+    assert not tracer.enabled
+    register.assert_not_called()
+
+
+def test_configure_with_environment(mocker, monkeypatch, capsys):
+    monkeypatch.setenv("AZKV_TRACE", "json")
+    tracer = Tracer()
+    mocker.patch.object(tracing, "tracer", tracer)
+    register = mocker.patch("atexit.register")
+
+    tracing.configure()
+    with span("outer"):
+        pass
+    register.call_args.args[0]()
+
+    assert tracer.enabled
+    assert [s["name"] for s in json.loads(capsys.readouterr().err)] == ["outer"]